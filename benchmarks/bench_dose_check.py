@@ -0,0 +1,49 @@
+"""
+Throughput of the dose range checker.
+
+    python -m benchmarks.bench_dose_check [--prescriptions 20000]
+
+Parses synthetic prescriptions once, then checks them one prescription at a
+time (as the app does on upload) and as a single batch, and reports
+medications checked per second for each.
+"""
+import argparse
+import random
+import time
+
+from benchmarks.bench_rx_parser import make_prescription
+from clinic.dose_check import DoseChecker
+from clinic.interactions import InteractionChecker
+from clinic.rx_parser import parse_prescription
+
+
+def best_of(runs, fn):
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dose range checking throughput")
+    parser.add_argument("--prescriptions", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    prescriptions = [parse_prescription(make_prescription(rng)) for _ in range(args.prescriptions)]
+    medications = sum(map(len, prescriptions))
+    checker = DoseChecker.from_file(resolve=InteractionChecker.from_files().resolve)
+
+    single = best_of(3, lambda: [checker.check(prescription) for prescription in prescriptions])
+    batch = best_of(3, lambda: checker.check_batch(prescriptions))
+    flagged = sum(bool(check.issues) for checks in checker.check_batch(prescriptions) for check in checks)
+
+    print(f"{args.prescriptions} prescriptions, {medications} medications, {flagged} with dose issues")
+    print(f"one at a time: {medications / single:>12,.0f} medications/s  {single / args.prescriptions * 1e6:>8.1f} us per prescription")
+    print(f"one batch:     {medications / batch:>12,.0f} medications/s  {batch / args.prescriptions * 1e6:>8.1f} us per prescription")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Throughput of the emergency detector, in messages per second.
+
+    python -m benchmarks.bench_emergency [--messages 50000]
+
+Compares the original keyword loop with the compiled detector, called per
+message and through detect_batch. The detector is first checked against
+REGRESSION_CASES, and the run stops if any of them is misjudged.
+"""
+import argparse
+import random
+import sys
+import time
+
+from clinic.emergency import DEFAULT_DETECTOR
+
+SAMPLE_MESSAGES = [
+    "What is the first-line treatment for hypertension in a diabetic patient?",
+    "CURB-65 pneumonia management for a 70 year old with confusion",
+    "Patient denies chest pain, no shortness of breath, not unconscious",
+    "Found unresponsive at home, possible overdose, please advise",
+    "Post-op day 2, bleeding heavily from the drain site",
+    "Recommended HbA1c target for frail elderly patients?",
+    "History of stroke two years ago, now asking about statin dosing",
+    "Asthma exacerbation not responding to salbutamol, is magnesium indicated?",
+    "Child had a seizure lasting 3 minutes, now drowsy",
+    "Adjusting warfarin dose after INR of 4.2 without bleeding",
+]
+
+# (message, expected is_emergency). Negation must only silence a finding the
+# cue directly governs; these were once missed because the cue sat a few
+# words earlier in another clause.
+REGRESSION_CASES = [
+    ("child with no fever now having seizures", True),
+    ("collapsed without warning had a seizure", True),
+    ("we could not stop the bleeding heavily", True),
+    ("no improvement after treatment stroke symptoms worsening", True),
+    ("no fever, now seizing", True),
+    ("denies chest pain but had a stroke last night", True),
+    ("Patient denies chest pain, no shortness of breath, not unconscious", False),
+    ("no history of stroke", False),
+    ("denies any suicidal ideation", False),
+    ("negative for stroke", False),
+    ("Adjusting warfarin dose after INR of 4.2 without bleeding", False),
+]
+
+
+def check_regressions():
+    """Return the regression cases the detector gets wrong"""
+    return [
+        (text, expected) for text, expected in REGRESSION_CASES
+        if DEFAULT_DETECTOR.detect(text).is_emergency != expected
+    ]
+
+
+def legacy_check_for_emergency(text):
+    """The keyword loop the detector replaced, kept for comparison"""
+    emergency_keywords = [
+        "emergency", "urgent", "severe", "critical", "life-threatening",
+        "heart attack", "stroke", "seizure", "unconscious", "not breathing",
+        "suicide", "hemorrhage", "bleeding severely"
+    ]
+    for keyword in emergency_keywords:
+        if keyword.lower() in text.lower():
+            return True
+    return False
+
+
+def make_messages(count, seed=7):
+    rng = random.Random(seed)
+    return [" ".join(rng.sample(SAMPLE_MESSAGES, 2)) for _ in range(count)]
+
+
+def measure(label, function, messages, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function(messages)
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<28} {len(messages) / best:>12,.0f} msg/s  ({best * 1000:.1f} ms)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark emergency detection throughput")
+    parser.add_argument("--messages", type=int, default=50000)
+    args = parser.parse_args()
+
+    failures = check_regressions()
+    for text, expected in failures:
+        print(f"REGRESSION expected is_emergency={expected}: {text!r}")
+    if failures:
+        sys.exit(1)
+    print(f"{len(REGRESSION_CASES)} regression cases pass")
+
+    messages = make_messages(args.messages)
+    print(f"{args.messages} messages, average {sum(map(len, messages)) / len(messages):.0f} characters\n")
+
+    measure("legacy keyword loop", lambda batch: [legacy_check_for_emergency(text) for text in batch], messages)
+    measure("detector.detect per message", lambda batch: [DEFAULT_DETECTOR.detect(text) for text in batch], messages)
+    measure("detector.detect_batch", DEFAULT_DETECTOR.detect_batch, messages)
+
+    flagged = sum(assessment.is_emergency for assessment in DEFAULT_DETECTOR.detect_batch(messages))
+    legacy_flagged = sum(legacy_check_for_emergency(text) for text in messages)
+    print(f"\nflagged: detector {flagged}, legacy {legacy_flagged} (legacy ignores negation)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+End-to-end latency of query_medical_llm against scripted inference failures.
+
+    python -m benchmarks.bench_query_latency [--requests 30] [--concurrency 4] [--scenario cold_start]
+    python -m benchmarks.bench_query_latency --output after.json --compare before.json
+
+Each scenario starts from empty caches and closed circuit breakers, points
+the models at a local stub server (tools/stub_server.py) behaving as the
+scenario describes, and asks distinct questions from several threads. The
+retry, backoff, hedging and breaker settings are the real ones, so slow
+scenarios take as long as they would for a user. Reports p50/p95/p99
+latency and how often the answer came from the local fallback; --output
+saves the results and --compare flags scenarios that got slower or fell
+back more often than in an earlier run.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from clinic import medical_query
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from stub_server import start_in_background  # noqa: E402
+
+# Model settings as imported, before they are pointed at the stub
+ORIGINAL_MODELS = medical_query.MEDICAL_MODELS
+
+# Stub behavior per scenario: default settings and per-model overrides
+# (matched against the model URL), in tools/stub_server.py's format
+SCENARIOS = {
+    "healthy": {"default": {"first_token_delay": 0.2, "latency_jitter": 0.2}},
+    "slow_tokens": {"default": {"first_token_delay": 0.2, "token_delay": 0.1}},
+    "cold_start": {"default": {"first_token_delay": 0.1, "loading_seconds": 4.0}},
+    "flaky": {"default": {"first_token_delay": 0.2, "latency_jitter": 0.2, "error_rate": 0.3, "error_status": 503}},
+    "timeouts": {"default": {"first_token_delay": 0.2, "timeout_rate": 0.2, "hang_seconds": 30.0}},
+    "primary_down": {
+        "default": {"first_token_delay": 0.2, "latency_jitter": 0.2},
+        "models": {"meditron": {"error_rate": 1.0}},
+    },
+    "all_down": {"default": {"first_token_delay": 0.05, "error_rate": 1.0}},
+}
+
+# A scenario regresses when a latency percentile grows by more than this
+# fraction (and by at least the minimum seconds), or its fallback rate grows
+# by more than the allowed points
+REGRESSION_LATENCY_RATIO = 0.2
+REGRESSION_LATENCY_MIN_SECONDS = 0.1
+REGRESSION_FALLBACK_POINTS = 0.05
+
+TOPICS = [
+    "hypertension", "type 2 diabetes", "community acquired pneumonia", "tuberculosis", "asthma",
+    "heart failure", "atrial fibrillation", "chronic kidney disease", "sepsis", "migraine",
+]
+
+
+def _percentile(sorted_values, percent):
+    # Nearest-rank percentile
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def reset_query_state(base_url, read_timeout):
+    """Empty caches, close breakers and point the models at the stub"""
+    for factory in (
+        medical_query.get_http_client, medical_query.get_response_cache, medical_query.get_semantic_cache,
+        medical_query.get_circuit_breakers, medical_query.get_query_flights,
+    ):
+        factory.cache_clear()
+    medical_query.HTTP_READ_TIMEOUT = read_timeout
+    medical_query.MEDICAL_MODELS = [
+        {**model, "url": model["url"].replace(medical_query.HF_INFERENCE_BASE_URL, base_url)}
+        for model in ORIGINAL_MODELS
+    ]
+
+
+def run_scenario(server, name, requests, concurrency, read_timeout):
+    """Ask requests distinct questions through query_medical_llm; returns the scenario's result row"""
+    spec = SCENARIOS[name]
+    reset_query_state(f"http://127.0.0.1:{server.server_port}/models", read_timeout)
+    server.configure(spec.get("default"), spec.get("models"))
+
+    def ask(index):
+        prompt = f"What is the first line treatment for {TOPICS[index % len(TOPICS)]}? (case {index})"
+        started = time.perf_counter()
+        _, from_api, model_name = medical_query.query_medical_llm(prompt)
+        return time.perf_counter() - started, from_api, model_name
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(ask, range(requests)))
+    wall = time.perf_counter() - started
+
+    seconds = sorted(result[0] for result in results)
+    models = {}
+    for _, _, model_name in results:
+        models[model_name] = models.get(model_name, 0) + 1
+    return {
+        "requests": requests,
+        "p50": _percentile(seconds, 50),
+        "p95": _percentile(seconds, 95),
+        "p99": _percentile(seconds, 99),
+        "max": seconds[-1],
+        "fallback_rate": sum(not from_api for _, from_api, _ in results) / requests,
+        "per_second": requests / wall,
+        "answered_by": models,
+        "stub_responses": server.stats(),
+    }
+
+
+def find_regressions(current, baseline):
+    """Describe every scenario in both runs that got slower or fell back more often"""
+    regressions = []
+    for name, row in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for key in ("p50", "p95", "p99"):
+            grown = row[key] - before[key]
+            if grown > REGRESSION_LATENCY_MIN_SECONDS and grown > before[key] * REGRESSION_LATENCY_RATIO:
+                regressions.append(f"{name}: {key} {before[key]:.2f}s -> {row[key]:.2f}s")
+        if row["fallback_rate"] - before["fallback_rate"] > REGRESSION_FALLBACK_POINTS:
+            regressions.append(f"{name}: fallback rate {before['fallback_rate']:.0%} -> {row['fallback_rate']:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark query_medical_llm against a scripted stub server")
+    parser.add_argument("--requests", type=int, default=30, help="questions asked per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="questions asked at once")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="run only this scenario (repeatable)")
+    parser.add_argument("--read-timeout", type=float, default=5.0,
+                        help="client read timeout in seconds, below the stub's hang time")
+    parser.add_argument("--seed", type=int, default=7, help="stub random seed")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="earlier --output file to check for regressions")
+    args = parser.parse_args()
+
+    server = start_in_background(port=0, seed=args.seed)
+    names = args.scenario or list(SCENARIOS)
+    results = {}
+    print(f"{'scenario':<14} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'max s':>7} {'fallback':>9} {'req/s':>7}")
+    try:
+        for name in names:
+            row = results[name] = run_scenario(server, name, args.requests, args.concurrency, args.read_timeout)
+            print(
+                f"{name:<14} {row['p50']:>7.2f} {row['p95']:>7.2f} {row['p99']:>7.2f} {row['max']:>7.2f} "
+                f"{row['fallback_rate']:>9.0%} {row['per_second']:>7.2f}"
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "settings": {"requests": args.requests, "concurrency": args.concurrency,
+                             "read_timeout": args.read_timeout, "seed": args.seed},
+                "scenarios": results,
+            }, f, indent=2)
+        print(f"Saved {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["scenarios"]
+        regressions = find_regressions(results, baseline)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
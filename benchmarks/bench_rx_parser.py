@@ -0,0 +1,99 @@
+"""
+Throughput of the prescription parser.
+
+    python -m benchmarks.bench_rx_parser [--prescriptions 20000]
+
+Parses synthetic prescriptions in the layouts the parser handles (one field
+per line, slash-separated and free-text directions) and reports
+prescriptions and medications per second. It first parses the layouts in
+REGRESSION_CASES, and the run stops if any of them is parsed wrongly.
+"""
+import argparse
+import random
+import sys
+import time
+
+from clinic.ocr import STUB_PRESCRIPTION_TEXT
+from clinic.rx_parser import parse_prescription
+
+DRUGS = [
+    ("Metformin", 500, "mg"), ("Lisinopril", 10, "mg"), ("Atorvastatin", 20, "mg"),
+    ("Amlodipine", 5, "mg"), ("Levothyroxine", 75, "mcg"), ("Insulin glargine", 10, "units"),
+    ("Amoxicillin", 500, "mg"), ("Sertraline", 50, "mg"), ("Warfarin", 5, "mg"), ("Albuterol", 90, "mcg"),
+]
+DIRECTIONS = ["1 tablet PO BID with meals", "1 tab by mouth daily", "2 puffs inhaled q4h prn",
+              "1 capsule PO TID x 7 days", "take one tablet at bedtime", "10 units SC nightly"]
+
+# Text and the expected (describe(), sig) of each medication parsed from it
+REGRESSION_CASES = [
+    # Flattened PDF text layers put Disp and Refills on the Sig line
+    ("Metformin 500mg Sig: 1 tablet PO BID Disp: 60 Refills: 3",
+     [("Metformin 500 mg PO BID qty 60 refills 3", "1 tablet PO BID")]),
+    ("Take 2 tablets of Ibuprofen 200 mg every 6 hours as needed", [("Ibuprofen 200 mg x2 Q6H PRN", "")]),
+    ("Albuterol 90 mcg\nSig: 2 puffs inhaled q4h prn\nDisp: 1 inhaler",
+     [("Albuterol 90 mcg x2 INH Q4H PRN qty 1", "2 puffs inhaled q4h prn")]),
+    ("Atorvastatin 20mg\nSig: 1 tab PO at bedtime\nSigned: Dr. John Smith, MD",
+     [("Atorvastatin 20 mg PO QHS", "1 tab PO at bedtime")]),
+    ("Rx: Warfarin 5mg tablet, take 1 daily", [("Warfarin 5 mg QD", "")]),
+    ("Apply Hydrocortisone 1% cream BID", [("Hydrocortisone 1 % TOP BID", "")]),
+]
+
+
+def check_regressions():
+    """Return (text, expected, parsed) for the regression cases parsed wrongly"""
+    failures = []
+    for text, expected in REGRESSION_CASES:
+        parsed = [(medication.describe(), medication.sig) for medication in parse_prescription(text)]
+        if parsed != expected:
+            failures.append((text, expected, parsed))
+    return failures
+
+
+def make_prescription(rng):
+    lines = ["Dr. Jane Roe, MD", "Patient: John Doe", "Date: 01/02/2025", "", "Rx:"]
+    for number, (drug, strength, unit) in enumerate(rng.sample(DRUGS, rng.randint(1, 6)), 1):
+        directions = rng.choice(DIRECTIONS)
+        quantity, refills = rng.choice([30, 60, 90]), rng.randint(0, 5)
+        layout = rng.randrange(3)
+        if layout == 0:
+            lines += [f"{number}. {drug} {strength}mg".replace("mg", unit), f"   Sig: {directions}",
+                      f"   Disp: {quantity} tablets", f"   Refills: {refills}"]
+        elif layout == 1:
+            lines.append(f"{drug} {strength} {unit} / Sig: {directions} / Disp: {quantity} / Refills: {refills}")
+        else:
+            lines.append(f"- {drug} {strength}{unit} {directions} #{quantity} refills: {refills}")
+    lines.append("Signed: Dr. Jane Roe, MD")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prescription parsing throughput")
+    parser.add_argument("--prescriptions", type=int, default=20000)
+    args = parser.parse_args()
+
+    failures = check_regressions()
+    for text, expected, parsed in failures:
+        print(f"REGRESSION {text!r}: expected {expected}, parsed {parsed}")
+    if failures:
+        sys.exit(1)
+    print(f"{len(REGRESSION_CASES)} regression cases pass")
+
+    rng = random.Random(5)
+    prescriptions = [make_prescription(rng) for _ in range(args.prescriptions)]
+    characters = sum(map(len, prescriptions))
+
+    best, medications = float("inf"), 0
+    for _ in range(3):
+        started = time.perf_counter()
+        medications = sum(len(parse_prescription(text)) for text in prescriptions)
+        best = min(best, time.perf_counter() - started)
+
+    print(f"{args.prescriptions} prescriptions, {medications} medications, {characters / 1e6:.1f} MB of text")
+    print(f"{args.prescriptions / best:>12,.0f} prescriptions/s")
+    print(f"{medications / best:>12,.0f} medications/s")
+    print(f"{best / args.prescriptions * 1e6:>12.1f} us per prescription")
+    print("\nsample:", parse_prescription(STUB_PRESCRIPTION_TEXT))
+
+
+if __name__ == "__main__":
+    main()
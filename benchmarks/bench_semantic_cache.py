@@ -0,0 +1,79 @@
+"""
+Lookup latency of the semantic answer cache as it fills up.
+
+    python -m benchmarks.bench_semantic_cache [--entries 100000] [--lookups 200]
+
+Fills the cache with synthetic clinical questions and times get() for
+rewordings of questions that are in the cache and for unrelated questions.
+"""
+import argparse
+import random
+import time
+
+from clinic.semantic_cache import SemanticCache
+
+CONDITIONS = [
+    "hypertension", "type 2 diabetes", "community acquired pneumonia", "tuberculosis", "asthma",
+    "heart failure", "atrial fibrillation", "chronic kidney disease", "copd", "urinary tract infection",
+    "migraine", "gout", "hypothyroidism", "depression", "osteoporosis", "sepsis", "anemia", "psoriasis",
+]
+POPULATIONS = [
+    "", "in pregnancy", "in elderly patients", "in children", "with renal impairment",
+    "after myocardial infarction", "in liver disease", "in athletes",
+]
+ASPECTS = [
+    "first line treatment", "diagnostic criteria", "monitoring", "drug interactions",
+    "dose adjustment", "referral criteria", "complications", "follow up interval",
+]
+REWORDINGS = [
+    ("first line treatment", "first-line medication"),
+    ("dose adjustment", "dosing adjustment"),
+    ("hypertension", "HTN"),
+    ("tuberculosis", "TB"),
+]
+
+
+def make_questions(count, seed=3):
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(ASPECTS)} for {rng.choice(CONDITIONS)} {rng.choice(POPULATIONS)} case {i}"
+        for i in range(count)
+    ]
+
+
+def reword(question):
+    for original, replacement in REWORDINGS:
+        question = question.replace(original, replacement)
+    return question
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark semantic cache lookups")
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    questions = make_questions(args.entries)
+    cache = SemanticCache(max_entries=args.entries)
+
+    started = time.perf_counter()
+    cache.put_many((question, i) for i, question in enumerate(questions))
+    print(f"loaded {args.entries} entries in {time.perf_counter() - started:.1f}s")
+
+    rng = random.Random(11)
+    probes = [(reword(questions[i]), i) for i in rng.sample(range(args.entries), args.lookups)]
+    unrelated = [(f"unrelated question about skin rash number {i}", None) for i in range(args.lookups)]
+
+    for label, batch in (("reworded (expect hits)", probes), ("unrelated (expect misses)", unrelated)):
+        hits = correct = 0
+        started = time.perf_counter()
+        for query, expected in batch:
+            match = cache.get(query)
+            hits += match is not None
+            correct += match is not None and match[0] == expected
+        per_lookup = (time.perf_counter() - started) / len(batch) * 1000
+        print(f"{label:<28} {per_lookup:>7.2f} ms/lookup, {hits}/{len(batch)} hits, {correct} to the original question")
+
+
+if __name__ == "__main__":
+    main()
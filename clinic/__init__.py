@@ -0,0 +1 @@
+"""Shared backend helpers for the medical assistant Streamlit apps."""
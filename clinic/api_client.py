@@ -0,0 +1,50 @@
+from clinic.http_client import PooledHTTPClient
+
+# The API's own timeout is 90 s by default, so allow a little longer before giving up on it
+API_CLIENT_READ_TIMEOUT = 100
+
+
+class APIError(Exception):
+    """Error answer from the medical assistant API"""
+
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class MedicalAPIClient:
+    """Client for clinic.api_server, for pages that act as thin front ends"""
+
+    def __init__(self, base_url, client=None):
+        self.base_url = base_url.rstrip("/")
+        self.client = client or PooledHTTPClient(read_timeout=API_CLIENT_READ_TIMEOUT)
+
+    def _call(self, method, path, **kwargs):
+        response = self.client.request(method, f"{self.base_url}{path}", **kwargs)
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {"error": response.text[:200]}
+        if response.status_code != 200:
+            raise APIError(response.status_code, payload.get("error", "unexpected response"))
+        return payload
+
+    def query(self, prompt):
+        """Return (answer, from_api, model_name), as query_medical_llm does"""
+        payload = self._call("POST", "/v1/query", json={"prompt": prompt})
+        return payload["answer"], payload["from_api"], payload["model"]
+
+    def check_emergency(self, text):
+        """Return the emergency check dict: is_emergency, severity, matches and negated_critical"""
+        return self._call("POST", "/v1/emergency", json={"text": text})
+
+    def analyze_prescription(self, data, content_type):
+        """Send an image or PDF; returns its text, medications, interactions, dose checks and ocr_backend"""
+        return self._call("POST", "/v1/prescriptions", data=data, headers={"Content-Type": content_type})
+
+    def check_prescription_text(self, text):
+        """Check prescription text that has already been extracted"""
+        return self._call("POST", "/v1/prescriptions", json={"text": text})
+
+    def health(self):
+        return self._call("GET", "/health")
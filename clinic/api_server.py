@@ -0,0 +1,407 @@
+"""
+HTTP API for the medical assistant, independent of the Streamlit pages.
+
+    python -m clinic.api_server --port 8000
+    MEDICAL_API_URL=http://127.0.0.1:8000 streamlit run streamlit_app.py
+
+Endpoints:
+
+    GET  /health             liveness, which models are currently usable and background health checks
+    GET  /metrics            request counts and latencies, worker pool, cache and breaker stats (JSON)
+    GET  /metrics/prometheus per-route and per-query-stage counters and histograms (Prometheus text format)
+    POST /v1/query           {"prompt": "..."} -> {"answer", "from_api", "model"}
+    POST /v1/emergency       {"text": "..."} -> {"is_emergency", "severity", "matches", "negated_critical"}
+    POST /v1/prescriptions   an image or PDF body (Content-Type image/* or application/pdf),
+                             or {"text": "..."} -> extracted text, medications, interactions, dose checks
+                             (uploads read by OCR also give "ocr_backend"; 503 if OCR is needed but not installed)
+
+Connections are handled on an asyncio event loop; the blocking work (model
+calls, OCR) runs on a bounded thread pool. At most max_pending requests may
+be queued or running; beyond that the server answers 503 straight away. A
+request that takes longer than the timeout gets a 504, and its worker
+finishes in the background without holding up the connection.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from clinic import emergency
+from clinic.dose_check import DoseChecker
+from clinic.executor import ExecutorBusyError
+from clinic.interactions import InteractionChecker
+from clinic.medical_query import (
+    MEDICAL_MODELS, get_circuit_breakers, get_health_prober, get_query_flights, get_query_metrics,
+    get_response_cache, get_semantic_cache, is_backend_healthy, query_medical_llm
+)
+from clinic.metrics import MetricsRegistry
+from clinic.ocr import OCRPool, OCRUnavailableError, get_backend
+from clinic.prescription_analysis import check_prescription_text, extract_prescription_text, findings_as_dict
+
+# Server settings: worker threads, requests allowed in the queue, seconds
+# allowed per request and the largest accepted upload
+API_MAX_WORKERS = 8
+API_MAX_PENDING = 64
+API_REQUEST_TIMEOUT_SECONDS = 90.0
+API_MAX_BODY_BYTES = 20 * 1024 * 1024
+# Idle keep-alive connections are closed after this long
+API_KEEPALIVE_SECONDS = 15.0
+
+# OCR settings for prescription uploads, as in the Streamlit app
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "auto")
+OCR_TIMEOUT_SECONDS = 60
+
+Request = namedtuple("Request", "method path query version headers body")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    408: "Request Timeout", 411: "Length Required", 413: "Payload Too Large", 415: "Unsupported Media Type",
+    500: "Internal Server Error", 501: "Not Implemented", 503: "Service Unavailable", 504: "Gateway Timeout",
+}
+
+
+class HTTPError(Exception):
+    """Raised by a handler to send an error status with a message"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+@functools.lru_cache(maxsize=None)
+def get_ocr_pool():
+    """Return the process-wide OCR worker pool"""
+    return OCRPool(backend=get_backend(OCR_BACKEND), timeout=OCR_TIMEOUT_SECONDS)
+
+
+@functools.lru_cache(maxsize=None)
+def get_interaction_checker():
+    """Return the process-wide drug interaction checker"""
+    return InteractionChecker.from_files()
+
+
+@functools.lru_cache(maxsize=None)
+def get_dose_checker():
+    """Return the process-wide dose range checker"""
+    return DoseChecker.from_file(resolve=get_interaction_checker().resolve)
+
+
+def _json_body(request):
+    if not request.headers.get("content-type", "").startswith("application/json"):
+        raise HTTPError(415, "Expected a JSON body")
+    try:
+        body = json.loads(request.body or b"{}")
+    except ValueError as e:
+        raise HTTPError(400, f"Invalid JSON: {e}") from None
+    if not isinstance(body, dict):
+        raise HTTPError(400, "Expected a JSON object")
+    return body
+
+
+def _text_field(body, name):
+    value = body.get(name)
+    if not isinstance(value, str) or not value.strip():
+        raise HTTPError(400, f"{name!r} must be a non-empty string")
+    return value
+
+
+def handle_query(request):
+    """Answer a medical question with the models, or the local knowledge base if they are unavailable"""
+    body = _json_body(request)
+    answer, from_api, model_name = query_medical_llm(_text_field(body, "prompt"))
+    return {"answer": answer, "from_api": from_api, "model": model_name}
+
+
+def handle_emergency(request):
+    """Screen text for emergency findings"""
+    assessment = emergency.detect(_text_field(_json_body(request), "text"))
+    return {
+        "is_emergency": assessment.is_emergency,
+        "severity": assessment.severity,
+        "matches": [match._asdict() for match in assessment.matches],
+        "negated_critical": assessment.negated_critical,
+    }
+
+
+def handle_prescription(request):
+    """
+    Extract, parse and check a prescription upload or its text.
+
+    Uploads that needed OCR also report the backend that read them, so text
+    from the sample-text stub is never mistaken for the uploaded prescription.
+    """
+    content_type = request.headers.get("content-type", "")
+    extracted_by = {}
+    if content_type.startswith("application/json"):
+        text = _text_field(_json_body(request), "text")
+    elif content_type.startswith(("image/", "application/pdf")):
+        if not request.body:
+            raise HTTPError(400, "Empty upload")
+        try:
+            # The OCR pool is only started if the upload needs OCR
+            text, ocr_backend = extract_prescription_text(
+                request.body, get_ocr_pool, is_pdf=content_type.startswith("application/pdf")
+            )
+        except OCRUnavailableError as e:
+            raise HTTPError(503, str(e)) from None
+        except ExecutorBusyError as e:
+            raise HTTPError(503, str(e), {"Retry-After": "5"}) from None
+        except (OSError, ValueError) as e:
+            # Pillow and iter_pdf_pages report unreadable files this way
+            raise HTTPError(400, f"Could not read the upload: {e}") from None
+        if ocr_backend is not None:
+            extracted_by["ocr_backend"] = ocr_backend
+    else:
+        raise HTTPError(415, "Send an image, a PDF or a JSON body with 'text'")
+    findings = check_prescription_text(text, get_interaction_checker(), get_dose_checker())
+    return {"text": text, **extracted_by, **findings_as_dict(findings)}
+
+
+class APIServer:
+    """
+    Asyncio HTTP/1.1 server that runs request handlers on a bounded thread pool.
+
+    Handlers take a Request and return a JSON-serializable object, or raise
+    HTTPError. Each route keeps a count of responses by status and its total
+    latency for /metrics, and a latency histogram for /metrics/prometheus.
+    """
+
+    def __init__(self, max_workers=API_MAX_WORKERS, max_pending=API_MAX_PENDING,
+                 request_timeout=API_REQUEST_TIMEOUT_SECONDS, max_body_bytes=API_MAX_BODY_BYTES):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.request_timeout = request_timeout
+        self.max_body_bytes = max_body_bytes
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api")
+        # Only touched on the event loop thread, so no lock is needed
+        self._pending = 0
+        self._route_stats = {}
+        self.registry = MetricsRegistry()
+        self._responses = self.registry.counter("api_responses_total", "API responses sent", ("route", "status"))
+        self._latency = self.registry.histogram("api_request_seconds", "API request latency", ("route", "status"))
+        self.started_at = time.time()
+        self.routes = {
+            ("POST", "/v1/query"): handle_query,
+            ("POST", "/v1/emergency"): handle_emergency,
+            ("POST", "/v1/prescriptions"): handle_prescription,
+        }
+        # Cheap endpoints answered on the event loop, so they respond even when the pool is saturated
+        self.inline_routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+            ("GET", "/metrics/prometheus"): self.prometheus_metrics,
+        }
+
+    def health(self, request):
+        breakers = get_circuit_breakers()
+        models = {
+            model["name"]: breakers.get(model["name"]).is_available() and is_backend_healthy(model["name"])
+            for model in MEDICAL_MODELS
+        }
+        backends = {}
+        if get_health_prober.cache_info().currsize:
+            for name, health in get_health_prober().snapshot().items():
+                backends[name] = {key: value for key, value in health.items() if key != "history"}
+        return {
+            # Degraded: questions are answered from the local knowledge base only
+            "status": "ok" if any(models.values()) else "degraded",
+            "models": models,
+            "backends": backends,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+        }
+
+    def metrics(self, request):
+        routes = {
+            route: {
+                "responses": dict(stats["responses"]),
+                "mean_seconds": stats["seconds"] / max(sum(stats["responses"].values()), 1),
+                "timeouts": stats["timeouts"],
+            }
+            for route, stats in self._route_stats.items()
+        }
+        return {
+            "routes": routes,
+            "workers": {"max_workers": self.max_workers, "max_pending": self.max_pending, "pending": self._pending},
+            "response_cache": get_response_cache().stats(),
+            "semantic_cache": get_semantic_cache().stats(),
+            "query_flights": get_query_flights().stats(),
+            "circuit_breakers": get_circuit_breakers().snapshot(),
+            "ocr": get_ocr_pool().stats() if get_ocr_pool.cache_info().currsize else None,
+        }
+
+    def prometheus_metrics(self, request):
+        # A str payload is sent as text rather than JSON
+        return self.registry.render() + get_query_metrics().render()
+
+    def _record(self, route, status, seconds, timed_out=False):
+        stats = self._route_stats.setdefault(route, {"responses": {}, "seconds": 0.0, "timeouts": 0})
+        stats["responses"][str(status)] = stats["responses"].get(str(status), 0) + 1
+        stats["seconds"] += seconds
+        stats["timeouts"] += timed_out
+        self._responses.inc(route=route, status=status)
+        self._latency.observe(seconds, route=route, status=status)
+
+    async def dispatch(self, request):
+        """Run the handler for a request; returns (status, payload, extra headers)"""
+        key = (request.method, request.path)
+        route = f"{request.method} {request.path}"
+        if key in self.inline_routes:
+            return 200, self.inline_routes[key](request), {}
+        handler = self.routes.get(key)
+        if handler is None:
+            if any(path == request.path for _, path in [*self.routes, *self.inline_routes]):
+                return 405, {"error": "Method not allowed"}, {}
+            return 404, {"error": "Not found"}, {}
+
+        if self._pending >= self.max_pending:
+            self._record(route, 503, 0.0)
+            return 503, {"error": "Server busy, try again shortly"}, {"Retry-After": "1"}
+
+        started = time.perf_counter()
+        self._pending += 1
+        future = asyncio.get_running_loop().run_in_executor(self._pool, handler, request)
+        # The slot is freed when the worker finishes, even if the client was already sent a 504
+        future.add_done_callback(self._release)
+        timed_out = False
+        try:
+            status, payload, headers = 200, await asyncio.wait_for(asyncio.shield(future), self.request_timeout), {}
+        except asyncio.TimeoutError:
+            timed_out = True
+            status, payload, headers = 504, {"error": f"No result within {self.request_timeout:g}s"}, {}
+        except HTTPError as e:
+            status, payload, headers = e.status, {"error": str(e)}, e.headers
+        except Exception as e:
+            status, payload, headers = 500, {"error": f"{type(e).__name__}: {e}"}, {}
+        self._record(route, status, time.perf_counter() - started, timed_out)
+        return status, payload, headers
+
+    def _release(self, future):
+        self._pending -= 1
+        # Retrieve the outcome of abandoned (timed out) work so it is not reported as never retrieved
+        if not future.cancelled():
+            future.exception()
+
+    async def _read_request(self, reader):
+        """Read one request, or return None when the client has closed the connection"""
+        request_line = await asyncio.wait_for(reader.readline(), API_KEEPALIVE_SECONDS)
+        if not request_line:
+            return None
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line") from None
+
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), API_KEEPALIVE_SECONDS)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "transfer-encoding" in headers:
+            # Chunked bodies are not decoded; reading on would treat the chunks as the next request
+            raise HTTPError(501, "Transfer-Encoding is not supported; send a Content-Length")
+        length = headers.get("content-length") or "0"
+        if not length.isdecimal():
+            raise HTTPError(400, "Content-Length must be a non-negative integer")
+        length = int(length)
+        if length > self.max_body_bytes:
+            raise HTTPError(413, f"Body larger than {self.max_body_bytes} bytes")
+        body = await asyncio.wait_for(reader.readexactly(length), self.request_timeout) if length else b""
+        url = urlsplit(target)
+        return Request(method.upper(), url.path.rstrip("/") or "/", url.query, version, headers, body)
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until it closes or asks not to be kept alive"""
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    await self._write(writer, e.status, {"error": str(e)}, {}, keep_alive=False)
+                    return
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                if request is None:
+                    return
+
+                keep_alive = (
+                    request.version == "HTTP/1.1"
+                    and request.headers.get("connection", "").lower() != "close"
+                )
+                status, payload, headers = await self.dispatch(request)
+                await self._write(writer, status, payload, headers, keep_alive)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def _write(self, writer, status, payload, headers, keep_alive):
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), PROMETHEUS_CONTENT_TYPE
+        else:
+            body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        lines = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+            *(f"{name}: {value}" for name, value in headers.items()),
+        ]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the medical assistant over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=API_MAX_WORKERS, help="worker threads for requests")
+    parser.add_argument("--max-pending", type=int, default=API_MAX_PENDING,
+                        help="requests queued or running before answering 503")
+    parser.add_argument("--timeout", type=float, default=API_REQUEST_TIMEOUT_SECONDS, help="seconds per request")
+    args = parser.parse_args(argv)
+
+    server = APIServer(max_workers=args.workers, max_pending=args.max_pending, request_timeout=args.timeout)
+    # Probe the backends in the background so routing skips ones that are down
+    get_health_prober()
+    print(f"Medical assistant API on http://{args.host}:{args.port} "
+          f"({args.workers} workers, {args.max_pending} pending, {args.timeout:g}s timeout)")
+    # The OCR pool starts with the first upload that needs OCR; say now if it cannot
+    try:
+        get_backend(OCR_BACKEND)
+    except OCRUnavailableError as e:
+        print(f"Images and PDFs without a text layer will get 503: {e}")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        get_health_prober().stop()
+        if get_ocr_pool.cache_info().currsize:
+            get_ocr_pool().shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value, now=None):
+    """
+    Parse a Retry-After header into seconds.
+
+    Accepts both the delay-seconds and HTTP-date forms; returns None when the
+    header is missing or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, retry_at.timestamp() - now)
+
+
+def server_retry_hint(response):
+    """
+    Return how long the server asked us to wait, in seconds, or None.
+
+    Uses the Retry-After header when present, otherwise the estimated_time
+    field Hugging Face includes in 503 "model is loading" responses.
+    """
+    hint = parse_retry_after(response.headers.get("Retry-After"))
+    if hint is not None:
+        return hint
+
+    if response.status_code == 503:
+        try:
+            estimated_time = response.json().get("estimated_time")
+        except (ValueError, AttributeError):
+            return None
+        if isinstance(estimated_time, (int, float)) and estimated_time >= 0:
+            return float(estimated_time)
+    return None
+
+
+def compute_backoff(attempt, base=1.0, cap=20.0, server_hint=None, rng=random.random):
+    """
+    Return the delay before retry number attempt (0-based).
+
+    Without a server hint this is "full jitter" exponential backoff: a random
+    delay between 0 and min(cap, base * 2**attempt). With a hint the server's
+    delay is honoured, plus up to 10% jitter so that many clients do not retry
+    at the same instant. Callers decide whether a hinted delay is too long to
+    wait for.
+    """
+    if server_hint is not None:
+        return server_hint * (1.0 + 0.1 * rng())
+    return rng() * min(cap, base * (2 ** attempt))
@@ -0,0 +1,312 @@
+"""
+Analyze a batch of prescription scans without the UI.
+
+    python -m clinic.batch_analyze scans/ -o results.jsonl
+    python -m clinic.batch_analyze manifest.txt --analysis-workers 8
+    python -m clinic.batch_analyze scans/ --no-analysis      # extraction and local checks only
+
+Each image or PDF goes through the same pipeline as the sidebar "Analyze
+Prescription" button: OCR or PDF extraction, local parsing with interaction
+and dose checks, then a Palmyra-Med analysis. Extraction runs on a pool of
+threads feeding the shared OCR process pool, and model calls on a separate
+thread pool, so slow API calls never hold up OCR. One JSON line is written
+per file as it finishes, followed by a per-stage throughput and latency
+summary.
+
+A manifest is a text file with one path per line (relative to the manifest;
+blank lines and lines starting with # are ignored).
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
+from clinic import palmyra
+from clinic.dose_check import DoseChecker
+from clinic.http_client import PooledHTTPClient
+from clinic.interactions import InteractionChecker
+from clinic.ocr import OCRPool, OCRUnavailableError, get_backend
+from clinic.prescription_analysis import (
+    build_prescription_prompt, check_prescription_text, extract_prescription_text, findings_as_dict, format_findings
+)
+from clinic.prescription_image import content_hash
+
+PRESCRIPTION_EXTENSIONS = (".jpg", ".jpeg", ".png", ".pdf")
+
+STAGES = ("extract", "check", "analyze")
+
+
+def find_prescriptions(source):
+    """Paths of the prescriptions in a directory (searched recursively) or listed in a manifest file"""
+    if os.path.isdir(source):
+        paths = []
+        for directory, _, names in os.walk(source):
+            paths.extend(
+                os.path.join(directory, name) for name in names
+                if name.lower().endswith(PRESCRIPTION_EXTENSIONS)
+            )
+        return sorted(paths)
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [os.path.join(base, line) for line in lines if line and not line.startswith("#")]
+
+
+def extract_text(path, get_ocr_pool):
+    """ExtractedText of a prescription image or PDF"""
+    with open(path, "rb") as f:
+        return extract_prescription_text(f.read(), get_ocr_pool, is_pdf=path.lower().endswith(".pdf"))
+
+
+class StageTimer:
+    """Thread-safe record of how long each item spent in each pipeline stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seconds = {stage: [] for stage in STAGES}
+        self._errors = dict.fromkeys(STAGES, 0)
+        self._window = {}
+
+    def record(self, stage, started, finished, failed=False):
+        with self._lock:
+            self._seconds[stage].append(finished - started)
+            if failed:
+                self._errors[stage] += 1
+            first, last = self._window.get(stage, (started, finished))
+            self._window[stage] = (min(first, started), max(last, finished))
+
+    def summary(self):
+        """Per-stage count, errors, throughput over the stage's active window and latency percentiles"""
+        with self._lock:
+            rows = {}
+            for stage in STAGES:
+                seconds = sorted(self._seconds[stage])
+                if not seconds:
+                    continue
+                first, last = self._window[stage]
+                rows[stage] = {
+                    "count": len(seconds),
+                    "errors": self._errors[stage],
+                    "per_second": len(seconds) / max(last - first, 1e-9),
+                    "p50": _percentile(seconds, 50),
+                    "p95": _percentile(seconds, 95),
+                    "max": seconds[-1],
+                }
+            return rows
+
+
+def _percentile(sorted_values, percent):
+    # Nearest-rank percentile
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class BatchAnalyzer:
+    """
+    Run prescriptions through extraction, local checks and model analysis.
+
+    extract_workers threads hand pages to the OCR process pool, so up to
+    that many documents are being read at once; as each document is
+    checked, its model call is queued on analysis_workers separate threads.
+    Identical files are processed only once. make_ocr_pool is called to
+    start the OCR pool when the first image or scanned page needs it.
+    """
+
+    def __init__(self, make_ocr_pool, client, extract_workers=4, analysis_workers=4, analyze=True):
+        self._make_ocr_pool = make_ocr_pool
+        self._ocr_pool = None
+        self._ocr_lock = threading.Lock()
+        self.client = client
+        self.analyze = analyze
+        self.interaction_checker = InteractionChecker.from_files()
+        self.dose_checker = DoseChecker.from_file(resolve=self.interaction_checker.resolve)
+        self.timer = StageTimer()
+        self._extract_pool = ThreadPoolExecutor(max_workers=extract_workers, thread_name_prefix="extract")
+        self._analysis_pool = ThreadPoolExecutor(max_workers=analysis_workers, thread_name_prefix="analyze")
+
+    def get_ocr_pool(self):
+        """Return the OCR pool, created when the first document needs OCR"""
+        with self._ocr_lock:
+            if self._ocr_pool is None:
+                self._ocr_pool = self._make_ocr_pool()
+            return self._ocr_pool
+
+    def _timed(self, stage, seconds, fn, *args):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = fn(*args)
+            failed = False
+            return result
+        finally:
+            finished = time.perf_counter()
+            seconds[stage] = finished - started
+            self.timer.record(stage, started, finished, failed=failed)
+
+    def _extract_and_check(self, path):
+        seconds = {}
+        text, ocr_backend = self._timed("extract", seconds, extract_text, path, self.get_ocr_pool)
+        findings = self._timed("check", seconds, check_prescription_text, text, self.interaction_checker, self.dose_checker)
+        result = {"text": text, **findings_as_dict(findings), "seconds": seconds}
+        if ocr_backend is not None:
+            result["ocr_backend"] = ocr_backend
+        return result, text, findings
+
+    def _analyze(self, result, text, findings):
+        started = time.perf_counter()
+        analysis = palmyra.call_palmyra_api(build_prescription_prompt(text, findings), self.client)
+        finished = time.perf_counter()
+        result["analysis_failed"] = palmyra.is_error_response(analysis)
+        self.timer.record("analyze", started, finished, failed=result["analysis_failed"])
+        result["seconds"]["analyze"] = finished - started
+        findings_markdown = format_findings(findings)
+        result["analysis"] = f"{findings_markdown}\n\n{analysis}" if findings_markdown else analysis
+        return result
+
+    def submit(self, path):
+        """Start processing a file; returns a Future for its result dict"""
+        done = futures.Future()
+
+        def extracted(future):
+            try:
+                result, text, findings = future.result()
+            except Exception as e:
+                done.set_exception(e)
+                return
+            if not self.analyze:
+                done.set_result(result)
+                return
+            self._analysis_pool.submit(self._analyze, result, text, findings).add_done_callback(analyzed)
+
+        def analyzed(future):
+            if future.exception() is not None:
+                done.set_exception(future.exception())
+            else:
+                done.set_result(future.result())
+
+        self._extract_pool.submit(self._extract_and_check, path).add_done_callback(extracted)
+        return done
+
+    def run(self, paths):
+        """Yield a JSON-ready record for every path, in the order they finish"""
+        paths_by_future = {}
+        by_digest = {}
+        for path in paths:
+            try:
+                digest = _file_hash(path)
+            except OSError as e:
+                yield {"file": path, "error": f"{type(e).__name__}: {e}"}
+                continue
+            # Duplicate scans share the first one's work
+            future = by_digest.get(digest)
+            if future is None:
+                future = by_digest[digest] = self.submit(path)
+            paths_by_future.setdefault(future, []).append((path, digest))
+
+        for future in futures.as_completed(paths_by_future):
+            for path, digest in paths_by_future[future]:
+                record = {"file": path, "sha256": digest}
+                try:
+                    record.update(future.result())
+                except Exception as e:
+                    record["error"] = f"{type(e).__name__}: {e}"
+                yield record
+
+    def shutdown(self):
+        self._extract_pool.shutdown(cancel_futures=True)
+        self._analysis_pool.shutdown(cancel_futures=True)
+        if self._ocr_pool is not None:
+            self._ocr_pool.shutdown()
+
+
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return content_hash(f.read())
+
+
+def print_summary(summary, files, wall_seconds, out=sys.stdout):
+    """Print the per-stage throughput and latency table"""
+    print(f"\n{files} files in {wall_seconds:.1f}s ({files / max(wall_seconds, 1e-9):.2f} files/s)", file=out)
+    print(f"{'stage':<8} {'count':>6} {'errors':>6} {'per sec':>9} {'p50 s':>8} {'p95 s':>8} {'max s':>8}", file=out)
+    for stage, row in summary.items():
+        print(
+            f"{stage:<8} {row['count']:>6} {row['errors']:>6} {row['per_second']:>9.2f} "
+            f"{row['p50']:>8.3f} {row['p95']:>8.3f} {row['max']:>8.3f}",
+            file=out
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a directory or manifest of prescription images and PDFs")
+    parser.add_argument("source", help="directory of prescriptions, or a manifest file listing them")
+    parser.add_argument("-o", "--output", default="prescription_results.jsonl", help="JSONL results file")
+    parser.add_argument("--extract-workers", type=int, default=None,
+                        help="documents read at once (default: one per OCR worker)")
+    parser.add_argument("--analysis-workers", type=int, default=4, help="concurrent Palmyra-Med calls")
+    parser.add_argument("--ocr-backend", default=os.environ.get("OCR_BACKEND", "auto"))
+    parser.add_argument("--ocr-workers", type=int, default=None, help="OCR processes (default: one per core)")
+    parser.add_argument("--ocr-timeout", type=float, default=60.0, help="seconds allowed to OCR one document")
+    parser.add_argument("--no-analysis", action="store_true", help="skip the Palmyra-Med analysis")
+    args = parser.parse_args(argv)
+
+    paths = find_prescriptions(args.source)
+    if not paths:
+        parser.error(f"no prescriptions found in {args.source}")
+
+    # Only images and scanned PDF pages need OCR, so a missing backend is not fatal
+    try:
+        get_backend(args.ocr_backend)
+    except ValueError as e:
+        parser.error(str(e))
+    except OCRUnavailableError as e:
+        print(f"Images and PDFs without a text layer will fail: {e}", file=sys.stderr)
+
+    ocr_workers = args.ocr_workers or os.cpu_count() or 1
+    extract_workers = args.extract_workers or ocr_workers
+
+    def make_ocr_pool():
+        # Every document being read may have a page in flight on every OCR worker
+        return OCRPool(
+            backend=get_backend(args.ocr_backend), max_workers=ocr_workers,
+            max_pending_pages=extract_workers * ocr_workers, timeout=args.ocr_timeout
+        )
+
+    client = PooledHTTPClient(
+        pool_maxsize=args.analysis_workers,
+        host_pool_sizes=dict.fromkeys(palmyra.HTTP_HOST_POOL_SIZES, args.analysis_workers),
+        connect_timeout=palmyra.HTTP_CONNECT_TIMEOUT,
+        read_timeout=palmyra.HTTP_READ_TIMEOUT
+    )
+    analyzer = BatchAnalyzer(
+        make_ocr_pool, client, extract_workers=extract_workers,
+        analysis_workers=args.analysis_workers, analyze=not args.no_analysis
+    )
+
+    print(f"Analyzing {len(paths)} files with {extract_workers} extract workers, "
+          f"{ocr_workers} OCR processes ({args.ocr_backend}) and "
+          f"{0 if args.no_analysis else args.analysis_workers} analysis workers")
+    started = time.perf_counter()
+    failed = 0
+    try:
+        with open(args.output, "w", encoding="utf-8") as out:
+            for done, record in enumerate(analyzer.run(paths), 1):
+                failed += "error" in record
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                print(f"\r{done}/{len(paths)} done, {failed} failed", end="", file=sys.stderr, flush=True)
+        print(file=sys.stderr)
+    finally:
+        analyzer.shutdown()
+        client.close()
+
+    print(f"Wrote {args.output}")
+    print_summary(analyzer.timer.summary(), len(paths), time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
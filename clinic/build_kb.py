@@ -0,0 +1,37 @@
+"""
+Compile the markdown knowledge base into the memory-mapped format.
+
+    python -m clinic.build_kb                       # data/knowledge_base -> data/medical_kb.mkb
+    python -m clinic.build_kb my_entries/ -o my.mkb
+"""
+import argparse
+import time
+
+from clinic.kb_format import DEFAULT_KB_PATH, DEFAULT_SOURCE_DIR, KnowledgeBaseFile, build_knowledge_base
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile markdown knowledge base entries into a .mkb file")
+    parser.add_argument("source_dir", nargs="?", default=DEFAULT_SOURCE_DIR, help="directory of *.md entries")
+    parser.add_argument("-o", "--output", default=DEFAULT_KB_PATH, help="output .mkb file")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    summary = build_knowledge_base(args.source_dir, args.output)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    KnowledgeBaseFile(args.output)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    ratio = summary["compressed_body_bytes"] / summary["body_bytes"] if summary["body_bytes"] else 0.0
+    print(f"Wrote {args.output} in {build_seconds:.2f}s")
+    print(f"  {summary['topics']} topics, {summary['sections']} sections, "
+          f"{summary['terms']} terms, {summary['postings']} postings")
+    print(f"  bodies {summary['body_bytes']} -> {summary['compressed_body_bytes']} bytes ({ratio:.0%}), "
+          f"file {summary['file_bytes']} bytes")
+    print(f"  opens in {load_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
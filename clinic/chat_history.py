@@ -0,0 +1,17 @@
+def history_start(messages, turns):
+    """
+    Index of the first message in the last `turns` turns of a chat history.
+
+    A turn starts at a user message and runs to the next one. Only the tail of
+    the history is scanned, so the cost depends on what is shown rather than
+    on the length of the session.
+    """
+    if turns <= 0:
+        return len(messages)
+    seen = 0
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index]["role"] == "user":
+            seen += 1
+            if seen == turns:
+                return index
+    return 0
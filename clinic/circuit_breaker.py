@@ -0,0 +1,146 @@
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker for one model endpoint.
+
+    After failure_threshold consecutive failures the breaker opens and every
+    request is refused for recovery_timeout seconds. It then goes half-open and
+    lets up to half_open_max_calls trial requests through: a success closes it
+    again, a failure re-opens it for another recovery_timeout.
+    """
+
+    def __init__(self, name, failure_threshold=3, recovery_timeout=30.0,
+                 half_open_max_calls=1, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._open_until = 0.0
+        self._half_open_calls = 0
+        self.total_failures = 0
+        self.total_successes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _refresh(self):
+        # Caller holds the lock
+        if self._state == OPEN and self._clock() >= self._open_until:
+            self._state = HALF_OPEN
+            self._half_open_calls = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def is_available(self):
+        """Return True if a request would currently be let through (without reserving it)"""
+        with self._lock:
+            self._refresh()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN:
+                return self._half_open_calls < self.half_open_max_calls
+            return False
+
+    def allow_request(self):
+        """Reserve permission for one request; every allowed request must be recorded"""
+        with self._lock:
+            self._refresh()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """Give back a request reserved with allow_request that ended with no outcome"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._half_open_calls:
+                self._half_open_calls -= 1
+
+    def record_success(self):
+        with self._lock:
+            self.total_successes += 1
+            self._consecutive_failures = 0
+            self._state = CLOSED
+            self._half_open_calls = 0
+
+    def record_failure(self, retry_after=None):
+        """
+        Record a failed request.
+
+        retry_after, when the server supplied one, extends how long the breaker
+        stays open once it trips.
+        """
+        with self._lock:
+            self.total_failures += 1
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._trip(max(self.recovery_timeout, retry_after or 0.0))
+
+    def _trip(self, duration):
+        # Caller holds the lock
+        now = self._clock()
+        if self._state != OPEN:
+            self.times_opened += 1
+        self._state = OPEN
+        self._opened_at = now
+        self._open_until = now + duration
+        self._half_open_calls = 0
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._half_open_calls = 0
+
+    def snapshot(self):
+        with self._lock:
+            self._refresh()
+            return {
+                "name": self.name,
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "retry_in_seconds": round(max(0.0, self._open_until - self._clock()), 1) if self._state == OPEN else 0.0,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "successes": self.total_successes,
+                "failures": self.total_failures,
+            }
+
+
+class CircuitBreakerRegistry:
+    """Lazily created circuit breakers, one per endpoint name, shared by all sessions"""
+
+    def __init__(self, **breaker_options):
+        self._breaker_options = breaker_options
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, **self._breaker_options)
+            return breaker
+
+    def snapshot(self):
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return [breaker.snapshot() for breaker in breakers]
@@ -0,0 +1,115 @@
+import functools
+import re
+from collections import namedtuple
+
+# Rough stand-in for a BPE tokenizer: short letter runs, up to three digits
+# or a single symbol per token. Close enough for budgeting, and needs no
+# tokenizer download.
+_TOKEN_PIECE = re.compile(r"[A-Za-z]{1,6}|\d{1,3}|[^\sA-Za-z\d]")
+
+# Markdown decoration stripped from answers before summarizing
+_MARKDOWN = re.compile(r"\*\*|__|`|^[ \t]*(?:#+|[-*]|\d+\.)[ \t]*", re.MULTILINE)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+PackedContext = namedtuple("PackedContext", "text tokens verbatim_turns summarized_turns dropped_turns")
+
+
+def estimate_tokens(text):
+    """Approximate the number of model tokens in text"""
+    return len(_TOKEN_PIECE.findall(text))
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text after roughly max_tokens tokens, marking the cut with an ellipsis"""
+    for count, piece in enumerate(_TOKEN_PIECE.finditer(text), 1):
+        if count > max_tokens:
+            return text[:piece.start()].rstrip() + "..."
+    return text
+
+
+@functools.lru_cache(maxsize=4096)
+def summarize_turn(question, answer, max_tokens=60):
+    """
+    Collapse one question/answer turn into a single line.
+
+    The summary is extractive: the question (shortened if long) and the
+    leading sentences of the answer, stripped of markdown. Results are cached,
+    so an older turn is summarized once however many requests include it.
+    """
+    question = truncate_to_tokens(" ".join(question.split()), max_tokens // 3)
+    remaining = max_tokens - estimate_tokens(question)
+
+    sentences = []
+    for sentence in _SENTENCE_END.split(_MARKDOWN.sub("", answer)):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        cost = estimate_tokens(sentence)
+        if cost > remaining:
+            if not sentences:
+                sentences.append(truncate_to_tokens(sentence, remaining))
+            break
+        sentences.append(sentence)
+        remaining -= cost
+    return f"Q: {question} A: {' '.join(sentences)}"
+
+
+def group_turns(messages):
+    """Group chat messages into (question, answer) turns; a turn starts at a user message"""
+    turns = []
+    for message in messages:
+        if message["role"] == "user" or not turns:
+            turns.append([message["content"] if message["role"] == "user" else "", ""])
+        else:
+            turns[-1][1] = (turns[-1][1] + "\n" + message["content"]).strip()
+    return [tuple(turn) for turn in turns]
+
+
+class ContextPacker:
+    """
+    Build the conversation context for a prompt within a token budget.
+
+    The most recent turns are kept verbatim; older turns are collapsed into
+    one-line summaries, newest first, until the budget runs out, and anything
+    older than that is dropped.
+    """
+
+    def __init__(self, recent_turns=3, summary_tokens=60, estimator=estimate_tokens):
+        self.recent_turns = recent_turns
+        self.summary_tokens = summary_tokens
+        self.estimate = estimator
+
+    def pack(self, messages, budget_tokens):
+        """Return a PackedContext for the chat history in messages"""
+        turns = group_turns(messages)
+        verbatim, summaries = [], []
+        remaining = budget_tokens
+        dropped = 0
+
+        for age, (question, answer) in enumerate(reversed(turns)):
+            # Once one turn has been summarized, everything older is too
+            if age < self.recent_turns and not summaries:
+                block = f"Medical professional: {question}\nAssistant: {answer}".strip()
+                cost = self.estimate(block)
+                if cost <= remaining:
+                    verbatim.append(block)
+                    remaining -= cost
+                    continue
+            # Older turns, and recent ones too long to fit, are summarized
+            summary = "- " + summarize_turn(question, answer, self.summary_tokens)
+            cost = self.estimate(summary)
+            if cost > remaining:
+                dropped = len(turns) - age
+                break
+            summaries.append(summary)
+            remaining -= cost
+
+        sections = []
+        if summaries:
+            sections.append("Summary of earlier conversation:\n" + "\n".join(reversed(summaries)))
+        if verbatim:
+            sections.append("Recent conversation:\n" + "\n\n".join(reversed(verbatim)))
+        return PackedContext(
+            "\n\n".join(sections), budget_tokens - remaining,
+            len(verbatim), len(summaries), dropped
+        )
@@ -0,0 +1,211 @@
+import csv
+import math
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from clinic.interactions import DRUG_DATA_DIR, normalize_drug_name
+
+DEFAULT_DOSE_RANGES_PATH = os.path.join(DRUG_DATA_DIR, "dose_ranges.csv")
+
+# Reference doses are given per day or per week
+_PERIOD_DAYS = {"day": 1, "week": 7}
+
+# Mass units convert to the reference unit; any other unit must match it exactly
+_MASS_IN_MG = {"mg": 1.0, "mcg": 0.001, "g": 1000.0}
+_UNIT_ALIASES = {"unit": "units", "iu": "units", "µg": "mcg"}
+
+# Issues a dose check can report
+ABOVE_RANGE = "above range"
+BELOW_RANGE = "below range"
+FREQUENCY = "unusual frequency"
+
+# daily_dose is None when the frequency is unknown or as needed; min_daily and
+# max_daily are None when the drug has no reference range (not checked)
+DoseCheck = namedtuple("DoseCheck", "drug route daily_dose unit min_daily max_daily per_day issues")
+
+
+def _normalize_unit(unit):
+    unit = (unit or "").lower()
+    return _UNIT_ALIASES.get(unit, unit)
+
+
+def _unit_factor(unit, reference_unit):
+    # Multiplier from a prescribed unit to the reference unit, or NaN if they do not convert
+    if unit == reference_unit:
+        return 1.0
+    if unit in _MASS_IN_MG and reference_unit in _MASS_IN_MG:
+        return _MASS_IN_MG[unit] / _MASS_IN_MG[reference_unit]
+    return np.nan
+
+
+class DoseChecker:
+    """
+    Check prescribed doses against reference daily ranges.
+
+    The reference table is held column-wise in NumPy arrays (one row per drug
+    and route). Checking a batch looks up each medication's row, then
+    computes daily doses and compares them with the ranges and usual
+    administrations per day for every medication at once.
+    """
+
+    def __init__(self, rows, resolve=normalize_drug_name):
+        # rows: (drug, route, unit, min_daily, max_daily, min_per_day, max_per_day, period_days)
+        rows = list(rows)
+        self._resolve = resolve
+        self._row_of = {}
+        # A medication without a route is checked against its drug's first listed route
+        self._default_row = {}
+        self._row_cache = {}
+        for index, (drug, route, unit, *_) in enumerate(rows):
+            drug = normalize_drug_name(drug)
+            self._row_of[drug, route.upper()] = index
+            self._default_row.setdefault(drug, index)
+
+        self.drugs = np.array([normalize_drug_name(row[0]) for row in rows], dtype=object)
+        self.routes = np.array([row[1].upper() for row in rows], dtype=object)
+        self.units = np.array([_normalize_unit(row[2]) for row in rows], dtype=object)
+        self.min_daily = np.array([row[3] for row in rows], dtype=np.float64)
+        self.max_daily = np.array([row[4] for row in rows], dtype=np.float64)
+        self.min_per_day = np.array([row[5] for row in rows], dtype=np.float64)
+        self.max_per_day = np.array([row[6] for row in rows], dtype=np.float64)
+        # Ranges are stored per day but reported per period, e.g. per week for weekly drugs
+        self.period_days = np.array([row[7] for row in rows], dtype=np.int64)
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_DOSE_RANGES_PATH, resolve=normalize_drug_name):
+        """
+        Build a checker from the dose range CSV.
+
+        resolve maps a prescribed drug name to the canonical name used in the
+        file, e.g. InteractionChecker.resolve so brand names are recognized.
+        """
+        rows = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                days = _PERIOD_DAYS[row["per"]]
+                rows.append((
+                    row["drug"], row["route"], row["unit"],
+                    float(row["min_dose"]) / days, float(row["max_dose"]) / days,
+                    float(row["min_times"]) / days, float(row["max_times"]) / days, days,
+                ))
+        return cls(rows, resolve)
+
+    def _find_row(self, medication):
+        key = (medication.drug, medication.route)
+        row = self._row_cache.get(key)
+        if row is None:
+            drug = self._resolve(medication.drug)
+            row = self._row_of.get((drug, medication.route), self._default_row.get(drug, -1))
+            # Prescriptions repeat a small set of drug names, so resolve each only once
+            if len(self._row_cache) < 100000:
+                self._row_cache[key] = row
+        return row
+
+    def check(self, medications):
+        """Return a DoseCheck for each Medication in a prescription"""
+        return self.check_batch([medications])[0]
+
+    def check_batch(self, prescriptions):
+        """Check several prescriptions (lists of Medication) in one pass; returns a list of DoseCheck lists"""
+        medications = [medication for prescription in prescriptions for medication in prescription]
+        count = len(medications)
+        rows = np.fromiter((self._find_row(medication) for medication in medications), dtype=np.int64, count=count)
+        known = rows >= 0
+        safe_rows = np.where(known, rows, 0)
+
+        strength = np.fromiter((medication.strength for medication in medications), dtype=np.float64, count=count)
+        dose = np.fromiter((medication.dose for medication in medications), dtype=np.float64, count=count)
+        per_day = np.fromiter(
+            (np.nan if medication.per_day is None else medication.per_day for medication in medications),
+            dtype=np.float64, count=count
+        )
+        factor = np.fromiter(
+            (_unit_factor(_normalize_unit(medication.unit), unit)
+             for medication, unit in zip(medications, self.units[safe_rows])),
+            dtype=np.float64, count=count
+        )
+
+        amount = strength * dose * factor
+        daily = amount * per_day
+        min_daily = np.where(known, self.min_daily[safe_rows], np.nan)
+        max_daily = np.where(known, self.max_daily[safe_rows], np.nan)
+
+        # Comparisons with NaN are False, so unknown drugs, units that do not
+        # convert and as-needed doses raise no flag they cannot support.
+        # A single dose can never be more than the whole period's maximum, even when taken as needed
+        above = (daily > max_daily) | (amount > max_daily * self.period_days[safe_rows])
+        below = daily < min_daily
+        # Allow for rounding in "every 8 hours" and per-week schedules
+        unusual_frequency = (per_day < self.min_per_day[safe_rows] * 0.99) | (per_day > self.max_per_day[safe_rows] * 1.01)
+        unusual_frequency &= known
+        # Only flagged medications need their messages worded
+        flagged = above | below | unusual_frequency | (known & (np.isnan(amount) | np.isnan(per_day)))
+
+        # Plain Python values from here on; per-element NumPy scalars are slow
+        rows, daily, per_day = rows.tolist(), daily.tolist(), per_day.tolist()
+        min_daily, max_daily = min_daily.tolist(), max_daily.tolist()
+        routes = self.routes[safe_rows].tolist()
+        units = self.units[safe_rows].tolist()
+        checks = []
+        for index, medication in enumerate(medications):
+            if rows[index] < 0:
+                checks.append(DoseCheck(medication.drug, medication.route, None, medication.unit, None, None, None, ()))
+                continue
+            issues = self._issues(medication, rows[index], amount[index], daily[index],
+                                  above[index], below[index], unusual_frequency[index]) if flagged[index] else ()
+            checks.append(DoseCheck(
+                medication.drug, medication.route or routes[index],
+                None if math.isnan(daily[index]) else daily[index], units[index],
+                min_daily[index], max_daily[index],
+                None if math.isnan(per_day[index]) else per_day[index], issues
+            ))
+
+        results, offset = [], 0
+        for prescription in prescriptions:
+            results.append(checks[offset:offset + len(prescription)])
+            offset += len(prescription)
+        return results
+
+    def _issues(self, medication, row, amount, daily, above, below, unusual_frequency):
+        unit = self.units[row]
+        period = int(self.period_days[row])
+
+        def per_period(value):
+            return _describe_amount(value, unit, period)
+
+        issues = []
+        if np.isnan(amount):
+            issues.append(f"dose in {medication.unit} cannot be compared with the reference range in {unit}")
+        elif above and np.isnan(daily):
+            issues.append(
+                f"{ABOVE_RANGE}: a single dose of {amount:g} {unit} exceeds the usual maximum of {per_period(self.max_daily[row])}"
+            )
+        elif above:
+            issues.append(f"{ABOVE_RANGE}: {per_period(daily)} exceeds the usual maximum of {per_period(self.max_daily[row])}")
+        elif below:
+            issues.append(f"{BELOW_RANGE}: {per_period(daily)} is under the usual minimum of {per_period(self.min_daily[row])}")
+        if unusual_frequency:
+            issues.append(
+                f"{FREQUENCY}: {medication.frequency} instead of the usual "
+                f"{_describe_schedule(self.min_per_day[row], self.max_per_day[row], period)}"
+            )
+        if medication.frequency is None and not issues:
+            issues.append("frequency not stated, so the daily dose was not checked")
+        return tuple(issues)
+
+
+def _describe_amount(per_day, unit, period):
+    if period == 7:
+        return f"{per_day * 7:g} {unit}/week"
+    return f"{per_day:g} {unit}/day"
+
+
+def _describe_schedule(min_per_day, max_per_day, period):
+    low, high = round(min_per_day * period, 2), round(max_per_day * period, 2)
+    if low == high:
+        times = {1: "once", 2: "twice"}.get(low, f"{low:g} times")
+    else:
+        times = f"{low:g}-{high:g} times"
+    return f"{times} a {'week' if period == 7 else 'day'}"
@@ -0,0 +1,172 @@
+import bisect
+import re
+from collections import namedtuple
+
+CRITICAL = "critical"
+URGENT = "urgent"
+
+_SEVERITY_RANK = {None: 0, URGENT: 1, CRITICAL: 2}
+
+# (label, severity, phrases). Every spelling variant is listed explicitly so the
+# phrases can be compiled into a single trie-shaped regex.
+EMERGENCY_PATTERNS = [
+    ("not breathing", CRITICAL, ["not breathing", "stopped breathing", "can't breathe", "cant breathe",
+                                 "cannot breathe", "unable to breathe"]),
+    ("heart attack", CRITICAL, ["heart attack", "myocardial infarction", "cardiac arrest"]),
+    ("stroke", CRITICAL, ["stroke", "strokes"]),
+    ("seizure", CRITICAL, ["seizure", "seizures", "seizing", "convulsion", "convulsions", "convulsing"]),
+    ("unconscious", CRITICAL, ["unconscious", "unresponsive"]),
+    ("suicide", CRITICAL, ["suicide", "suicidal", "kill myself", "kill himself", "kill herself", "kill themselves"]),
+    ("hemorrhage", CRITICAL, ["hemorrhage", "hemorrhages", "hemorrhaging",
+                              "haemorrhage", "haemorrhages", "haemorrhaging"]),
+    ("severe bleeding", CRITICAL, ["bleeding severely", "bleeding heavily", "bleeding profusely",
+                                   "bleeding uncontrollably", "severe bleeding", "heavy bleeding",
+                                   "profuse bleeding", "uncontrolled bleeding", "massive bleeding"]),
+    ("overdose", CRITICAL, ["overdose", "overdosed", "overdosing"]),
+    ("anaphylaxis", CRITICAL, ["anaphylaxis", "anaphylactic"]),
+    ("emergency", URGENT, ["emergency", "emergencies"]),
+    ("urgent", URGENT, ["urgent", "urgently"]),
+    ("critical", URGENT, ["critical", "critically"]),
+    ("life-threatening", URGENT, ["life-threatening", "life threatening"]),
+    ("severe", URGENT, ["severe", "severely"]),
+]
+
+
+def _trie_regex(phrases):
+    """
+    Compile phrases into one regex shaped like a trie.
+
+    Shared prefixes are matched once, so the engine tests a single character
+    per position instead of retrying every alternative. Longer phrases win
+    over their prefixes ("severe bleeding" over "severe"), and a space matches
+    any run of whitespace.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node):
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + emit(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        body = "(?:" + "|".join(branches) + ")" if len(branches) > 1 or "" in node else branches[0]
+        return body + "?" if "" in node else body
+
+    first_chars = "".join(sorted({re.escape(phrase[0]) for phrase in phrases}))
+    # The leading lookahead lets the engine skip positions that cannot start a phrase
+    return re.compile(rf"(?=[{first_chars}])\b{emit(trie)}\b")
+
+
+# Words that negate a following finding ("no chest pain", "denies seizure")
+NEGATION_CUES = r"no|not|nothing|none|denies|denied|deny|denying|without|never|negative for|free of|absence of|absent|ruled out|rules out"
+
+# Words that may stand between a cue and the finding it negates ("no history
+# of stroke", "denies any seizures")
+NEGATION_FILLERS = r"a|an|any|the|further|recent|active|new|prior|previous|known|history|signs?|evidence|symptoms?|of"
+
+# A cue only negates a finding it directly governs: at most two filler words
+# in between, so any other word ("no fever now having seizures", "could not
+# stop the bleeding heavily") or punctuation ends its scope. Missing a
+# negation raises a needless alert; over-reaching one would hide an emergency.
+_NEGATED_TAIL = re.compile(rf"\b(?:{NEGATION_CUES})\b(?:\s+(?:{NEGATION_FILLERS})){{0,2}}\s*$")
+
+EmergencyMatch = namedtuple("EmergencyMatch", "label severity start end text negated")
+# negated_critical lists the labels of critical findings that were mentioned
+# but negated, so they can be shown for review instead of being dropped
+EmergencyAssessment = namedtuple("EmergencyAssessment", "is_emergency severity matches negated_critical")
+
+# Separator used when screening a batch in one pass; it also ends any negation scope
+_BATCH_SEPARATOR = "\n\0\n"
+
+
+class EmergencyDetector:
+    """
+    Compiled single-pass emergency detector.
+
+    All phrases are combined into one trie-shaped regex, so a message is
+    lowercased once and scanned once regardless of how many phrases there
+    are. Each hit is checked for a negation cue directly before it.
+    """
+
+    def __init__(self, patterns=EMERGENCY_PATTERNS, negation_window=40):
+        self.patterns = list(patterns)
+        # Characters of context searched for a negation cue before each hit
+        self.negation_window = negation_window
+        self._phrases = {
+            phrase: (label, severity)
+            for label, severity, phrases in self.patterns
+            for phrase in phrases
+        }
+        self._regex = _trie_regex(self._phrases)
+
+    def _match(self, text, match, floor=0):
+        phrase = match.group(0)
+        label, severity = self._phrases.get(phrase) or self._phrases[" ".join(phrase.split())]
+        begin = max(floor, match.start() - self.negation_window)
+        window = text[begin:match.start()]
+        if begin > floor:
+            # Drop the word cut in half by the window edge
+            window = window.partition(" ")[2]
+        return EmergencyMatch(
+            label, severity, match.start() - floor, match.end() - floor,
+            phrase, _NEGATED_TAIL.search(window) is not None
+        )
+
+    @staticmethod
+    def _assess(matches):
+        severity = None
+        negated_critical = []
+        for match in matches:
+            if match.negated:
+                if match.severity == CRITICAL and match.label not in negated_critical:
+                    negated_critical.append(match.label)
+            elif _SEVERITY_RANK[match.severity] > _SEVERITY_RANK[severity]:
+                severity = match.severity
+        return EmergencyAssessment(severity is not None, severity, matches, negated_critical)
+
+    def detect(self, text):
+        """Assess one message; negated findings do not raise an alert but critical ones are listed for review"""
+        text = text.lower()
+        return self._assess([self._match(text, match) for match in self._regex.finditer(text)])
+
+    def detect_batch(self, texts):
+        """
+        Assess many messages in one regex pass.
+
+        The texts are joined with a separator, lowercased and scanned once;
+        each hit is assigned back to its message by binary search over the
+        start offsets.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+
+        starts, offset = [], 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + len(_BATCH_SEPARATOR)
+        joined = _BATCH_SEPARATOR.join(texts).lower()
+
+        per_text = [[] for _ in texts]
+        for match in self._regex.finditer(joined):
+            index = bisect.bisect_right(starts, match.start()) - 1
+            per_text[index].append(self._match(joined, match, starts[index]))
+        return [self._assess(matches) for matches in per_text]
+
+
+# Compiled once at import time and shared by every session
+DEFAULT_DETECTOR = EmergencyDetector()
+
+
+def detect(text):
+    return DEFAULT_DETECTOR.detect(text)
+
+
+def detect_batch(texts):
+    return DEFAULT_DETECTOR.detect_batch(texts)
@@ -0,0 +1,135 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class ExecutorBusyError(Exception):
+    """Raised when the executor already has its maximum number of unfinished jobs"""
+
+
+class QueryJob:
+    """
+    Handle for a query running in the background.
+
+    The worker can publish partial output with append_text, so a page can show
+    a streamed answer while it is still being generated.
+    """
+
+    def __init__(self, job_id, description=""):
+        self.id = job_id
+        self.description = description
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.partial_text = ""
+        self.future = None
+
+    @property
+    def status(self):
+        if self.future is None or self.started_at is None:
+            return QUEUED
+        if not self.future.done():
+            return RUNNING
+        return FAILED if self.future.exception() is not None else DONE
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def result(self, timeout=None):
+        """Return the job's result, waiting up to timeout seconds; re-raises the job's exception"""
+        return self.future.result(timeout)
+
+    def append_text(self, chunk):
+        # A single reference assignment, so readers on other threads always see a whole string
+        self.partial_text = self.partial_text + chunk
+
+    @property
+    def elapsed(self):
+        start = self.started_at or self.submitted_at
+        return (self.finished_at or time.time()) - start
+
+
+class QueryExecutor:
+    """
+    Shared background executor for LLM queries.
+
+    max_workers caps how many queries run (and so how many upstream requests
+    are in flight) across the whole server; further jobs wait in the queue, up
+    to max_pending unfinished jobs. Finished jobs stay retrievable by id until
+    they are collected with pop or expire after job_ttl_seconds.
+    """
+
+    def __init__(self, max_workers=4, max_pending=64, job_ttl_seconds=3600):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.job_ttl_seconds = job_ttl_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query")
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, fn, *args, description="", **kwargs):
+        """Run fn(job, *args, **kwargs) in the background and return its QueryJob"""
+        with self._lock:
+            self._expire_finished()
+            unfinished = sum(1 for job in self._jobs.values() if not job.done())
+            if unfinished >= self.max_pending:
+                raise ExecutorBusyError(f"{unfinished} queries are already waiting")
+
+            job = QueryJob(f"q{next(self._ids)}", description)
+            self._jobs[job.id] = job
+
+        def run():
+            job.started_at = time.time()
+            try:
+                return fn(job, *args, **kwargs)
+            finally:
+                job.finished_at = time.time()
+
+        job.future = self._pool.submit(run)
+        job.future.add_done_callback(self._record_outcome)
+        return job
+
+    def _record_outcome(self, future):
+        with self._lock:
+            if future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def _expire_finished(self):
+        # Caller holds the lock
+        cutoff = time.time() - self.job_ttl_seconds
+        stale = [job_id for job_id, job in self._jobs.items() if job.done() and job.finished_at and job.finished_at < cutoff]
+        for job_id in stale:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def pop(self, job_id):
+        """Remove and return a job once its result has been collected"""
+        with self._lock:
+            return self._jobs.pop(job_id, None)
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+            completed, failed = self.completed, self.failed
+        statuses = [job.status for job in jobs]
+        return {
+            "max_workers": self.max_workers,
+            "running": statuses.count(RUNNING),
+            "queued": statuses.count(QUEUED),
+            "completed": completed,
+            "failed": failed,
+        }
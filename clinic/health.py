@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# One health check of a backend; latency is in seconds and detail describes the outcome
+ProbeResult = namedtuple("ProbeResult", "checked_at ok latency detail")
+
+
+def _percentile(sorted_values, percent):
+    # Nearest-rank percentile
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class HealthProber:
+    """
+    Check backends periodically on a background thread.
+
+    probes maps a backend name to a callable returning (ok, detail); a probe
+    that raises counts as failed. Every round runs all probes at once and the
+    last history results per backend are kept. A backend is reported
+    unavailable after failure_threshold failed probes in a row, so one lost
+    probe does not take it out of rotation; a backend that has not been
+    probed yet counts as available.
+    """
+
+    def __init__(self, probes, interval=30.0, history=60, failure_threshold=2):
+        self.probes = dict(probes)
+        self.interval = interval
+        self.failure_threshold = failure_threshold
+        self._lock = threading.Lock()
+        self._history = {name: deque(maxlen=history) for name in self.probes}
+        self._pool = ThreadPoolExecutor(max_workers=max(len(self.probes), 1), thread_name_prefix="health")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start probing in the background; the first round runs straight away"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop probing, waiting for a round in progress to finish before the pool shuts down"""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe_all()
+            self._stop.wait(self.interval)
+
+    def _probe(self, name):
+        started = time.perf_counter()
+        try:
+            ok, detail = self.probes[name]()
+        except Exception as e:
+            ok, detail = False, f"{type(e).__name__}: {e}"
+        return ProbeResult(time.time(), bool(ok), time.perf_counter() - started, detail)
+
+    def probe_all(self):
+        """Probe every backend once, in parallel, and record the results; nothing once stopped"""
+        if self._stop.is_set():
+            return {}
+        results = dict(zip(self.probes, self._pool.map(self._probe, self.probes)))
+        with self._lock:
+            for name, result in results.items():
+                self._history[name].append(result)
+        return results
+
+    def _failing(self, history):
+        recent = list(history)[-self.failure_threshold:]
+        return len(recent) == self.failure_threshold and not any(result.ok for result in recent)
+
+    def is_available(self, name):
+        """False once the backend's latest failure_threshold probes have all failed"""
+        with self._lock:
+            history = self._history.get(name)
+            return not history or not self._failing(history)
+
+    def snapshot(self):
+        """Per-backend status row built from the rolling history, without probing"""
+        with self._lock:
+            histories = {name: list(history) for name, history in self._history.items()}
+        rows = {}
+        for name, history in histories.items():
+            if not history:
+                rows[name] = {"available": True, "checks": 0, "history": []}
+                continue
+            latencies = sorted(result.latency for result in history if result.ok)
+            failures = 0
+            for result in reversed(history):
+                if result.ok:
+                    break
+                failures += 1
+            rows[name] = {
+                "available": not self._failing(history),
+                "checks": len(history),
+                "availability": sum(result.ok for result in history) / len(history),
+                "p50_seconds": _percentile(latencies, 50) if latencies else None,
+                "p95_seconds": _percentile(latencies, 95) if latencies else None,
+                "consecutive_failures": failures,
+                "last_checked": history[-1].checked_at,
+                "last_detail": history[-1].detail,
+                "history": history,
+            }
+        return rows
@@ -0,0 +1,53 @@
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+def run_hedged(calls, hedge_delay, executor):
+    """
+    Race a list of calls, starting each backup only when the earlier ones are slow.
+
+    Every call receives a threading.Event that is set once a winner is found,
+    and returns a result or None on failure. The first call starts at once;
+    the next one starts after hedge_delay seconds without a good answer, or
+    immediately when an earlier call fails. A hedge_delay of 0 starts every
+    call at the same time.
+
+    Returns (index, result) for the first call that produced a result, or
+    (None, None) when all of them failed. Slower calls are told to stop via
+    the event and their results are ignored.
+    """
+    cancel_event = threading.Event()
+    pending = {}
+    next_index = 0
+
+    def launch_next():
+        nonlocal next_index
+        future = executor.submit(calls[next_index], cancel_event)
+        pending[future] = next_index
+        next_index += 1
+
+    try:
+        launch_next()
+        while hedge_delay <= 0 and next_index < len(calls):
+            launch_next()
+
+        while pending:
+            timeout = hedge_delay if next_index < len(calls) else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception:
+                    result = None
+                if result is not None:
+                    return index, result
+
+            # Hedge delay elapsed or a call failed: bring in the next backup
+            if next_index < len(calls):
+                launch_next()
+
+        return None, None
+    finally:
+        cancel_event.set()
@@ -0,0 +1,102 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class PooledHTTPClient:
+    """
+    Process-wide HTTP client with keep-alive connection pooling.
+
+    Wraps a single requests.Session so retries and model fallbacks reuse open
+    TCP/TLS connections instead of paying for a new handshake each time. Hosts
+    listed in host_pool_sizes get their own adapter with that many pooled
+    connections; every other host shares the default pool size.
+    """
+
+    def __init__(self, pool_maxsize=10, host_pool_sizes=None, connect_timeout=5.0,
+                 read_timeout=60.0, pool_block=False):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.session = requests.Session()
+        self._adapters = {}
+        self._lock = threading.Lock()
+        self._requests_by_host = {}
+        self._errors_by_host = {}
+
+        default_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.session.mount("https://", default_adapter)
+        self.session.mount("http://", default_adapter)
+        self._adapters["*"] = default_adapter
+
+        for host, size in (host_pool_sizes or {}).items():
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, pool_block=pool_block)
+            self.session.mount(f"https://{host}/", adapter)
+            self.session.mount(f"http://{host}/", adapter)
+            self._adapters[host] = adapter
+
+    def request(self, method, url, timeout=None, read_timeout=None, **kwargs):
+        """
+        Send a request through the shared session.
+
+        timeout follows requests' convention; when omitted the client's
+        (connect, read) pair is used, with read_timeout overriding the read half.
+        """
+        if timeout is None:
+            timeout = (self.connect_timeout, read_timeout if read_timeout is not None else self.read_timeout)
+
+        host = urlsplit(url).netloc
+        with self._lock:
+            self._requests_by_host[host] = self._requests_by_host.get(host, 0) + 1
+        try:
+            return self.session.request(method, url, timeout=timeout, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._errors_by_host[host] = self._errors_by_host.get(host, 0) + 1
+            raise
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def pool_stats(self):
+        """
+        Return one row per open connection pool.
+
+        connections_opened counts new TCP connections, so requests minus
+        connections_opened is the number of requests served on a reused one.
+        """
+        rows = []
+        for name, adapter in self._adapters.items():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None or pool.pool is None:
+                    continue
+                # The queue is pre-filled with None placeholders for unopened slots
+                idle = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+                rows.append({
+                    "adapter": name,
+                    "scheme": key.key_scheme,
+                    "host": key.key_host,
+                    "port": key.key_port,
+                    "max_size": pool.pool.maxsize,
+                    "idle_connections": idle,
+                    "connections_opened": pool.num_connections,
+                    "requests": pool.num_requests,
+                })
+        return rows
+
+    def request_stats(self):
+        """Return per-host request and error counts seen by this client"""
+        with self._lock:
+            return {
+                host: {"requests": count, "errors": self._errors_by_host.get(host, 0)}
+                for host, count in self._requests_by_host.items()
+            }
+
+    def close(self):
+        self.session.close()
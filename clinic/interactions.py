@@ -0,0 +1,137 @@
+import csv
+import os
+import re
+from collections import namedtuple
+
+from clinic.kb_format import DATA_DIR
+
+DRUG_DATA_DIR = os.path.join(DATA_DIR, "drugs")
+DEFAULT_DRUGS_PATH = os.path.join(DRUG_DATA_DIR, "drugs.csv")
+DEFAULT_INTERACTIONS_PATH = os.path.join(DRUG_DATA_DIR, "interactions.csv")
+
+# Most severe first
+SEVERITIES = ("contraindicated", "major", "moderate", "minor")
+_SEVERITY_RANK = {severity: rank for rank, severity in enumerate(SEVERITIES)}
+
+# Rules name a drug, or every drug in a class with the "class:" prefix
+CLASS_PREFIX = "class:"
+
+Interaction = namedtuple("Interaction", "drug_a drug_b severity mechanism management")
+InteractionReport = namedtuple("InteractionReport", "drugs interactions unrecognized")
+
+_NON_NAME = re.compile(r"[^a-z0-9-]+")
+
+
+def normalize_drug_name(name):
+    """Lowercase a drug name and reduce punctuation and spacing to single spaces"""
+    return " ".join(_NON_NAME.sub(" ", name.lower()).split())
+
+
+class InteractionChecker:
+    """
+    Offline drug-drug interaction lookup.
+
+    Names and aliases are normalized once, and class-level rules ("every
+    NSAID with every anticoagulant") are expanded into one entry per drug
+    pair when the checker is built. Checking a list of N drugs is then N
+    name lookups and N*(N-1)/2 dictionary lookups.
+    """
+
+    def __init__(self, drugs, rules):
+        # drugs: (name, classes, aliases); rules: (a, b, severity, mechanism, management)
+        self._names = {}
+        members = {}
+        for name, classes, aliases in drugs:
+            canonical = normalize_drug_name(name)
+            for alias in [canonical, *aliases]:
+                self._names[normalize_drug_name(alias)] = canonical
+            for drug_class in classes:
+                members.setdefault(drug_class, set()).add(canonical)
+        self._longest_name = max((len(name.split()) for name in self._names), default=0)
+
+        def expand(side):
+            if side.startswith(CLASS_PREFIX):
+                drug_class = side[len(CLASS_PREFIX):]
+                if drug_class not in members:
+                    raise ValueError(f"Interaction rule names unknown drug class {drug_class!r}")
+                return members[drug_class]
+            canonical = self._names.get(normalize_drug_name(side))
+            if canonical is None:
+                raise ValueError(f"Interaction rule names unknown drug {side!r}")
+            return {canonical}
+
+        self._pairs = {}
+        for a, b, severity, mechanism, management in rules:
+            if severity not in _SEVERITY_RANK:
+                raise ValueError(f"Unknown interaction severity {severity!r}")
+            for drug_a in expand(a):
+                for drug_b in expand(b):
+                    if drug_a == drug_b:
+                        continue
+                    key = (drug_a, drug_b) if drug_a < drug_b else (drug_b, drug_a)
+                    existing = self._pairs.get(key)
+                    # A specific rule and a class rule can cover the same pair; keep the more severe
+                    if existing is None or _SEVERITY_RANK[severity] < _SEVERITY_RANK[existing.severity]:
+                        self._pairs[key] = Interaction(*key, severity, mechanism, management)
+
+    @classmethod
+    def from_files(cls, drugs_path=DEFAULT_DRUGS_PATH, interactions_path=DEFAULT_INTERACTIONS_PATH):
+        """Build a checker from the drug and interaction CSV files"""
+        with open(drugs_path, newline="", encoding="utf-8") as f:
+            drugs = [
+                (row["drug"], _split_list(row["classes"]), _split_list(row["aliases"]))
+                for row in csv.DictReader(f)
+            ]
+        with open(interactions_path, newline="", encoding="utf-8") as f:
+            rules = [
+                (row["drug_a"], row["drug_b"], row["severity"], row["mechanism"], row["management"])
+                for row in csv.DictReader(f)
+            ]
+        return cls(drugs, rules)
+
+    @property
+    def pair_count(self):
+        return len(self._pairs)
+
+    def resolve(self, name):
+        """
+        Canonical name for a drug as written on a prescription, or None.
+
+        Trailing words are dropped until a known name is left, so salts and
+        release forms ("Metoprolol Succinate ER") resolve to the drug.
+        """
+        words = normalize_drug_name(name).split()
+        for length in range(min(len(words), self._longest_name), 0, -1):
+            canonical = self._names.get(" ".join(words[:length]))
+            if canonical is not None:
+                return canonical
+        return None
+
+    def check(self, names):
+        """
+        Find every known interaction among the named drugs.
+
+        Returns an InteractionReport with the recognized canonical names,
+        the interactions (most severe first) and the names that could not be
+        recognized and so were not checked.
+        """
+        drugs, unrecognized = [], []
+        for name in names:
+            canonical = self.resolve(name)
+            if canonical is None:
+                unrecognized.append(name)
+            elif canonical not in drugs:
+                drugs.append(canonical)
+
+        interactions = []
+        for i, drug_a in enumerate(drugs):
+            for drug_b in drugs[i + 1:]:
+                interaction = self._pairs.get((drug_a, drug_b) if drug_a < drug_b else (drug_b, drug_a))
+                if interaction is not None:
+                    interactions.append(interaction)
+        interactions.sort(key=lambda interaction: _SEVERITY_RANK[interaction.severity])
+        return InteractionReport(drugs, interactions, unrecognized)
+
+
+def _split_list(value):
+    return [item.strip() for item in (value or "").split(";") if item.strip()]
@@ -0,0 +1,342 @@
+"""
+Compact on-disk knowledge base format.
+
+Layout (little-endian, every block 8-byte aligned):
+
+    header      magic b"MDKB", format version (u16), block count (u16)
+    directory   one (name: 8 bytes, offset: u64, length: u64) entry per block
+    meta        JSON: topics with their match terms, general guidance, BM25 settings
+    sections    one record per section: topic index, title span, compressed body span
+    titles      UTF-8 section titles, back to back
+    vocaboff    u32 offsets into vocab, one per term plus an end offset
+    vocab       UTF-8 terms in sorted order, back to back
+    termptr     i64 start of each term's postings, plus an end offset
+    docids      i32 section id of every posting
+    weights     f32 precomputed BM25 weight of every posting
+    bodies      zlib-compressed section bodies, back to back
+
+The file is opened with mmap. Only the header and the small meta block are
+parsed at load time; the postings are used in place as NumPy views, terms are
+found by binary search over the mapped vocabulary, and a section body is
+decompressed only when a search selects it.
+"""
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from clinic.retrieval import BM25Index, split_sections, tokenize
+
+# Default locations of the markdown sources and the compiled file
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+DEFAULT_SOURCE_DIR = os.path.join(DATA_DIR, "knowledge_base")
+DEFAULT_KB_PATH = os.path.join(DATA_DIR, "medical_kb.mkb")
+
+MAGIC = b"MDKB"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHH")
+_DIRECTORY_ENTRY = struct.Struct("<8sQQ")
+
+SECTION_DTYPE = np.dtype([
+    ("topic", "<u4"),
+    ("title_start", "<u4"),
+    ("title_end", "<u4"),
+    ("body_start", "<u8"),
+    ("body_end", "<u8"),
+])
+
+_FRONT_MATTER = re.compile(r"\A---\s*\n(.*?)\n---\s*\n", re.DOTALL)
+
+
+class KnowledgeBaseFormatError(Exception):
+    """Raised when a knowledge base file is missing, truncated or of an unknown version"""
+
+
+def parse_markdown_entry(text, default_id):
+    """
+    Split a markdown knowledge base entry into its front matter and body.
+
+    Front matter lines are "key: value"; every "terms:" line is one group of
+    comma-separated match terms, and all groups must match for the topic to be
+    selected.
+    """
+    topic = {"id": default_id, "priority": 0, "terms": []}
+    match = _FRONT_MATTER.match(text)
+    if match:
+        for line in match.group(1).splitlines():
+            key, _, value = line.partition(":")
+            key, value = key.strip(), value.strip()
+            if key == "terms":
+                topic["terms"].append([term.strip() for term in value.split(",") if term.strip()])
+            elif key == "priority":
+                topic["priority"] = int(value)
+            elif key:
+                topic[key] = value
+        text = text[match.end():]
+    topic["markdown"] = text.strip()
+    return topic
+
+
+def read_markdown_directory(source_dir):
+    """
+    Read every *.md file in source_dir.
+
+    Returns (topics, general_guidance). Files starting with an underscore are
+    not topics; _general.md holds the guidance shown when nothing matches.
+    """
+    topics, general_guidance = [], ""
+    for filename in sorted(os.listdir(source_dir)):
+        if not filename.endswith(".md"):
+            continue
+        with open(os.path.join(source_dir, filename), encoding="utf-8") as source:
+            text = source.read()
+        name = filename[:-3]
+        if name == "_general":
+            general_guidance = text.strip()
+        elif not name.startswith("_"):
+            topics.append(parse_markdown_entry(text, name.replace("_", " ")))
+
+    topics.sort(key=lambda topic: (topic["priority"], topic["id"]))
+    return topics, general_guidance
+
+
+def write_knowledge_base(output_path, topics, general_guidance, k1=1.5, b=0.75, compression_level=9):
+    """Compile topics into the on-disk format and return a summary of what was written"""
+    sections, section_topics = [], []
+    for topic_index, topic in enumerate(topics):
+        for section in split_sections(topic["id"], topic["markdown"]):
+            sections.append(section)
+            section_topics.append(topic_index)
+
+    index = BM25Index.build(
+        [tokenize(f"{section['title']} {section['text']}") for section in sections],
+        k1=k1, b=b
+    )
+
+    # Reorder the postings so terms are stored in sorted (binary-searchable) order
+    terms = sorted(index.vocabulary, key=lambda term: term.encode("utf-8"))
+    old_ids = np.asarray([index.vocabulary[term] for term in terms], dtype=np.int64)
+    starts, ends = index.term_ptr[old_ids], index.term_ptr[old_ids + 1]
+    term_ptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(ends - starts, out=term_ptr[1:])
+    gather = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)]) if terms else np.zeros(0, dtype=np.int64)
+    doc_ids = index.doc_ids[gather].astype("<i4")
+    weights = index.weights[gather].astype("<f4")
+
+    encoded_terms = [term.encode("utf-8") for term in terms]
+    vocab_offsets = np.zeros(len(terms) + 1, dtype="<u4")
+    np.cumsum([len(term) for term in encoded_terms], out=vocab_offsets[1:])
+
+    # Section records, titles and compressed bodies
+    records = np.zeros(len(sections), dtype=SECTION_DTYPE)
+    titles, bodies = bytearray(), bytearray()
+    raw_size = 0
+    for position, (section, topic_index) in enumerate(zip(sections, section_topics)):
+        title = section["title"].encode("utf-8")
+        body = section["text"].encode("utf-8")
+        compressed = zlib.compress(body, compression_level)
+        records[position] = (topic_index, len(titles), len(titles) + len(title),
+                             len(bodies), len(bodies) + len(compressed))
+        titles += title
+        bodies += compressed
+        raw_size += len(body)
+
+    meta = {
+        "topics": [
+            {key: value for key, value in topic.items() if key != "markdown"}
+            for topic in topics
+        ],
+        "general_guidance": general_guidance,
+        "n_sections": len(sections),
+        "n_terms": len(terms),
+        "bm25": {"k1": k1, "b": b},
+    }
+
+    blocks = [
+        (b"meta", json.dumps(meta).encode("utf-8")),
+        (b"sections", records.tobytes()),
+        (b"titles", bytes(titles)),
+        (b"vocaboff", vocab_offsets.tobytes()),
+        (b"vocab", b"".join(encoded_terms)),
+        (b"termptr", term_ptr.astype("<i8").tobytes()),
+        (b"docids", doc_ids.tobytes()),
+        (b"weights", weights.tobytes()),
+        (b"bodies", bytes(bodies)),
+    ]
+
+    # Lay the blocks out after the header and directory, each 8-byte aligned
+    offset = _HEADER.size + _DIRECTORY_ENTRY.size * len(blocks)
+    directory, layout = [], []
+    for name, data in blocks:
+        offset += -offset % 8
+        directory.append(_DIRECTORY_ENTRY.pack(name, offset, len(data)))
+        layout.append((offset, data))
+        offset += len(data)
+
+    # Write to a temporary file and swap it in, so processes that already have
+    # the old file mapped keep reading a consistent copy
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as output:
+            output.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(blocks)))
+            output.write(b"".join(directory))
+            for block_offset, data in layout:
+                output.write(b"\0" * (block_offset - output.tell()))
+                output.write(data)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    return {
+        "topics": len(topics),
+        "sections": len(sections),
+        "terms": len(terms),
+        "postings": int(term_ptr[-1]),
+        "body_bytes": raw_size,
+        "compressed_body_bytes": len(bodies),
+        "file_bytes": offset,
+    }
+
+
+def build_knowledge_base(source_dir, output_path, **options):
+    """Compile a directory of markdown entries into output_path"""
+    topics, general_guidance = read_markdown_directory(source_dir)
+    return write_knowledge_base(output_path, topics, general_guidance, **options)
+
+
+class SortedVocabulary:
+    """Term-to-id lookup by binary search over the mapped, sorted vocabulary"""
+
+    def __init__(self, offsets, blob, base=0):
+        # blob is the whole mapped file; base is where the vocabulary block starts
+        self._offsets = offsets
+        self._blob = blob
+        self._base = base
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def get(self, term, default=None):
+        key = term.encode("utf-8")
+        offsets, blob, base = self._offsets, self._blob, self._base
+        low, high = 0, len(offsets) - 1
+        while low < high:
+            middle = (low + high) // 2
+            candidate = blob[base + int(offsets[middle]):base + int(offsets[middle + 1])]
+            if candidate < key:
+                low = middle + 1
+            elif candidate > key:
+                high = middle
+            else:
+                return middle
+        return default
+
+
+class KnowledgeBaseFile:
+    """Read-only, memory-mapped knowledge base with lazily decompressed section bodies"""
+
+    def __init__(self, path, body_cache_size=128):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise KnowledgeBaseFormatError(f"{path} is empty")
+
+        magic, version, block_count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise KnowledgeBaseFormatError(f"{path} is not a knowledge base file")
+        if version != FORMAT_VERSION:
+            raise KnowledgeBaseFormatError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+
+        self._blocks = {}
+        for position in range(block_count):
+            name, offset, length = _DIRECTORY_ENTRY.unpack_from(self._mmap, _HEADER.size + position * _DIRECTORY_ENTRY.size)
+            if offset + length > len(self._mmap):
+                raise KnowledgeBaseFormatError(f"{path} is truncated")
+            self._blocks[name.rstrip(b"\0").decode("ascii")] = (offset, length)
+
+        meta = json.loads(self._block_bytes("meta"))
+        self.topics = meta["topics"]
+        self.general_guidance = meta["general_guidance"]
+        self.n_sections = meta["n_sections"]
+
+        self._sections = self._array("sections", SECTION_DTYPE)
+        self._titles = self._block_view("titles")
+        self._bodies = self._block_view("bodies")
+        self.index = BM25Index(
+            SortedVocabulary(self._array("vocaboff", "<u4"), self._mmap, self._blocks["vocab"][0]),
+            self._array("termptr", "<i8"),
+            self._array("docids", "<i4"),
+            self._array("weights", "<f4"),
+            self.n_sections
+        )
+
+        self._body_cache = OrderedDict()
+        self._body_cache_size = body_cache_size
+        self._lock = threading.Lock()
+
+    def _block_bytes(self, name):
+        offset, length = self._blocks[name]
+        return self._mmap[offset:offset + length]
+
+    def _block_view(self, name):
+        offset, length = self._blocks[name]
+        return memoryview(self._mmap)[offset:offset + length].toreadonly()
+
+    def _array(self, name, dtype):
+        offset, length = self._blocks[name]
+        dtype = np.dtype(dtype)
+        return np.frombuffer(self._mmap, dtype=dtype, count=length // dtype.itemsize, offset=offset)
+
+    def section_title(self, section_id):
+        record = self._sections[section_id]
+        return bytes(self._titles[record["title_start"]:record["title_end"]]).decode("utf-8")
+
+    def section_text(self, section_id):
+        """Decompress a section body, keeping recently used ones in a small cache"""
+        with self._lock:
+            text = self._body_cache.get(section_id)
+            if text is not None:
+                self._body_cache.move_to_end(section_id)
+                return text
+
+        record = self._sections[section_id]
+        text = zlib.decompress(self._bodies[record["body_start"]:record["body_end"]]).decode("utf-8")
+
+        with self._lock:
+            self._body_cache[section_id] = text
+            while len(self._body_cache) > self._body_cache_size:
+                self._body_cache.popitem(last=False)
+        return text
+
+    def section(self, section_id):
+        """Return a section as a dict with its topic id, title and text"""
+        return {
+            "topic": self.topics[self._sections[section_id]["topic"]]["id"],
+            "title": self.section_title(section_id),
+            "text": self.section_text(section_id),
+        }
+
+    def section_topic_ids(self):
+        """Return the topic id of every section, in section order"""
+        return [self.topics[topic]["id"] for topic in self._sections["topic"]]
+
+    def search(self, query_tokens, k=3, min_score=0.0):
+        """Return the top k sections for the tokens as dicts with a "score" key"""
+        return [
+            dict(self.section(section_id), score=score)
+            for section_id, score in self.index.top_k(query_tokens, k=k, min_score=min_score)
+        ]
@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+
+from clinic.kb_format import DEFAULT_KB_PATH, DEFAULT_SOURCE_DIR, KnowledgeBaseFile, build_knowledge_base
+from clinic.retrieval import tokenize
+from clinic.term_matcher import TermMatcher
+
+# Compiled knowledge base (build with: python -m clinic.build_kb)
+KB_PATH = os.environ.get("MEDICAL_KB_PATH", DEFAULT_KB_PATH)
+
+
+def open_knowledge_base(path=KB_PATH, source_dir=DEFAULT_SOURCE_DIR):
+    """Map the compiled knowledge base, compiling it from the markdown sources if it is missing"""
+    if not os.path.exists(path):
+        build_knowledge_base(source_dir, path)
+    return KnowledgeBaseFile(path)
+
+
+# Opened once per process; entry bodies stay compressed on disk until a search selects them
+KNOWLEDGE_BASE = open_knowledge_base()
+
+# General fallback response when no topic matches
+GENERAL_GUIDANCE = KNOWLEDGE_BASE.general_guidance
+
+# Terms that select each topic. A topic matches when every group has at least
+# one term in the query; a trailing "*" marks a word stem.
+TOPIC_TERMS = {topic["id"]: topic["terms"] for topic in KNOWLEDGE_BASE.topics}
+
+# Order in which matched topics are reported
+TOPIC_PRIORITY = [topic["id"] for topic in KNOWLEDGE_BASE.topics]
+
+# Compiled once at import time and shared by every session
+TOPIC_MATCHER = TermMatcher(
+    (term, (topic, group_index))
+    for topic, groups in TOPIC_TERMS.items()
+    for group_index, group in enumerate(groups)
+    for term in group
+)
+
+
+def match_topics(query):
+    """Return every topic whose term groups are all present in query, in priority order"""
+    groups_found = {}
+    for topic, group_index in TOPIC_MATCHER.match_values(query):
+        groups_found.setdefault(topic, set()).add(group_index)
+
+    return [
+        topic for topic in TOPIC_PRIORITY
+        if len(groups_found.get(topic, ())) == len(TOPIC_TERMS[topic])
+    ]
+
+
+# Topic id of every section, for restricting a search to the topics a query names
+SECTION_TOPICS = np.array(KNOWLEDGE_BASE.section_topic_ids())
+
+# Share of its words a query that names no topic must have in common with a
+# section before the section is returned, so one shared word is not enough
+MIN_QUERY_COVERAGE = 0.6
+
+
+def search(query, k=3, min_coverage=MIN_QUERY_COVERAGE):
+    """
+    Return the k best matching knowledge base sections with their BM25 scores.
+
+    When the term matcher recognises topics (for example "htn"), only those
+    topics' sections are returned, ranked with the topic names added to the
+    query. Otherwise a section must contain at least min_coverage of the
+    query's distinct words.
+    """
+    tokens = tokenize(query)
+    topics = match_topics(query)
+    index = KNOWLEDGE_BASE.index
+    if topics:
+        scores = index.score(tokens + [token for topic in topics for token in tokenize(topic)])
+        eligible = np.isin(SECTION_TOPICS, topics)
+    else:
+        terms = set(tokens)
+        scores = index.score(terms)
+        covered = sum((index.score([term]) > 0 for term in terms), np.zeros(index.n_docs, dtype=np.int64))
+        eligible = covered >= min_coverage * len(terms)
+    ranked = np.flatnonzero(eligible & (scores > 0))
+    ranked = ranked[np.argsort(-scores[ranked], kind="stable")][:k]
+    return [dict(KNOWLEDGE_BASE.section(int(section_id)), score=float(scores[section_id])) for section_id in ranked]
@@ -0,0 +1,588 @@
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from clinic import knowledge_base, palmyra
+from clinic.backoff import compute_backoff, server_retry_hint
+from clinic.circuit_breaker import CircuitBreakerRegistry
+from clinic.health import HealthProber
+from clinic.hedging import run_hedged
+from clinic.http_client import PooledHTTPClient
+from clinic.metrics import MetricsRegistry
+from clinic.response_cache import ResponseCache, make_cache_key
+from clinic.semantic_cache import SemanticCache
+from clinic.singleflight import SingleFlight
+from clinic.streaming import StreamedResponse, stream_hf_generation
+
+# Inference endpoint base URL (override to point at a local stub server)
+HF_INFERENCE_BASE_URL = os.environ.get("HF_INFERENCE_BASE_URL", "https://api-inference.huggingface.co/models")
+
+# Multiple model options for reliability
+MEDICAL_MODELS = [
+    {
+        "name": "Meditron-7B",
+        "url": f"{HF_INFERENCE_BASE_URL}/epfl-llm/meditron-7b",
+        "system_prompt": """You are a medical assistant providing evidence-based guidance to healthcare professionals. 
+        Focus on clinical information including diagnosis, treatment, and management strategies.
+        Always remind users to verify with current guidelines and use clinical judgment.
+        Format your response with clear sections, organize recommendations systematically,
+        and note important warnings or contraindications when applicable."""
+    },
+    {
+        "name": "BioMistral-7B",
+        "url": f"{HF_INFERENCE_BASE_URL}/BioMistral/BioMistral-7B",
+        "system_prompt": """You are a medical assistant for healthcare professionals.
+        Provide detailed clinical information with evidence-based recommendations.
+        Include specific diagnostic criteria, treatment protocols, and appropriate citations.
+        Always remind users to verify with current guidelines and use clinical judgment."""
+    }
+]
+
+# Optimized generation parameters shared by every model
+GENERATION_PARAMETERS = {
+    "max_new_tokens": 1024,
+    "temperature": 0.1,
+    "top_p": 0.95,
+    "repetition_penalty": 1.15,
+    "do_sample": True
+}
+
+# Outbound HTTP settings: separate connect/read timeouts and pooled
+# keep-alive connections per host
+HTTP_CONNECT_TIMEOUT = 5
+HTTP_READ_TIMEOUT = 60
+HTTP_DEFAULT_POOL_SIZE = 10
+HTTP_HOST_POOL_SIZES = {
+    "api-inference.huggingface.co": 16,
+    "huggingface.co": 4
+}
+
+# Shared HTTP client (one connection pool per server process)
+@functools.lru_cache(maxsize=None)
+def get_http_client():
+    """Return the process-wide pooled HTTP client used for all outbound calls"""
+    return PooledHTTPClient(
+        pool_maxsize=HTTP_DEFAULT_POOL_SIZE,
+        host_pool_sizes=HTTP_HOST_POOL_SIZES,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        read_timeout=HTTP_READ_TIMEOUT
+    )
+
+# Response cache settings
+RESPONSE_CACHE_MAX_ENTRIES = 256
+RESPONSE_CACHE_TTL_SECONDS = 3600
+
+# Shared response cache (one per server process, not per session)
+@functools.lru_cache(maxsize=None)
+def get_response_cache():
+    """Return the process-wide cache of model responses shared by all sessions"""
+    return ResponseCache(
+        max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds=RESPONSE_CACHE_TTL_SECONDS
+    )
+
+# Semantic cache settings: reuse an answer to a reworded question when the
+# cosine similarity of the two queries is at least SEMANTIC_CACHE_THRESHOLD
+# and they name the same numbers, negations, qualifiers and drugs
+SEMANTIC_CACHE_THRESHOLD = 0.93
+SEMANTIC_CACHE_MAX_ENTRIES = 10000
+
+# Shared semantic cache (one per server process, not per session)
+@functools.lru_cache(maxsize=None)
+def get_semantic_cache():
+    """Return the process-wide near-duplicate answer cache"""
+    return SemanticCache(
+        threshold=SEMANTIC_CACHE_THRESHOLD,
+        max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl_seconds=RESPONSE_CACHE_TTL_SECONDS
+    )
+
+# Look up a cached answer, first for the exact question and then for a rewording of it
+def get_cached_answer(prompt):
+    """Return (answer, model_name) from the response caches, or None"""
+    response_cache = get_response_cache()
+    for model in MEDICAL_MODELS:
+        cached_answer = response_cache.get(make_cache_key(prompt, model["name"], GENERATION_PARAMETERS))
+        if cached_answer is not None:
+            return cached_answer, model["name"]
+    
+    similar = get_semantic_cache().get(prompt)
+    if similar is not None:
+        (answer, model_name), _, _ = similar
+        return answer, model_name
+    return None
+
+# Remember a model's answer in both caches
+def store_answer(prompt, model_name, answer):
+    get_response_cache().put(make_cache_key(prompt, model_name, GENERATION_PARAMETERS), answer)
+    get_semantic_cache().put(prompt, (answer, model_name))
+
+# Retry settings: jittered exponential backoff, honouring Retry-After and
+# Hugging Face's estimated_time, but never waiting longer than RETRY_MAX_WAIT_SECONDS
+MAX_ATTEMPTS_PER_MODEL = 3
+RETRY_BACKOFF_BASE_SECONDS = 1.0
+RETRY_BACKOFF_CAP_SECONDS = 8.0
+RETRY_MAX_WAIT_SECONDS = 15.0
+
+# Circuit breaker settings: open after this many consecutive failures and
+# stay open (sending queries to the fallback) for the recovery timeout
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RECOVERY_SECONDS = 60.0
+
+# Shared circuit breakers, one per model
+@functools.lru_cache(maxsize=None)
+def get_circuit_breakers():
+    """Return the process-wide circuit breakers so every session sees the same model health"""
+    return CircuitBreakerRegistry(
+        failure_threshold=BREAKER_FAILURE_THRESHOLD,
+        recovery_timeout=BREAKER_RECOVERY_SECONDS
+    )
+
+# Hedged execution settings: start the backup model after this many seconds
+# without an answer from the primary (0 races all models at once, None
+# tries them one after another)
+HEDGE_DELAY_SECONDS = 10.0
+HEDGE_MAX_WORKERS = 8
+
+# Model requests open at once across the whole process, whoever sends them
+# (chat jobs, hedged backups, streaming, the API server); the rest wait their turn
+UPSTREAM_MAX_CONCURRENT = 8
+
+@functools.lru_cache(maxsize=None)
+def get_upstream_slots():
+    """Return the process-wide semaphore held for every model request"""
+    return threading.BoundedSemaphore(UPSTREAM_MAX_CONCURRENT)
+
+# Shared worker pool for hedged model calls
+@functools.lru_cache(maxsize=None)
+def get_hedge_executor():
+    """Return the process-wide thread pool used to race model requests"""
+    return ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="hedge")
+
+# Identical questions asked while one is already being answered share its result
+@functools.lru_cache(maxsize=None)
+def get_query_flights():
+    """Return the process-wide coalescer for in-flight medical queries"""
+    return SingleFlight()
+
+# Query metrics: (name, help, labels). Stages are prompt_build, http_attempt,
+# backoff_sleep, response_parse and fallback; queries are labeled with the
+# model that answered and whether the answer came from the api, a cache or the fallback
+QUERY_STAGE_SECONDS = (
+    "medical_query_stage_seconds", "Time spent in each stage of answering a medical query",
+    ("stage", "model", "outcome")
+)
+QUERY_SECONDS = ("medical_query_seconds", "End-to-end time to answer a medical query", ("model", "outcome"))
+QUERIES_TOTAL = ("medical_queries_total", "Medical queries answered", ("model", "outcome"))
+HTTP_ATTEMPTS_TOTAL = (
+    "medical_query_http_attempts_total", "Requests sent to the inference API, by result", ("model", "outcome")
+)
+FALLBACK_MODEL_NAME = "Local Medical Database"
+
+# Shared query metrics, exported by the API server and charted on System Diagnostics
+@functools.lru_cache(maxsize=None)
+def get_query_metrics():
+    """Return the process-wide registry of query stage timings and outcomes"""
+    registry = MetricsRegistry()
+    registry.histogram(*QUERY_STAGE_SECONDS)
+    registry.histogram(*QUERY_SECONDS)
+    registry.counter(*QUERIES_TOTAL)
+    registry.counter(*HTTP_ATTEMPTS_TOTAL)
+    return registry
+
+def record_stage(stage, model_name, outcome, started):
+    """Record the time since started (a perf_counter reading) against a query stage"""
+    get_query_metrics().histogram(*QUERY_STAGE_SECONDS).observe(
+        time.perf_counter() - started, stage=stage, model=model_name, outcome=outcome
+    )
+
+def record_query(model_name, outcome, started):
+    """Count an answered query and record its end-to-end time"""
+    metrics = get_query_metrics()
+    metrics.histogram(*QUERY_SECONDS).observe(time.perf_counter() - started, model=model_name, outcome=outcome)
+    metrics.counter(*QUERIES_TOTAL).inc(model=model_name, outcome=outcome)
+
+def _attempt_outcome(status_code=None, error=None):
+    # Label for one HTTP attempt: ok, http_<status>, timeout or connection_error
+    if error is None:
+        return "ok" if status_code == 200 else f"http_{status_code}"
+    if isinstance(error, requests.exceptions.Timeout):
+        return "timeout"
+    return "connection_error" if isinstance(error, requests.exceptions.ConnectionError) else "error"
+
+# Background health probe settings: every backend is checked every
+# HEALTH_PROBE_INTERVAL_SECONDS, keeping the last HEALTH_PROBE_HISTORY
+# results, and leaves rotation after HEALTH_PROBE_FAILURE_THRESHOLD failures in a row
+HEALTH_PROBE_INTERVAL_SECONDS = 30.0
+HEALTH_PROBE_HISTORY = 60
+HEALTH_PROBE_FAILURE_THRESHOLD = 2
+HEALTH_PROBE_TIMEOUT_SECONDS = 10
+WRITER_BACKEND_NAME = "Palmyra-Med (Writer)"
+
+# Health check for one model: a single-token generation, so a 503 "loading" model shows as down
+def probe_model(model, http_client):
+    """Return (ok, detail) for one inference model"""
+    response = http_client.post(
+        model["url"],
+        headers=get_inference_headers(),
+        json={"inputs": "ping", "parameters": {"max_new_tokens": 1}},
+        read_timeout=HEALTH_PROBE_TIMEOUT_SECONDS
+    )
+    return response.status_code == 200, f"HTTP {response.status_code}"
+
+# Shared health prober for both inference models and the Writer API
+@functools.lru_cache(maxsize=None)
+def get_health_prober():
+    """Return the process-wide background health prober, starting it on first use"""
+    http_client = get_http_client()
+    probes = {model["name"]: functools.partial(probe_model, model, http_client) for model in MEDICAL_MODELS}
+    probes[WRITER_BACKEND_NAME] = functools.partial(palmyra.probe_writer, http_client, HEALTH_PROBE_TIMEOUT_SECONDS)
+    return HealthProber(
+        probes,
+        interval=HEALTH_PROBE_INTERVAL_SECONDS,
+        history=HEALTH_PROBE_HISTORY,
+        failure_threshold=HEALTH_PROBE_FAILURE_THRESHOLD
+    ).start()
+
+def is_backend_healthy(name):
+    """False only when the health prober is running and has seen the backend fail repeatedly"""
+    # Library users that never start the prober (CLIs, benchmarks) route on the breakers alone
+    if not get_health_prober.cache_info().currsize:
+        return True
+    return get_health_prober().is_available(name)
+
+# Build the full prompt sent to a model
+def build_model_prompt(model, prompt):
+    """Wrap a physician query in the model's system prompt"""
+    return f"{model['system_prompt']}\n\nPhysician Query: {prompt}\n\nMedical Response:"
+
+# Build request headers for the inference API
+def get_inference_headers():
+    """Return request headers, including the API key when one is configured"""
+    # Initialize headers (empty if no API key is used)
+    headers = {}
+    
+    # Optional: Add API key if available (Streamlit also exports top-level
+    # secrets such as HUGGINGFACE_API_KEY as environment variables)
+    api_key = os.environ.get("HUGGINGFACE_API_KEY")
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    
+    return headers
+
+# Query a single model with timeout and retry logic
+def query_single_model(model, prompt, headers, cancel_event=None, http_client=None):
+    """
+    Query one medical model and return its answer, or None if it failed.
+    
+    Retries use jittered exponential backoff, or the delay the server asks for
+    (Retry-After or the estimated_time of a 503 "loading" response). Every
+    attempt is reported to the model's circuit breaker, and retries stop early
+    when the breaker opens or cancel_event is set (another model answered).
+    """
+    if cancel_event is None:
+        cancel_event = threading.Event()
+    if http_client is None:
+        http_client = get_http_client()
+    breaker = get_circuit_breakers().get(model["name"])
+    attempts = get_query_metrics().counter(*HTTP_ATTEMPTS_TOTAL)
+    
+    try:
+        # Format the prompt for the model
+        started = time.perf_counter()
+        full_prompt = build_model_prompt(model, prompt)
+        
+        # Prepare the payload with optimized parameters
+        payload = {
+            "inputs": full_prompt,
+            "parameters": GENERATION_PARAMETERS
+        }
+        record_stage("prompt_build", model["name"], "ok", started)
+        
+        # Add timeout and retry logic
+        for attempt in range(MAX_ATTEMPTS_PER_MODEL):
+            if cancel_event.is_set() or not breaker.allow_request():
+                return None
+            
+            server_hint = None
+            upstream_slots = get_upstream_slots()
+            upstream_slots.acquire()
+            if cancel_event.is_set():
+                # Another model answered while this one waited for a slot
+                upstream_slots.release()
+                breaker.release()
+                return None
+            started = time.perf_counter()
+            try:
+                response = http_client.post(
+                    model["url"], 
+                    headers=headers, 
+                    json=payload
+                )
+            except Exception as e:
+                # Timeouts and connection errors
+                outcome = _attempt_outcome(error=e)
+                record_stage("http_attempt", model["name"], outcome, started)
+                attempts.inc(model=model["name"], outcome=outcome)
+                breaker.record_failure()
+                response = None
+            else:
+                outcome = _attempt_outcome(response.status_code)
+                record_stage("http_attempt", model["name"], outcome, started)
+                attempts.inc(model=model["name"], outcome=outcome)
+            finally:
+                upstream_slots.release()
+            
+            # Handle successful response
+            if response is not None and response.status_code == 200:
+                started = time.perf_counter()
+                try:
+                    result = response.json()[0]["generated_text"]
+                except Exception as e:
+                    # Malformed responses
+                    record_stage("response_parse", model["name"], "error", started)
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                    
+                    # Clean up response and remove any HTML tags
+                    clean_response = result.replace("</div>", "")
+                    
+                    # Handle result extraction differently based on model
+                    if "Medical Response:" in clean_response:
+                        answer = clean_response.split("Medical Response:")[1].strip()
+                    else:
+                        # Fallback extraction method
+                        answer = clean_response.replace(full_prompt, "").strip()
+                    record_stage("response_parse", model["name"], "ok", started)
+                    return answer
+            
+            # Model still loading, rate limited or server error: retry
+            elif response is not None and (response.status_code in (429, 503) or response.status_code >= 500):
+                server_hint = server_retry_hint(response)
+                breaker.record_failure(retry_after=server_hint)
+            
+            # Other client errors will not succeed on retry
+            elif response is not None:
+                breaker.record_success()
+                return None
+            
+            if attempt == MAX_ATTEMPTS_PER_MODEL - 1:
+                break
+            
+            delay = compute_backoff(attempt, base=RETRY_BACKOFF_BASE_SECONDS, cap=RETRY_BACKOFF_CAP_SECONDS, server_hint=server_hint)
+            if delay > RETRY_MAX_WAIT_SECONDS:
+                # The server wants longer than we are willing to keep a clinician waiting
+                break
+            started = time.perf_counter()
+            cancelled = cancel_event.wait(delay)
+            record_stage("backoff_sleep", model["name"], "cancelled" if cancelled else "ok", started)
+            if cancelled:
+                return None
+                
+    except Exception as e:
+        return None
+    
+    return None
+
+# Medical LLM Query Function with enhanced reliability
+def query_medical_llm(prompt, hedge_delay=HEDGE_DELAY_SECONDS):
+    """
+    Query medical LLM models with fallback options and specialized knowledge.
+    
+    With a hedge_delay the primary model is raced against the backups, each
+    backup starting after hedge_delay seconds without an answer; the first good
+    answer wins. With hedge_delay=None the models are tried one at a time.
+    """
+    started = time.perf_counter()
+    # Serve a recent answer for the same (or a reworded) question without going to the network
+    cached = get_cached_answer(prompt)
+    if cached is not None:
+        record_query(cached[1], "cache", started)
+        return cached[0], True, cached[1]
+    
+    # Attach to the same question if another session is already asking it
+    result, _ = get_query_flights().do(
+        make_cache_key(prompt, None, GENERATION_PARAMETERS),
+        query_available_models, prompt, hedge_delay
+    )
+    record_query(result[2], "api" if result[1] else "fallback", started)
+    return result
+
+# Send a query to the models whose circuit breakers allow it
+def query_available_models(prompt, hedge_delay=HEDGE_DELAY_SECONDS):
+    """Query the models (hedged or in sequence), falling back to the local database"""
+    # Skip models whose circuit breaker is open or that fail their health
+    # probes, and go straight to the fallback if none are left
+    breakers = get_circuit_breakers()
+    models = [
+        model for model in MEDICAL_MODELS
+        if breakers.get(model["name"]).is_available() and is_backend_healthy(model["name"])
+    ]
+    
+    headers = get_inference_headers()
+    http_client = get_http_client()
+    
+    if not models:
+        winner, answer = None, None
+    elif hedge_delay is None:
+        # Try each model in sequence
+        winner, answer = None, None
+        for index, model in enumerate(models):
+            answer = query_single_model(model, prompt, headers, http_client=http_client)
+            if answer is not None:
+                winner = index
+                break
+    else:
+        # Race the models, bringing in backups after the hedge delay
+        calls = [
+            functools.partial(query_single_model, model, prompt, headers, http_client=http_client)
+            for model in models
+        ]
+        winner, answer = run_hedged(calls, hedge_delay, get_hedge_executor())
+    
+    if winner is not None:
+        model_name = models[winner]["name"]
+        store_answer(prompt, model_name, answer)
+        return answer, True, model_name
+    
+    # If all models fail, use enhanced local database
+    return get_enhanced_medical_fallback(prompt), False, FALLBACK_MODEL_NAME
+
+# Streaming variant of query_medical_llm
+def stream_medical_llm(prompt):
+    """
+    Stream a medical answer as text chunks.
+    
+    Returns a StreamedResponse; once iterated, its model_name and from_api
+    attributes tell where the answer came from. Models are tried in order;
+    each is retried with backoff (honouring Retry-After and estimated_time)
+    and abandoned only if it fails before producing any text.
+    """
+    def produce(stream):
+        started = time.perf_counter()
+        # Replay a cached answer in one chunk
+        cached = get_cached_answer(prompt)
+        if cached is not None:
+            stream.model_name, stream.from_api = cached[1], True
+            yield cached[0]
+            record_query(cached[1], "cache", started)
+            return
+        
+        headers = get_inference_headers()
+        http_client = get_http_client()
+        breakers = get_circuit_breakers()
+        
+        for model in MEDICAL_MODELS:
+            # Failing health probes send the query straight on to the next model or the fallback
+            if not is_backend_healthy(model["name"]):
+                continue
+            breaker = breakers.get(model["name"])
+            
+            stage_started = time.perf_counter()
+            payload = {
+                "inputs": build_model_prompt(model, prompt),
+                "parameters": GENERATION_PARAMETERS
+            }
+            record_stage("prompt_build", model["name"], "ok", stage_started)
+            
+            # Retried with the same backoff as query_single_model until text arrives
+            for attempt in range(MAX_ATTEMPTS_PER_MODEL):
+                # An open breaker also sends the query on to the next model
+                if not breaker.allow_request():
+                    break
+                produced = recorded = False
+                server_hint = None
+                # The upstream slot is held until the stream ends, since the connection stays open
+                upstream_slots = get_upstream_slots()
+                upstream_slots.acquire()
+                stage_started = time.perf_counter()
+                try:
+                    stream.model_name, stream.from_api = model["name"], True
+                    for chunk in stream_hf_generation(
+                        model["url"], headers, payload,
+                        timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+                        session=http_client
+                    ):
+                        if not produced:
+                            breaker.record_success()
+                            produced = recorded = True
+                        yield chunk.replace("</div>", "")
+                except Exception as e:
+                    # A streamed attempt is timed from the request to the last chunk
+                    response = e.response if isinstance(e, requests.HTTPError) else None
+                    status_code = response.status_code if response is not None else None
+                    outcome = _attempt_outcome(status_code) if status_code else _attempt_outcome(error=e)
+                    record_stage("http_attempt", model["name"], outcome, stage_started)
+                    get_query_metrics().counter(*HTTP_ATTEMPTS_TOTAL).inc(model=model["name"], outcome=outcome)
+                    # Once text has been shown, keep the partial answer rather than switching models
+                    if produced:
+                        yield "\n\n*Response interrupted. Please verify with appropriate medical resources.*"
+                        record_query(model["name"], "api", started)
+                        return
+                    if status_code is not None and status_code != 429 and status_code < 500:
+                        # Other client errors will not succeed on retry
+                        breaker.record_success()
+                        recorded = True
+                        break
+                    # Model still loading, rate limited, server error or no connection: retry
+                    if response is not None:
+                        server_hint = server_retry_hint(response)
+                    breaker.record_failure(retry_after=server_hint)
+                    recorded = True
+                else:
+                    outcome = "ok" if produced else "empty"
+                    record_stage("http_attempt", model["name"], outcome, stage_started)
+                    get_query_metrics().counter(*HTTP_ATTEMPTS_TOTAL).inc(model=model["name"], outcome=outcome)
+                    if produced:
+                        store_answer(prompt, model["name"], stream.text.strip())
+                        record_query(model["name"], "api", started)
+                        return
+                    
+                    # An empty generation counts as a failed attempt
+                    breaker.record_failure()
+                    recorded = True
+                finally:
+                    upstream_slots.release()
+                    # A reader that stops before any outcome must not keep a half-open breaker's trial slot
+                    if not recorded:
+                        breaker.release()
+                
+                if attempt == MAX_ATTEMPTS_PER_MODEL - 1:
+                    break
+                delay = compute_backoff(attempt, base=RETRY_BACKOFF_BASE_SECONDS, cap=RETRY_BACKOFF_CAP_SECONDS, server_hint=server_hint)
+                if delay > RETRY_MAX_WAIT_SECONDS:
+                    break
+                stage_started = time.perf_counter()
+                time.sleep(delay)
+                record_stage("backoff_sleep", model["name"], "ok", stage_started)
+        
+        # If all models fail, use enhanced local database
+        stream.model_name, stream.from_api = FALLBACK_MODEL_NAME, False
+        yield get_enhanced_medical_fallback(prompt)
+        record_query(FALLBACK_MODEL_NAME, "fallback", started)
+    
+    return StreamedResponse(produce)
+
+# Number of knowledge base sections returned by the local fallback
+FALLBACK_TOP_K = 3
+
+# Enhanced medical knowledge database with tuberculosis and other detailed conditions
+def get_enhanced_medical_fallback(query, top_k=FALLBACK_TOP_K):
+    """Provide reliable medical information from local database"""
+    started = time.perf_counter()
+    # Rank knowledge base sections by BM25 relevance (index built once at import)
+    results = knowledge_base.search(query, k=top_k)
+    
+    # General fallback response
+    if not results:
+        record_stage("fallback", FALLBACK_MODEL_NAME, "general_guidance", started)
+        return knowledge_base.GENERAL_GUIDANCE
+    
+    sections = [f"## {result['title']}\n*Relevance score: {result['score']:.2f}*\n\n{result['text']}" for result in results]
+    record_stage("fallback", FALLBACK_MODEL_NAME, "matched", started)
+    return "# Local Knowledge Base Results\n\n" + "\n\n".join(sections) + "\n\nAlways verify with current guidelines and use clinical judgment."
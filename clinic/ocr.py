@@ -0,0 +1,276 @@
+import io
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple
+from concurrent import futures
+
+from PIL import Image
+
+from clinic.executor import ExecutorBusyError
+
+# Text returned by the stub backend (OCR_BACKEND=stub), for demos and tests on
+# machines without tesseract
+STUB_PRESCRIPTION_TEXT = """
+    Dr. John Smith, MD
+    123 Medical Plaza
+    Phone: (555) 123-4567
+
+    Patient: Jane Doe
+    Date: 05/15/2025
+
+    Rx:
+
+    1. Metformin 500mg
+       Sig: 1 tablet PO BID with meals
+       Disp: 60 tablets
+       Refills: 3
+
+    2. Lisinopril 10mg
+       Sig: 1 tablet PO daily in AM
+       Disp: 30 tablets
+       Refills: 3
+
+    3. Atorvastatin 20mg
+       Sig: 1 tablet PO qHS
+       Disp: 30 tablets
+       Refills: 3
+
+    Signed: Dr. John Smith, MD
+    """
+
+PageResult = namedtuple("PageResult", "index text error seconds")
+
+
+class OCRTimeoutError(Exception):
+    """Raised when an OCR job does not finish within its timeout"""
+
+
+class OCRUnavailableError(Exception):
+    """Raised when the requested OCR backend cannot run on this machine"""
+
+
+class OCRBackend:
+    """
+    Interface for OCR engines.
+
+    Backends are pickled into worker processes, so they should hold only
+    plain configuration and import heavy modules inside recognize.
+    """
+
+    name = "base"
+
+    def recognize(self, image, timeout=None):
+        """Return the text in a PIL image"""
+        raise NotImplementedError
+
+    @classmethod
+    def available(cls):
+        return True
+
+
+class TesseractBackend(OCRBackend):
+    """OCR with the tesseract binary through pytesseract"""
+
+    name = "tesseract"
+
+    def __init__(self, lang="eng", config="--psm 6"):
+        self.lang = lang
+        # Page segmentation mode 6 treats the page as one block of text, which suits prescriptions
+        self.config = config
+
+    def recognize(self, image, timeout=None):
+        import pytesseract
+        return pytesseract.image_to_string(image, lang=self.lang, config=self.config, timeout=timeout or 0)
+
+    @classmethod
+    def available(cls):
+        try:
+            import pytesseract  # noqa: F401
+        except ImportError:
+            return False
+        return shutil.which("tesseract") is not None
+
+
+class StubBackend(OCRBackend):
+    """Deterministic backend that returns fixed text, for demos and tests"""
+
+    name = "stub"
+
+    def __init__(self, text=STUB_PRESCRIPTION_TEXT, delay=0.0):
+        self.text = text
+        # Simulated recognition time per page
+        self.delay = delay
+
+    def recognize(self, image, timeout=None):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.text
+
+
+BACKENDS = {backend.name: backend for backend in (TesseractBackend, StubBackend)}
+
+
+def get_backend(name="auto", **options):
+    """
+    Create a backend by name; "auto" means tesseract.
+
+    The stub reads every upload as the same sample prescription, so it is
+    never chosen automatically and has to be asked for by name.
+    """
+    if name == "auto":
+        name = "tesseract"
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown OCR backend {name!r}; choose from {', '.join(BACKENDS)}") from None
+    if not backend.available():
+        raise OCRUnavailableError(
+            f"The {name} OCR backend is not installed (tesseract needs pytesseract and the tesseract binary); "
+            "set OCR_BACKEND=stub to read every upload as sample text for demos"
+        )
+    return backend(**options)
+
+
+def _recognize_page(backend, png_bytes, timeout):
+    # Runs in a worker process
+    started = time.perf_counter()
+    image = Image.open(io.BytesIO(png_bytes))
+    text = backend.recognize(image, timeout=timeout)
+    return text, time.perf_counter() - started
+
+
+class OCRJob:
+    """Pages of one document submitted to an OCRPool"""
+
+    def __init__(self, page_futures, deadline):
+        self._futures = page_futures
+        self.deadline = deadline
+
+    @property
+    def pages(self):
+        return len(self._futures)
+
+    def done(self):
+        return all(future.done() for future in self._futures)
+
+    def as_completed(self):
+        """
+        Yield a PageResult for each page as it finishes.
+
+        Raises OCRTimeoutError, after cancelling the pages not yet started,
+        if the job runs past its deadline.
+        """
+        index_of = {future: index for index, future in enumerate(self._futures)}
+        pending = set(self._futures)
+        try:
+            while pending:
+                remaining = self.deadline - time.monotonic()
+                if remaining <= 0:
+                    raise OCRTimeoutError(f"OCR did not finish {len(pending)} of {self.pages} pages in time")
+                done, pending = futures.wait(pending, timeout=remaining, return_when=futures.FIRST_COMPLETED)
+                for future in sorted(done, key=index_of.get):
+                    try:
+                        text, seconds = future.result()
+                        yield PageResult(index_of[future], text, None, seconds)
+                    except Exception as e:
+                        yield PageResult(index_of[future], "", e, 0.0)
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def results(self):
+        """Wait for every page and return the PageResults in page order"""
+        return sorted(self.as_completed(), key=lambda result: result.index)
+
+
+class OCRPool:
+    """
+    Bounded process pool for OCR.
+
+    Pages run in parallel on up to max_workers cores, outside the Streamlit
+    script threads. At most max_pending_pages pages may be queued or running
+    at once; submit raises ExecutorBusyError beyond that. Each job gets a
+    deadline of timeout seconds, and each page passes the same limit to the
+    backend so a stuck tesseract process is killed.
+    """
+
+    def __init__(self, backend=None, max_workers=None, max_pending_pages=64, timeout=60.0):
+        self.backend = backend or get_backend()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending_pages = max_pending_pages
+        self.timeout = timeout
+        self._pool = self._new_pool()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.pages_done = 0
+        self.pages_failed = 0
+
+    def _new_pool(self):
+        # Worker processes are spawned rather than forked: forking a process
+        # that is running server threads can deadlock the child
+        return futures.ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def submit(self, pages, timeout=None):
+        """Queue PNG-encoded pages for OCR and return an OCRJob"""
+        pages = list(pages)
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            if self._pending + len(pages) > self.max_pending_pages:
+                raise ExecutorBusyError(f"{self._pending} pages are already waiting for OCR")
+            self._pending += len(pages)
+
+        page_futures = []
+        for png_bytes in pages:
+            try:
+                future = self._pool.submit(_recognize_page, self.backend, png_bytes, timeout)
+            except futures.process.BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a fresh pool
+                self._pool = self._new_pool()
+                future = self._pool.submit(_recognize_page, self.backend, png_bytes, timeout)
+            future.add_done_callback(self._page_finished)
+            page_futures.append(future)
+        return OCRJob(page_futures, time.monotonic() + timeout)
+
+    def extract_text(self, pages, on_page=None, timeout=None):
+        """
+        OCR PNG-encoded pages and return their text joined in page order.
+
+        on_page(done, total) is called on the calling thread as each page
+        finishes, e.g. to drive a progress bar.
+        """
+        job = self.submit(pages, timeout)
+        texts = [""] * job.pages
+        for done, result in enumerate(job.as_completed(), 1):
+            if result.error is None:
+                texts[result.index] = result.text.strip()
+            else:
+                texts[result.index] = f"[Page {result.index + 1} could not be read: {result.error}]"
+            if on_page is not None:
+                on_page(done, job.pages)
+        return "\n\n".join(texts)
+
+    def _page_finished(self, future):
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.pages_failed += 1
+            else:
+                self.pages_done += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.backend.name,
+                "max_workers": self.max_workers,
+                "pending_pages": self._pending,
+                "pages_done": self.pages_done,
+                "pages_failed": self.pages_failed,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
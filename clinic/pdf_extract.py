@@ -0,0 +1,107 @@
+import collections
+import threading
+from collections import namedtuple
+
+from clinic.ocr import OCRTimeoutError
+from clinic.prescription_image import binarize_page, image_to_png
+
+# Pages whose text layer has fewer characters than this are treated as scans and OCR'd
+MIN_TEXT_CHARS = 20
+
+# Resolution at which scanned pages are rasterized for OCR
+RASTER_DPI = 200
+
+# source is "text" for the embedded text layer and "ocr" for rasterized pages
+PageText = namedtuple("PageText", "index pages text source error")
+
+# PDFium is not thread-safe, so sessions take turns parsing and rendering;
+# the OCR itself still runs in parallel in the process pool
+_PDFIUM_LOCK = threading.Lock()
+
+
+def iter_pdf_pages(source, min_text_chars=MIN_TEXT_CHARS, dpi=RASTER_DPI):
+    """
+    Yield (index, page_count, text, png) for each page of a PDF, one page at a time.
+
+    source may be a path, bytes or a binary file object. Pages with a usable
+    text layer come back as text; the others are rendered, binarized and
+    returned as PNG bytes for OCR. Only the current page is held in memory.
+    Raises ValueError if the file is not a PDF PDFium can open.
+    """
+    import pypdfium2 as pdfium
+
+    with _PDFIUM_LOCK:
+        try:
+            document = pdfium.PdfDocument(source)
+        except pdfium.PdfiumError as e:
+            # Reported like an unreadable image, so callers handle both the same way
+            raise ValueError(f"Not a readable PDF: {e}") from None
+        page_count = len(document)
+    try:
+        for index in range(page_count):
+            with _PDFIUM_LOCK:
+                page = document[index]
+                try:
+                    textpage = page.get_textpage()
+                    text = textpage.get_text_range().replace("\r\n", "\n")
+                    textpage.close()
+                    image = None
+                    if len(text.strip()) < min_text_chars:
+                        # to_pil shares the bitmap's buffer, so take a copy before the page is closed
+                        image = page.render(scale=dpi / 72, grayscale=True).to_pil().copy()
+                finally:
+                    page.close()
+
+            if image is None:
+                yield index, page_count, text, None
+            else:
+                image, _ = binarize_page(image)
+                yield index, page_count, None, image_to_png(image)
+    finally:
+        with _PDFIUM_LOCK:
+            document.close()
+
+
+def extract_pdf_pages(source, get_ocr_pool, max_in_flight=None, min_text_chars=MIN_TEXT_CHARS, dpi=RASTER_DPI):
+    """
+    Yield a PageText for every page of a PDF as soon as it is ready.
+
+    Text-layer pages come out immediately. Scanned pages are sent to the OCR
+    pool as they are rendered, with at most max_in_flight (default: one per
+    OCR worker) waiting at a time, so memory stays bounded however long the
+    document is. OCR results are yielded in page order.
+
+    get_ocr_pool is called for the first scanned page only, so a PDF with a
+    text layer on every page is read without any OCR backend.
+    """
+    ocr_pool = None
+    in_flight = collections.deque()
+
+    def finish(index, page_count, job):
+        try:
+            result = job.results()[0]
+            return PageText(index, page_count, result.text.strip(), "ocr", result.error)
+        except OCRTimeoutError as e:
+            return PageText(index, page_count, "", "ocr", e)
+
+    for index, page_count, text, png in iter_pdf_pages(source, min_text_chars, dpi):
+        if png is None:
+            yield PageText(index, page_count, text.strip(), "text", None)
+        else:
+            if ocr_pool is None:
+                ocr_pool = get_ocr_pool()
+                max_in_flight = max_in_flight or ocr_pool.max_workers
+            in_flight.append((index, page_count, ocr_pool.submit([png])))
+        # Hand back OCR pages that are already done, and wait when too many are queued
+        while in_flight and (len(in_flight) >= max_in_flight or in_flight[0][2].done()):
+            yield finish(*in_flight.popleft())
+
+    while in_flight:
+        yield finish(*in_flight.popleft())
+
+
+def format_page_text(page):
+    """Text for a page, or a note that it could not be read"""
+    if page.error is not None:
+        return f"[Page {page.index + 1} could not be read: {page.error}]"
+    return page.text
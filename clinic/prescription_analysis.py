@@ -0,0 +1,168 @@
+import io
+from collections import namedtuple
+
+from clinic.dose_check import DoseCheck
+from clinic.interactions import Interaction, InteractionReport
+from clinic.pdf_extract import extract_pdf_pages, format_page_text
+from clinic.prescription_image import image_to_png, prepare_for_ocr
+from clinic.rx_parser import Medication, parse_prescription
+
+# Text read from an upload; ocr_backend names the OCR backend that read any of
+# it, or is None when it all came from a PDF text layer
+ExtractedText = namedtuple("ExtractedText", "text ocr_backend")
+
+# What is worked out locally before the model is asked: parsed medications,
+# the InteractionReport and one DoseCheck per medication
+LocalFindings = namedtuple("LocalFindings", "medications interactions doses")
+
+
+def extract_prescription_text(data, get_ocr_pool, is_pdf=False):
+    """
+    Read an uploaded prescription image or PDF, given its bytes, as ExtractedText.
+
+    get_ocr_pool is only called when something needs OCR: always for an
+    image, and for a PDF only when a page has no text layer.
+    """
+    if is_pdf:
+        pages = list(extract_pdf_pages(io.BytesIO(data), get_ocr_pool))
+        text = "\n\n".join(format_page_text(page) for page in pages)
+        if any(page.source == "ocr" for page in pages):
+            return ExtractedText(text, get_ocr_pool().backend.name)
+        return ExtractedText(text, None)
+    png = image_to_png(prepare_for_ocr(data).image)
+    ocr_pool = get_ocr_pool()
+    return ExtractedText(ocr_pool.extract_text([png]), ocr_pool.backend.name)
+
+
+def check_prescription_text(text, interaction_checker, dose_checker):
+    """Parse prescription text and check its medications for interactions and dose problems"""
+    medications = parse_prescription(text)
+    return LocalFindings(
+        medications,
+        interaction_checker.check(medication.drug for medication in medications),
+        dose_checker.check(medications),
+    )
+
+
+def findings_as_dict(findings):
+    """JSON-ready form of LocalFindings"""
+    return {
+        "medications": [medication.as_dict() for medication in findings.medications],
+        "drugs": findings.interactions.drugs,
+        "interactions": [interaction._asdict() for interaction in findings.interactions.interactions],
+        "unrecognized": findings.interactions.unrecognized,
+        "dose_checks": [check._asdict() for check in findings.doses],
+    }
+
+
+def findings_from_dict(payload):
+    """LocalFindings rebuilt from findings_as_dict output, e.g. an API response"""
+    return LocalFindings(
+        [Medication(**medication) for medication in payload["medications"]],
+        InteractionReport(
+            payload["drugs"],
+            [Interaction(**interaction) for interaction in payload["interactions"]],
+            payload["unrecognized"],
+        ),
+        [DoseCheck(**{**check, "issues": tuple(check["issues"])}) for check in payload["dose_checks"]],
+    )
+
+
+def format_medication_table(medications):
+    """Markdown table of parsed medications"""
+    rows = ["| Medication | Strength | Dose | Route | Frequency | Quantity | Refills |", "|---|---|---|---|---|---|---|"]
+    for medication in medications:
+        frequency = medication.frequency or "-"
+        if medication.as_needed and medication.frequency not in (None, "PRN"):
+            frequency += " PRN"
+        rows.append(
+            f"| {medication.drug} | {medication.strength:g} {medication.unit} | {medication.dose:g} | "
+            f"{medication.route or '-'} | {frequency} | "
+            f"{'-' if medication.quantity is None else medication.quantity} | "
+            f"{'-' if medication.refills is None else medication.refills} |"
+        )
+    return "\n".join(rows)
+
+
+def format_interaction_table(interactions):
+    """Markdown table of interactions found among the parsed medications"""
+    rows = ["| Drugs | Severity | Mechanism | Management |", "|---|---|---|---|"]
+    for interaction in interactions:
+        rows.append(
+            f"| {interaction.drug_a.title()} + {interaction.drug_b.title()} | {interaction.severity.title()} | "
+            f"{interaction.mechanism} | {interaction.management} |"
+        )
+    return "\n".join(rows)
+
+
+def format_dose_issues(dose_checks):
+    """Markdown list of dose problems found in the parsed medications"""
+    issues = [f"- **{check.drug}**: {'; '.join(check.issues)}" for check in dose_checks if check.issues]
+    unchecked = [check.drug for check in dose_checks if check.min_daily is None]
+    if not issues:
+        issues.append("All checked dosages are within the reference ranges." if len(unchecked) < len(dose_checks) else "")
+    if unchecked:
+        issues.append(f"\nNo reference dose range, so not checked: {', '.join(unchecked)}")
+    return "\n".join(issues).strip()
+
+
+def format_findings(findings):
+    """Markdown sections for the local findings, placed before the model's analysis"""
+    if not findings.medications:
+        return ""
+    report = findings.interactions
+    if report.interactions:
+        interactions = format_interaction_table(report.interactions)
+    else:
+        interactions = f"No known interactions among {len(report.drugs)} recognized medications."
+    if report.unrecognized:
+        interactions += f"\n\nNot in the interaction table, so not checked: {', '.join(report.unrecognized)}"
+    return (
+        f"### Identified Medications\n\n{format_medication_table(findings.medications)}\n\n"
+        f"### Potential Interactions\n\n{interactions}\n\n"
+        f"### Dosage Verification\n\n{format_dose_issues(findings.doses)}"
+    )
+
+
+def build_prescription_prompt(prescription_text, findings):
+    """Prompt asking the model to analyze a prescription"""
+    # With the medications parsed and interactions and doses checked locally, the model is only asked for the narrative
+    if findings.medications:
+        medication_list = "\n".join(
+            f"{number}. {medication.describe()}" for number, medication in enumerate(findings.medications, 1)
+        )
+        if findings.interactions.interactions:
+            interaction_list = "\n".join(
+                f"- {interaction.drug_a} + {interaction.drug_b} ({interaction.severity}): {interaction.mechanism}"
+                for interaction in findings.interactions.interactions
+            )
+        else:
+            interaction_list = "- None found in the interaction table"
+        dose_list = "\n".join(f"- {check.drug}: {'; '.join(check.issues)}" for check in findings.doses if check.issues)
+        return f"""I am a medical assistant powered by AI. I'm reviewing a prescription with these medications:
+
+                        {medication_list}
+
+                        Known interactions among them:
+                        {interaction_list}
+
+                        Dose check findings:
+                        {dose_list or "- None"}
+
+                        Please provide:
+                        1. Standard usage considerations
+                        2. Any potential flags that a doctor should review
+
+                        Note: This is an AI analysis and should always be verified by a qualified healthcare professional."""
+
+    return f"""I am a medical assistant powered by AI. I'm analyzing a prescription that contains the following text:
+
+                        {prescription_text}
+
+                        Please analyze this prescription and provide:
+                        1. Identified medications and dosages
+                        2. Potential drug interactions if obvious
+                        3. Standard usage considerations
+                        4. Any potential flags that a doctor should review
+
+                        Note: This is an AI analysis and should always be verified by a qualified healthcare professional."""
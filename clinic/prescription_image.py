@@ -0,0 +1,78 @@
+import hashlib
+import io
+from collections import namedtuple
+
+from PIL import Image, ImageOps
+
+# Longest edge, in pixels, of an image handed to OCR. A full page at this size
+# is roughly 200-250 DPI, which tesseract reads well; phone photos are often
+# twice as large and only slow OCR down.
+OCR_MAX_DIMENSION = 2000
+
+PreparedImage = namedtuple("PreparedImage", "image digest original_size threshold")
+
+
+def content_hash(data):
+    """Hex digest identifying an upload by its bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def otsu_threshold(histogram):
+    """Grey level that best separates a 256-bin histogram into ink and paper (Otsu's method)"""
+    total = sum(histogram)
+    if not total:
+        return 128
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+
+    best_level, best_variance = 128, -1.0
+    background, weighted_background = 0, 0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def prepare_for_ocr(data, max_dimension=OCR_MAX_DIMENSION):
+    """
+    Turn uploaded image bytes into a clean black-and-white page for OCR.
+
+    Applies the EXIF orientation, downscales so the longest edge is at most
+    max_dimension, converts to grayscale and binarizes at the Otsu threshold.
+    JPEGs are decoded at reduced size where possible, so a large photo is
+    never fully decompressed.
+    """
+    image = Image.open(io.BytesIO(data))
+    original_size = image.size
+
+    # JPEG decoders can scale by 1/2, 1/4 or 1/8 while decoding
+    image.draft("L", (max_dimension, max_dimension))
+    image = ImageOps.exif_transpose(image)
+    image, threshold = binarize_page(image, max_dimension)
+    return PreparedImage(image, content_hash(data), original_size, threshold)
+
+
+def binarize_page(image, max_dimension=OCR_MAX_DIMENSION):
+    """Grayscale, downscale and binarize a page image; returns (image, threshold)"""
+    image = image.convert("L")
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    threshold = otsu_threshold(image.histogram())
+    image = image.point(lambda level: 255 if level > threshold else 0, mode="1")
+    return image, threshold
+
+
+def image_to_png(image):
+    """Encode an image as PNG bytes, e.g. for caching or display"""
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
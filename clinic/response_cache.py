@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_prompt(prompt):
+    """Lowercase a prompt and collapse its whitespace so trivial edits share a cache entry"""
+    return " ".join(prompt.lower().split())
+
+
+def make_cache_key(prompt, model_name, parameters):
+    """Build a hashable cache key from the prompt, model name and generation parameters"""
+    return (normalize_prompt(prompt), model_name, tuple(sorted(parameters.items())))
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live.
+
+    One instance is shared by every Streamlit session on the server, so all
+    access goes through a single lock.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, ttl_seconds=None):
+        """Store value under key, evicting the least recently used entries when full"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (value, self._clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, prompt=None, model_name=None):
+        """
+        Drop cached entries and return how many were removed.
+
+        With no arguments the whole cache is cleared; otherwise only entries
+        matching the given prompt and/or model name are removed.
+        """
+        normalized = normalize_prompt(prompt) if prompt is not None else None
+        with self._lock:
+            if normalized is None and model_name is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+
+            stale = [
+                key for key in self._entries
+                if (normalized is None or key[0] == normalized)
+                and (model_name is None or key[1] == model_name)
+            ]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        """Remove every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self):
+        """Return a snapshot of the cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,126 @@
+import re
+import textwrap
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Words too common in clinical questions to say anything about the topic
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it of on or should the
+their there these this to was what when which who why with you your me my we our
+about any patient patients
+""".split())
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens with stopwords removed"""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def split_sections(topic, markdown):
+    """
+    Split a knowledge base entry into sections at its "## " headings.
+
+    Returns one dict per section with the topic id, a title combining the
+    entry title and section heading, and the section body.
+    """
+    text = textwrap.dedent(markdown).strip()
+    entry_title = topic.title()
+    sections = []
+    heading, body = None, []
+
+    def flush():
+        content = "\n".join(body).strip()
+        if content:
+            title = f"{entry_title}: {heading}" if heading else entry_title
+            sections.append({"topic": topic, "title": title, "text": content})
+
+    for line in text.splitlines():
+        if line.startswith("# ") and heading is None:
+            entry_title = line[2:].strip()
+        elif line.startswith("## "):
+            flush()
+            heading, body = line[3:].strip(), []
+        else:
+            body.append(line)
+    flush()
+    return sections
+
+
+class BM25Index:
+    """
+    Okapi BM25 over tokenized documents, stored as a sparse term-by-document matrix.
+
+    Each term's postings (document ids and their precomputed BM25 weights) are
+    contiguous slices of two flat NumPy arrays, so scoring a query is a handful
+    of vectorized scatter-adds followed by an argpartition for the top k.
+
+    vocabulary only needs a .get(token) method returning a term id, which lets
+    the arrays and vocabulary come straight from a memory-mapped file.
+    """
+
+    def __init__(self, vocabulary, term_ptr, doc_ids, weights, n_docs):
+        self.vocabulary = vocabulary
+        self.term_ptr = term_ptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.n_docs = n_docs
+
+    @classmethod
+    def build(cls, documents, k1=1.5, b=0.75):
+        """Index a list of token lists"""
+        n_docs = len(documents)
+        vocabulary = {}
+
+        # Count (term, doc) pairs
+        term_ids, doc_ids = [], []
+        for doc_id, tokens in enumerate(documents):
+            for token in tokens:
+                term_id = vocabulary.setdefault(token, len(vocabulary))
+                term_ids.append(term_id)
+                doc_ids.append(doc_id)
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        doc_lengths = np.bincount(doc_ids, minlength=n_docs).astype(np.float32)
+        avg_length = doc_lengths.mean() if n_docs else 0.0
+
+        # Collapse duplicates into term frequencies, ordered by term then document
+        n_terms = len(vocabulary)
+        stride = max(n_docs, 1)
+        pair_keys, tf = np.unique(term_ids * stride + doc_ids, return_counts=True)
+        pair_terms = pair_keys // stride
+        pair_docs = pair_keys % stride
+
+        df = np.bincount(pair_terms, minlength=n_terms).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+
+        length_norm = k1 * (1.0 - b + b * doc_lengths[pair_docs] / (avg_length or 1.0))
+        weights = idf[pair_terms] * tf * (k1 + 1.0) / (tf + length_norm)
+
+        term_ptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(df.astype(np.int64), out=term_ptr[1:])
+        return cls(vocabulary, term_ptr, pair_docs.astype(np.int32), weights.astype(np.float32), n_docs)
+
+    def score(self, query_tokens):
+        """Return the BM25 score of every document for the query tokens"""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for token in set(query_tokens):
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                continue
+            start, end = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+            # Each document appears at most once per term, so plain fancy-index addition is safe
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+        return scores
+
+    def top_k(self, query_tokens, k=3, min_score=0.0):
+        """Return up to k (doc_id, score) pairs, best first, scoring above min_score"""
+        if self.n_docs == 0:
+            return []
+        scores = self.score(query_tokens)
+        k = min(k, self.n_docs)
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in candidates if scores[doc_id] > min_score]
@@ -0,0 +1,208 @@
+import re
+
+# Normalized frequency codes and how many administrations per day they mean
+# (None when the dose is taken only as needed)
+FREQUENCY_PER_DAY = {
+    "QD": 1, "QAM": 1, "QPM": 1, "QHS": 1,
+    "BID": 2, "TID": 3, "QID": 4,
+    "QWK": 1 / 7,
+    "PRN": None,
+}
+
+# Spellings of each frequency seen on prescriptions
+_FREQUENCY_WORDS = {
+    "QD": ["qd", "od", "daily", "once daily", "once a day", "every day", "1x daily"],
+    "QAM": ["qam", "q am", "in am", "in the morning", "every morning"],
+    "QPM": ["qpm", "q pm", "in pm", "in the evening", "every evening"],
+    "QHS": ["qhs", "q hs", "hs", "at bedtime", "nightly", "at night"],
+    "BID": ["bid", "b.i.d.", "twice daily", "twice a day", "2x daily", "two times daily", "two times a day"],
+    "TID": ["tid", "t.i.d.", "three times daily", "three times a day", "3x daily"],
+    "QID": ["qid", "q.i.d.", "four times daily", "four times a day", "4x daily"],
+    "QWK": ["weekly", "once weekly", "once a week", "qwk"],
+    "PRN": ["prn", "as needed", "when required"],
+}
+
+_ROUTE_WORDS = {
+    "PO": ["po", "p.o.", "by mouth", "orally", "oral"],
+    "SL": ["sl", "sublingual", "sublingually", "under the tongue"],
+    "IV": ["iv", "intravenous", "intravenously"],
+    "IM": ["im", "intramuscular", "intramuscularly"],
+    "SC": ["sc", "sq", "subq", "subcut", "subcutaneous", "subcutaneously"],
+    "INH": ["inh", "inhaled", "inhalation", "via inhaler"],
+    "TOP": ["top", "topical", "topically", "apply"],
+    "PR": ["pr", "rectally", "per rectum"],
+}
+
+_NUMBER_WORDS = {"half": 0.5, "one": 1, "two": 2, "three": 3, "four": 4}
+
+UNITS = ["mg", "mcg", "µg", "g", "ml", "units", "unit", "iu", "meq", "%"]
+
+
+def _alternation(words):
+    # Longest first so "once daily" wins over "daily"; spaces match any whitespace
+    escaped = sorted((re.escape(word).replace(r"\ ", r"\s+") for word in words), key=len, reverse=True)
+    return "|".join(escaped)
+
+
+def _lookup(table):
+    return {" ".join(word.split()): code for code, words in table.items() for word in words}
+
+
+_FREQUENCIES = _lookup(_FREQUENCY_WORDS)
+_ROUTES = _lookup(_ROUTE_WORDS)
+
+# Amounts and dose forms in directions: "2 tablets", "one puff", "half tab"
+_DOSE_AMOUNT = r"\d+(?:\.\d+)?|half|one|two|three|four"
+_DOSE_FORMS = r"tablets?|tabs?|capsules?|caps?|puffs?|sprays?|drops?|patch(?:es)?|units?|ml|applications?"
+
+# "1. Metformin 500mg", "Amoxicillin-clavulanate 875 mg", "Insulin glargine 10 units",
+# "Rx: Warfarin 5mg", "Apply Hydrocortisone 1% cream", "Take 2 tablets of Ibuprofen 200 mg"
+_DRUG_LINE = re.compile(
+    r"^\s*(?:\d+[.)]\s*|[-*]\s*)?"
+    r"(?:(?:rx\b|℞)\s*[:.]?\s*)?"
+    rf"(?P<lead>(?:take|apply|use|inject)\s+(?:(?:{_DOSE_AMOUNT})\s*(?:{_DOSE_FORMS})\s+(?:of\s+)?)?)?"
+    r"(?P<drug>[A-Za-z][A-Za-z'-]*(?:\s+[A-Za-z][A-Za-z'-]*){0,3}?)\s+"
+    r"(?P<strength>\d+(?:\.\d+)?(?:/\d+(?:\.\d+)?)?)\s*"
+    rf"(?P<unit>{_alternation(UNITS)})(?![A-Za-z])"
+    r"(?P<rest>.*)$",
+    re.IGNORECASE,
+)
+_SIG = re.compile(r"^\s*(?:sig|directions?)\b\s*[:.]?\s*(?P<sig>.*)$", re.IGNORECASE)
+_QUANTITY = re.compile(r"(?:\b(?:disp(?:ense)?|qty|quantity)\b\s*[:.]?\s*#?|#)\s*(?P<quantity>\d+)", re.IGNORECASE)
+_REFILLS = re.compile(r"\brefills?\s*[:.]?\s*(?P<refills>\d+|none|zero|no)\b", re.IGNORECASE)
+_DOSE = re.compile(rf"\b(?P<dose>{_DOSE_AMOUNT})\s*(?:{_DOSE_FORMS})\b", re.IGNORECASE)
+_ROUTE = re.compile(rf"(?<![A-Za-z])(?:{_alternation(_ROUTES)})(?![A-Za-z])", re.IGNORECASE)
+_FREQUENCY = re.compile(
+    rf"(?<![A-Za-z])(?:q\s*(?P<hours>\d+)\s*h(?:rs?|ours?)?|every\s+(?P<every>\d+)\s+hours|{_alternation(_FREQUENCIES)})(?![A-Za-z])",
+    re.IGNORECASE,
+)
+# "q4h prn": an as-needed dose can also have a minimum interval
+_AS_NEEDED = re.compile(rf"(?<![A-Za-z])(?:{_alternation(_FREQUENCY_WORDS['PRN'])})(?![A-Za-z])", re.IGNORECASE)
+# Inline prescriptions separate their parts with slashes: "Metformin 500mg / Sig: ... / Disp: 60"
+_FIELD_SEPARATOR = re.compile(r"\s+/\s+|\s*\n\s*")
+
+
+class Medication:
+    """One prescribed medication, as parsed from prescription text"""
+
+    __slots__ = ("drug", "strength", "unit", "dose", "route", "frequency", "quantity", "refills", "sig", "as_needed")
+
+    def __init__(self, drug, strength, unit, dose=1.0, route=None, frequency=None, quantity=None, refills=None, sig="",
+                 as_needed=False):
+        self.drug = drug
+        self.strength = strength
+        self.unit = unit
+        # Units taken per administration ("2 tablets" -> 2.0)
+        self.dose = dose
+        self.route = route
+        self.frequency = frequency
+        self.quantity = quantity
+        self.refills = refills
+        self.sig = sig
+        # Taken only when needed; frequency is then the most often it may be taken, if given
+        self.as_needed = as_needed
+
+    @property
+    def per_day(self):
+        """Administrations per day, or None if unknown or as needed"""
+        if self.frequency is None:
+            return None
+        if self.frequency.startswith("Q") and self.frequency.endswith("H"):
+            return 24 / int(self.frequency[1:-1])
+        return FREQUENCY_PER_DAY.get(self.frequency)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def describe(self):
+        """Compact one-line form, e.g. for an LLM prompt"""
+        parts = [f"{self.drug} {self.strength:g} {self.unit}"]
+        if self.dose != 1:
+            parts.append(f"x{self.dose:g}")
+        parts.extend(part for part in (self.route, self.frequency) if part)
+        if self.as_needed and self.frequency != "PRN":
+            parts.append("PRN")
+        if self.quantity is not None:
+            parts.append(f"qty {self.quantity}")
+        if self.refills is not None:
+            parts.append(f"refills {self.refills}")
+        return " ".join(parts)
+
+    def __repr__(self):
+        return f"Medication({self.describe()!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Medication) and self.as_dict() == other.as_dict()
+
+
+def _parse_sig(medication, text):
+    # Fill in whatever the directions say; earlier values are kept
+    if medication.route is None:
+        match = _ROUTE.search(text)
+        if match:
+            medication.route = _ROUTES[" ".join(match.group(0).lower().split())]
+    if medication.frequency is None:
+        match = _FREQUENCY.search(text)
+        if match:
+            hours = match.group("hours") or match.group("every")
+            medication.frequency = f"Q{int(hours)}H" if hours else _FREQUENCIES[" ".join(match.group(0).lower().split())]
+    if _AS_NEEDED.search(text):
+        medication.as_needed = True
+    match = _DOSE.search(text)
+    if match:
+        dose = match.group("dose").lower()
+        medication.dose = float(_NUMBER_WORDS.get(dose, dose))
+
+
+def parse_prescription(text):
+    """
+    Parse prescription text into Medication records.
+
+    A line naming a drug with a strength ("Metformin 500mg") starts a record;
+    the Sig, Disp and Refills lines after it (or slash-separated parts of the
+    same line) fill it in.
+    """
+    medications = []
+    current = None
+    for field in _FIELD_SEPARATOR.split(text):
+        if not field:
+            continue
+
+        match = _DRUG_LINE.match(field)
+        if match and not _SIG.match(field):
+            strength = match.group("strength")
+            current = Medication(
+                drug=" ".join(match.group("drug").split()).title(),
+                # Combination strengths such as 875/125 keep only the first component
+                strength=float(strength.split("/")[0]),
+                unit=match.group("unit").lower().replace("µg", "mcg"),
+            )
+            medications.append(current)
+            # Leading directions ("Apply", "Take 2 tablets of") still give the route and dose
+            if match.group("lead"):
+                _parse_sig(current, match.group("lead"))
+            field = match.group("rest")
+            if not field.strip():
+                continue
+
+        if current is None:
+            continue
+
+        sig = _SIG.match(field)
+        if sig:
+            field = sig.group("sig")
+
+        quantity = _QUANTITY.search(field)
+        if quantity:
+            current.quantity = int(quantity.group("quantity"))
+        refills = _REFILLS.search(field)
+        if refills:
+            value = refills.group("refills").lower()
+            current.refills = int(value) if value.isdigit() else 0
+        # Directions run up to any dispense or refill count, which flattened PDF text
+        # layers often put on the same line ("Sig: 1 tab PO BID Disp: 60 Refills: 3")
+        directions_end = min([match.start() for match in (quantity, refills) if match] or [len(field)])
+        if sig:
+            current.sig = field[:directions_end].strip()
+        _parse_sig(current, field[:directions_end])
+    return medications
@@ -0,0 +1,293 @@
+import csv
+import functools
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from clinic.interactions import DEFAULT_DRUGS_PATH
+from clinic.retrieval import tokenize
+
+# Shorthand common in clinicians' questions, expanded before vectorizing so
+# "first line tx for HTN" lands near "hypertension first-line treatment"
+ABBREVIATIONS = {
+    "htn": "hypertension",
+    "dm": "diabetes",
+    "t2dm": "type 2 diabetes",
+    "t1dm": "type 1 diabetes",
+    "tb": "tuberculosis",
+    "cap": "community acquired pneumonia",
+    "copd": "chronic obstructive pulmonary disease",
+    "mi": "myocardial infarction",
+    "acs": "acute coronary syndrome",
+    "chf": "heart failure",
+    "hf": "heart failure",
+    "af": "atrial fibrillation",
+    "afib": "atrial fibrillation",
+    "cp": "chest pain",
+    "sob": "shortness of breath",
+    "uti": "urinary tract infection",
+    "ckd": "chronic kidney disease",
+    "tx": "treatment",
+    "dx": "diagnosis",
+    "ddx": "differential diagnosis",
+    "mgmt": "management",
+    "abx": "antibiotics",
+    "meds": "medication",
+    "med": "medication",
+    "bp": "blood pressure",
+    "hba1c": "a1c",
+}
+
+# Interchangeable wordings mapped onto one canonical word
+SYNONYMS = {
+    "medication": "treatment",
+    "medications": "treatment",
+    "drug": "treatment",
+    "drugs": "treatment",
+    "therapy": "treatment",
+    "therapies": "treatment",
+    "treat": "treatment",
+    "treating": "treatment",
+    "treatments": "treatment",
+    "manage": "management",
+    "managing": "management",
+    "dosage": "dose",
+    "dosing": "dose",
+    "doses": "dose",
+}
+
+
+# Words that change what a question asks however similar the rest of it is;
+# two questions must agree on all of them (and on every number and drug
+# named) before one's answer is served for the other
+NEGATIONS = frozenset("""
+no not never without avoid avoided contraindicated contraindication cannot stop stopping
+discontinue withhold hold
+""".split())
+QUALIFIERS = frozenset("""
+pediatric paediatric child children infant infants neonate neonatal adolescent adult adults
+elderly geriatric pregnant pregnancy breastfeeding lactation male female men women
+renal kidney hepatic liver iv intravenous oral im intramuscular subcutaneous topical inhaled
+acute chronic first second third maximum max minimum loading maintenance prophylaxis
+""".split())
+
+_SIGNATURE_TOKEN = re.compile(r"[a-z0-9]+(?:\.\d+)?")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+@functools.lru_cache(maxsize=1)
+def _drug_names():
+    # Generic and brand names from the interaction table
+    names = set()
+    with open(DEFAULT_DRUGS_PATH, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            names.add(row["drug"].lower())
+            names.update(alias.lower() for alias in row["aliases"].split(";") if alias)
+    return frozenset(word for name in names for word in name.split())
+
+
+def query_signature(text):
+    """
+    The parts of a question a cached answer must match exactly.
+
+    Returns (numbers in order, negations, qualifiers and drug names). Short
+    tokens like "1" vs "2" or "not" barely move a hashed vector, so they are
+    compared here instead of being left to the similarity threshold.
+    """
+    words = []
+    for token in _SIGNATURE_TOKEN.findall(text.lower().replace("n't", " not")):
+        words.extend(ABBREVIATIONS.get(token, token).split())
+    numbers = tuple(number for word in words for number in _NUMBER.findall(word))
+    negations = frozenset(word for word in words if word in NEGATIONS)
+    entities = frozenset(word for word in words if word in QUALIFIERS or word in _drug_names())
+    return numbers, negations, entities
+
+
+def normalize_query(text):
+    """Tokenize a query, drop stopwords, expand clinical abbreviations and fold synonyms"""
+    words = []
+    for token in tokenize(text):
+        words.extend(SYNONYMS.get(word, word) for word in ABBREVIATIONS.get(token, token).split())
+    return words
+
+
+class HashingVectorizer:
+    """
+    Embed short texts as L2-normalized hashed character n-gram vectors.
+
+    Each word contributes its character n-grams (with word boundaries marked)
+    and the whole word, hashed with CRC32 into dim signed buckets. The whole
+    word counts word_weight times, so a different word moves the vector more
+    than a shared spelling pulls it back. Hashing is stable across processes
+    and needs nothing beyond NumPy.
+    """
+
+    def __init__(self, dim=512, ngram_sizes=(3, 4), word_weight=3.0):
+        self.dim = dim
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.word_weight = word_weight
+        # Words repeat across questions, so their bucket lists are memoized
+        self._word_features = functools.lru_cache(maxsize=65536)(self._features)
+
+    def _features(self, word):
+        padded = f" {word} "
+        grams = [padded[i:i + n] for n in self.ngram_sizes for i in range(len(padded) - n + 1)]
+        grams.append(padded)
+        hashes = np.array([zlib.crc32(gram.encode("utf-8")) for gram in grams], dtype=np.uint32)
+        buckets = (hashes % self.dim).astype(np.intp)
+        # The top bit picks the sign so colliding features tend to cancel out
+        signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+        signs[-1] *= self.word_weight
+        return buckets, signs
+
+    def embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in normalize_query(text):
+            buckets, signs = self._word_features(word)
+            np.add.at(vector, buckets, signs)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by query meaning rather than exact text.
+
+    Query vectors live in one preallocated (max_entries, dim) float32 matrix,
+    so a lookup is a single matrix-vector product over every entry. A cached
+    answer is served for the most similar entry that reaches threshold and
+    has the same query_signature, so "type 1" never gets a "type 2" answer.
+    Expired entries are skipped and reused; when the matrix is full the least
+    recently used entry is evicted.
+    """
+
+    def __init__(self, threshold=0.92, max_entries=10000, ttl_seconds=3600, vectorizer=None, clock=time.monotonic,
+                 signature=query_signature):
+        self.threshold = threshold
+        self.signature = signature
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self._clock = clock
+
+        self._vectors = np.zeros((max_entries, self.vectorizer.dim), dtype=np.float32)
+        self._expires = np.full(max_entries, -np.inf)
+        self._last_used = np.zeros(max_entries)
+        self._values = [None] * max_entries
+        self._queries = [None] * max_entries
+        self._signatures = [None] * max_entries
+        # Slots [0, _used) have been written at least once
+        self._used = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _nearest(self, vector, signature, now, threshold):
+        # Caller holds the lock; returns (slot, similarity) of the best live
+        # entry at or above threshold with the same signature, or (None, 0.0)
+        if not self._used:
+            return None, 0.0
+        scores = self._vectors[:self._used] @ vector
+        scores[self._expires[:self._used] <= now] = -1.0
+        candidates = np.flatnonzero(scores >= threshold)
+        for slot in candidates[np.argsort(-scores[candidates])]:
+            if self._signatures[slot] == signature:
+                return int(slot), float(scores[slot])
+        return None, 0.0
+
+    def get(self, query):
+        """Return (value, cached_query, similarity) for the closest match, or None below the threshold"""
+        vector = self.vectorizer.embed(query)
+        signature = self.signature(query)
+        with self._lock:
+            now = self._clock()
+            slot, similarity = self._nearest(vector, signature, now, self.threshold)
+            if slot is None:
+                self.misses += 1
+                return None
+            self._last_used[slot] = now
+            self.hits += 1
+            return self._values[slot], self._queries[slot], similarity
+
+    def put(self, query, value, ttl_seconds=None):
+        """Cache value for query, replacing an entry for an equivalent query if there is one"""
+        vector = self.vectorizer.embed(query)
+        if not vector.any():
+            return
+        signature = self.signature(query)
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            now = self._clock()
+            slot, _ = self._nearest(vector, signature, now, 0.999)
+            if slot is None:
+                slot = self._free_slot(now)
+            self._vectors[slot] = vector
+            self._expires[slot] = now + ttl
+            self._last_used[slot] = now
+            self._values[slot] = value
+            self._queries[slot] = query
+            self._signatures[slot] = signature
+
+    def put_many(self, items, ttl_seconds=None):
+        """
+        Cache many (query, value) pairs, e.g. to warm the cache.
+
+        Unlike put this does not look for an existing equivalent entry, so
+        loading n items costs n embeddings rather than n nearest-neighbour searches.
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        embedded = [(query, value, self.vectorizer.embed(query), self.signature(query)) for query, value in items]
+        with self._lock:
+            now = self._clock()
+            for query, value, vector, signature in embedded:
+                if not vector.any():
+                    continue
+                slot = self._free_slot(now)
+                self._vectors[slot] = vector
+                self._expires[slot] = now + ttl
+                self._last_used[slot] = now
+                self._values[slot] = value
+                self._queries[slot] = query
+                self._signatures[slot] = signature
+
+    def _free_slot(self, now):
+        # Caller holds the lock: a never-used slot, else an expired one, else the least recently used
+        if self._used < self.max_entries:
+            self._used += 1
+            return self._used - 1
+        expired = np.flatnonzero(self._expires <= now)
+        if expired.size:
+            return int(expired[0])
+        self.evictions += 1
+        return int(np.argmin(self._last_used))
+
+    def invalidate(self):
+        """Drop every entry and return how many live entries were removed"""
+        with self._lock:
+            removed = int(np.count_nonzero(self._expires[:self._used] > self._clock()))
+            self._vectors[:self._used] = 0.0
+            self._expires[:] = -np.inf
+            self._values = [None] * self.max_entries
+            self._queries = [None] * self.max_entries
+            self._signatures = [None] * self.max_entries
+            self._used = 0
+            return removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": int(np.count_nonzero(self._expires[:self._used] > self._clock())),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is still running wait for and share its result (or its exception) instead
+    of repeating the work. Once the call finishes the key is released, so later
+    callers start a fresh call. Safe to share between Streamlit script threads.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Return (result, shared); shared is True when another caller's result was reused"""
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = self._flights[key] = Future()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+    def stats(self):
+        with self._lock:
+            executed, coalesced = self.executed, self.coalesced
+            in_flight = len(self._flights)
+        total = executed + coalesced
+        return {
+            "in_flight": in_flight,
+            "executed": executed,
+            "coalesced": coalesced,
+            "coalesced_rate": coalesced / total if total else 0.0,
+        }
@@ -0,0 +1,122 @@
+import json
+
+import requests
+
+
+class StreamError(Exception):
+    """Raised when a streaming endpoint reports an error mid-stream"""
+
+
+def iter_sse_data(lines):
+    """
+    Yield the data payload of each server-sent event from an iterable of lines.
+
+    Multi-line data fields are joined with newlines, comment lines are skipped
+    and the OpenAI-style "[DONE]" sentinel ends the stream.
+    """
+    data_lines = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.rstrip("\r")
+
+        # A blank line dispatches the event collected so far
+        if not line:
+            if data_lines:
+                data = "\n".join(data_lines)
+                data_lines = []
+                if data.strip() == "[DONE]":
+                    return
+                yield data
+            continue
+
+        if line.startswith(":"):
+            continue
+
+        field, _, value = line.partition(":")
+        if field == "data":
+            data_lines.append(value[1:] if value.startswith(" ") else value)
+
+    if data_lines:
+        data = "\n".join(data_lines)
+        if data.strip() != "[DONE]":
+            yield data
+
+
+def _post_stream(url, headers, payload, timeout, session=None):
+    """POST a streaming request and return the open response"""
+    sender = session if session is not None else requests
+    response = sender.post(url, headers=headers, json=payload, timeout=timeout, stream=True)
+    response.raise_for_status()
+    return response
+
+
+def stream_hf_generation(url, headers, payload, timeout=60, session=None):
+    """
+    Stream generated text from a Hugging Face text-generation endpoint.
+
+    The payload is sent with "stream": true and each token event's text is
+    yielded as it arrives. Special tokens (such as end-of-sequence) are skipped.
+    """
+    response = _post_stream(url, headers, dict(payload, stream=True), timeout, session)
+    try:
+        for data in iter_sse_data(response.iter_lines(decode_unicode=False)):
+            event = json.loads(data)
+            if "error" in event:
+                raise StreamError(event["error"])
+
+            token = event.get("token") or {}
+            if token.get("special"):
+                continue
+            text = token.get("text")
+            if text:
+                yield text
+    finally:
+        response.close()
+
+
+def stream_writer_completion(url, headers, payload, timeout=60, session=None):
+    """
+    Stream generated text from the Writer completions endpoint.
+
+    Accepts both Writer's {"value": ...} events and OpenAI-style
+    {"choices": [{"text": ...}]} events.
+    """
+    response = _post_stream(url, headers, dict(payload, stream=True), timeout, session)
+    try:
+        for data in iter_sse_data(response.iter_lines(decode_unicode=False)):
+            event = json.loads(data)
+            if "error" in event:
+                raise StreamError(event["error"])
+
+            if "value" in event:
+                text = event["value"]
+            else:
+                choices = event.get("choices") or [{}]
+                text = choices[0].get("text")
+            if text:
+                yield text
+    finally:
+        response.close()
+
+
+class StreamedResponse:
+    """
+    Iterable of text chunks that remembers the full text and where it came from.
+
+    The producer is a generator function taking this object, so it can set
+    model_name and from_api before or while it yields chunks.
+    """
+
+    def __init__(self, producer):
+        self._producer = producer
+        self.model_name = None
+        self.from_api = False
+        self.text = ""
+        self.finished = False
+
+    def __iter__(self):
+        for chunk in self._producer(self):
+            self.text += chunk
+            yield chunk
+        self.finished = True
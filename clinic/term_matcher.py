@@ -0,0 +1,89 @@
+import re
+from collections import deque
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(text):
+    """Lowercase text and replace every run of non-alphanumerics with one space, padded at both ends"""
+    return " " + _NON_WORD.sub(" ", text.lower()).strip() + " "
+
+
+class TermMatcher:
+    """
+    Aho-Corasick automaton that finds whole-word terms in a single pass.
+
+    Terms and text are both normalized to lowercase words separated by single
+    spaces, and every pattern is wrapped in spaces, so "dm" matches the word
+    "dm" but not "admission" and multi-word terms like "high blood pressure"
+    match across any punctuation or whitespace. A term ending in "*" is a stem:
+    "granuloma*" also matches "granulomas" and "granulomatous".
+
+    Building is linear in the total length of the terms; a lookup is linear in
+    the length of the text plus the number of matches, however many terms
+    there are.
+    """
+
+    def __init__(self, terms):
+        # terms: iterable of (term, value) pairs
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self.size = 0
+
+        for term, value in terms:
+            self._add(term, value)
+        self._build_failure_links()
+
+    def _add(self, term, value):
+        is_stem = term.endswith("*")
+        words = normalize_text(term.rstrip("*")).strip()
+        if not words:
+            return
+        pattern = " " + words + ("" if is_stem else " ")
+
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append((len(pattern), term, value))
+        self.size += 1
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                # Inherit the matches that end at the failure target
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find_all(self, text):
+        """Return (position, term, value) for every match, in order of where each match ends"""
+        normalized = normalize_text(text)
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        node = 0
+        for index, char in enumerate(normalized):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, term, value in output[node]:
+                # Positions refer to the normalized text without its leading pad
+                matches.append((index - length + 1, term, value))
+        return matches
+
+    def match_values(self, text):
+        """Return the set of values whose terms occur in text"""
+        return {value for _, _, value in self.find_all(text)}
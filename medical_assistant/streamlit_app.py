@@ -1,11 +1,30 @@
 import streamlit as st
 import requests
 import os
+import re
+import sys
 from PIL import Image
 import io
 import base64
 import time
 
+# Shared backend helpers live in the clinic package at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clinic import emergency, palmyra
+from clinic.chat_history import history_start
+from clinic.context_packer import ContextPacker, estimate_tokens
+from clinic.dose_check import DoseChecker
+from clinic.http_client import PooledHTTPClient
+from clinic.interactions import InteractionChecker
+from clinic.ocr import OCRPool, get_backend
+from clinic.pdf_extract import extract_pdf_pages, format_page_text
+from clinic.prescription_analysis import (
+    ExtractedText, build_prescription_prompt, check_prescription_text, format_findings
+)
+from clinic.prescription_image import content_hash, image_to_png, prepare_for_ocr
+from clinic.response_cache import ResponseCache
+
 # Set page configuration
 st.set_page_config(
     page_title="Medical Assistant",
@@ -17,6 +36,12 @@ st.set_page_config(
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 
+# Number of question/answer turns shown at first and added by "Load earlier messages"
+CHAT_PAGE_TURNS = 10
+
+if 'chat_turns_shown' not in st.session_state:
+    st.session_state.chat_turns_shown = CHAT_PAGE_TURNS
+
 if 'logged_in' not in st.session_state:
     st.session_state.logged_in = False
 
@@ -48,184 +73,106 @@ def login_page():
             else:
                 st.error("Invalid username or password")
 
-# Function to call the Palmyra-Med API (mock version for testing)
+# Shared HTTP client, reused across reruns and sessions
+@st.cache_resource
+def get_http_client():
+    return PooledHTTPClient(
+        host_pool_sizes=palmyra.HTTP_HOST_POOL_SIZES,
+        connect_timeout=palmyra.HTTP_CONNECT_TIMEOUT,
+        read_timeout=palmyra.HTTP_READ_TIMEOUT
+    )
+
+# Palmyra-Med calls go through the shared HTTP client
 def call_palmyra_api(prompt):
-    # For testing without an API key, return a mock response
-    # In production, uncomment the API call code below and add your API key
-    
-    # Mock response for testing
-    time.sleep(2)  # Simulate API delay
-    
-    if "prescription" in prompt.lower():
-        return """
-        ## Prescription Analysis
-        
-        ### Identified Medications and Dosages:
-        1. Metformin 500mg - Take 1 tablet twice daily with meals
-        2. Lisinopril 10mg - Take 1 tablet daily in the morning
-        3. Atorvastatin 20mg - Take 1 tablet daily at bedtime
-        
-        ### Potential Drug Interactions:
-        - No major interactions detected between these medications
-        - Monitor blood pressure when taking Lisinopril
-        
-        ### Usage Considerations:
-        - Metformin may cause GI disturbances; take with food to minimize
-        - Lisinopril may cause dizziness upon standing
-        - Atorvastatin may cause muscle pain in some patients
-        
-        ### Flags for Review:
-        - Consider monitoring kidney function with this medication combination
-        - Regular liver function tests recommended with statin therapy
-        
-        This is an AI analysis and should always be verified by a qualified healthcare professional.
-        """
-    else:
-        # For medical queries
-        if "diabetes" in prompt.lower():
-            return """
-            Based on the query about diabetes management, here are some considerations:
-            
-            ### Current Guidelines Overview:
-            - The ADA's Standards of Medical Care (2024) recommends individualized A1C targets, typically <7% for most patients
-            - First-line therapy remains metformin for most patients with Type 2 diabetes
-            - GLP-1 receptor agonists and SGLT-2 inhibitors are recommended for patients with cardiovascular disease
-            
-            ### Key Monitoring Parameters:
-            - A1C every 3-6 months
-            - Annual comprehensive foot examination
-            - Eye examination at diagnosis and then every 1-2 years
-            - Regular screening for kidney disease with UACR and eGFR
-            
-            ### Recent Developments:
-            - Tirzepatide (Mounjaro) shows significant benefits for weight loss and glycemic control
-            - Increased emphasis on addressing social determinants of health in diabetes management
-            - Greater focus on technology integration for monitoring and management
-            
-            Would you like more specific information about any particular aspect of diabetes management?
-            """
-        elif "hypertension" in prompt.lower():
-            return """
-            Regarding hypertension management:
-            
-            ### Current Guidelines Summary:
-            - Target BP <130/80 mmHg for most patients according to ACC/AHA guidelines
-            - First-line treatments include thiazide diuretics, ACE inhibitors, ARBs, and CCBs
-            - Lifestyle modifications remain foundational (DASH diet, sodium restriction, physical activity)
-            
-            ### Diagnostic Considerations:
-            - Confirm with out-of-office measurements when possible
-            - Consider secondary causes if resistant to treatment or early-onset
-            - Evaluate for target organ damage (heart, kidneys, eyes)
-            
-            ### Treatment Strategy:
-            - Begin with single agent for stage 1, consider dual therapy for stage 2
-            - Combination pills may improve adherence
-            - Consider patient comorbidities when selecting agents
-            
-            ### Monitoring:
-            - Follow-up within 1 month for medication adjustments
-            - Monitor electrolytes and kidney function with RAAS inhibitors
-            - Encourage home BP monitoring for most patients
-            
-            This analysis is for clinical consideration and should be applied within the context of the individual patient's needs and circumstances.
-            """
-        else:
-            return """
-            Thank you for your medical query. As an AI medical assistant, I can provide general information based on medical literature, but clinical judgment is essential.
-            
-            The information available suggests considering the following aspects:
-            
-            1. Differential diagnoses to consider based on the presented symptoms
-            2. Recommended diagnostic approach according to current guidelines
-            3. Evidence-based treatment options for the most likely conditions
-            4. Key monitoring parameters and follow-up recommendations
-            
-            For more specific guidance, additional clinical details would be helpful, including:
-            - Duration and progression of symptoms
-            - Relevant past medical history
-            - Current medications
-            - Results of any preliminary investigations
-            
-            Would you like me to elaborate on any particular aspect of this analysis?
-            """
-    
-    # Production code (uncomment and add your API key when ready)
-    """
-    api_key = "YOUR_WRITER_API_KEY_HERE"  # In production, use st.secrets["WRITER_API_KEY"]
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "model": "palmyra-med-70b-32k",
-        "prompt": prompt,
-        "temperature": 0.7,
-        "max_tokens": 1000
-    }
-    
-    try:
-        response = requests.post(
-            "https://api.writer.com/v1/completions",
-            headers=headers,
-            json=payload
-        )
-        
-        if response.status_code == 200:
-            return response.json().get('choices', [{}])[0].get('text', '')
-        else:
-            return f"Error: API returned status code {response.status_code}"
+    return palmyra.call_palmyra_api(prompt, get_http_client())
+
+def stream_palmyra_api(prompt):
+    return palmyra.stream_palmyra_api(prompt, get_http_client())
+
+# Conversation context settings: the whole chat prompt is kept within
+# CONTEXT_TOKEN_BUDGET tokens; the last CONTEXT_RECENT_TURNS turns are sent
+# verbatim and older ones as short summaries
+CONTEXT_TOKEN_BUDGET = 6000
+CONTEXT_RECENT_TURNS = 3
+CONTEXT_SUMMARY_TOKENS = 60
+
+context_packer = ContextPacker(recent_turns=CONTEXT_RECENT_TURNS, summary_tokens=CONTEXT_SUMMARY_TOKENS)
+
+# Build the chat prompt for a query, with the conversation so far
+def build_chat_prompt(query, context=""):
+    context_section = f"\n            {context}\n" if context else ""
+    return f"""I am a medical assistant powered by AI. I'm designed to help medical professionals 
+            with preliminary analysis. I do not provide medical advice directly to patients.
+            {context_section}
+            Medical professional's query: {query}
             
-    except Exception as e:
-        return f"An error occurred: {str(e)}"
-    """
+            Please provide a thoughtful analysis, potential considerations, and relevant medical information:"""
 
 # Check for emergency keywords
 def check_for_emergency(text):
-    emergency_keywords = [
-        "emergency", "urgent", "severe", "critical", "life-threatening", 
-        "heart attack", "stroke", "seizure", "unconscious", "not breathing",
-        "suicide", "hemorrhage", "bleeding severely"
-    ]
-    
-    for keyword in emergency_keywords:
-        if keyword.lower() in text.lower():
-            return True
-    return False
+    # One pass over the message with the precompiled detector; negated
+    # findings such as "no chest pain" do not trigger an alert
+    return emergency.detect(text).is_emergency
 
-# Extract text from image (mock function for demo)
+# Prescription results cache: extraction and analysis keyed by a hash of the
+# uploaded file, so re-analyzing the same prescription is instant
+PRESCRIPTION_CACHE_MAX_ENTRIES = 128
+PRESCRIPTION_CACHE_TTL_SECONDS = 24 * 3600
+
+@st.cache_resource
+def get_prescription_cache():
+    return ResponseCache(
+        max_entries=PRESCRIPTION_CACHE_MAX_ENTRIES,
+        ttl_seconds=PRESCRIPTION_CACHE_TTL_SECONDS
+    )
+
+# OCR settings: backend ("auto" is tesseract; "stub" returns sample text for
+# demos), worker processes (None = one per core) and the time allowed for one
+# prescription
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "auto")
+OCR_MAX_WORKERS = None
+OCR_TIMEOUT_SECONDS = 60
+
+# Shared OCR process pool, so prescriptions from every session are read in parallel across cores
+@st.cache_resource
+def get_ocr_pool():
+    return OCRPool(backend=get_backend(OCR_BACKEND), max_workers=OCR_MAX_WORKERS, timeout=OCR_TIMEOUT_SECONDS)
+
+# Extract text from a prepared prescription image
 def extract_text_from_image(image):
-    # In a real application, you would use pytesseract here
-    # For the demo, return mock prescription text
-    return """
-    Dr. John Smith, MD
-    123 Medical Plaza
-    Phone: (555) 123-4567
-    
-    Patient: Jane Doe
-    Date: 05/15/2025
-    
-    Rx:
-    
-    1. Metformin 500mg
-       Sig: 1 tablet PO BID with meals
-       Disp: 60 tablets
-       Refills: 3
-    
-    2. Lisinopril 10mg
-       Sig: 1 tablet PO daily in AM
-       Disp: 30 tablets
-       Refills: 3
-    
-    3. Atorvastatin 20mg
-       Sig: 1 tablet PO qHS
-       Disp: 30 tablets
-       Refills: 3
-    
-    Signed: Dr. John Smith, MD
-    """
+    # OCR runs in the process pool; the script thread only updates the progress bar
+    ocr_pool = get_ocr_pool()
+    progress = st.progress(0.0, text="Reading prescription...")
+    text = ocr_pool.extract_text(
+        [image_to_png(image)],
+        on_page=lambda done, total: progress.progress(done / total, text=f"OCR: page {done} of {total}")
+    )
+    progress.empty()
+    return ExtractedText(text, ocr_pool.backend.name)
+
+# Extract text from a PDF prescription page by page
+def extract_text_from_pdf(pdf_file):
+    # Pages with a text layer are read directly; the OCR pool is only started
+    # for scanned pages
+    progress = st.progress(0.0, text="Reading PDF...")
+    pages = {}
+    for page in extract_pdf_pages(pdf_file, get_ocr_pool):
+        pages[page.index] = page
+        progress.progress(len(pages) / page.pages, text=f"Read page {page.index + 1} of {page.pages}")
+    progress.empty()
+    text = "\n\n".join(format_page_text(pages[index]) for index in sorted(pages))
+    used_ocr = any(page.source == "ocr" for page in pages.values())
+    return ExtractedText(text, get_ocr_pool().backend.name if used_ocr else None)
+
+# Drug interaction table, compiled once from the offline data files and shared by all sessions
+@st.cache_resource
+def get_interaction_checker():
+    return InteractionChecker.from_files()
+
+# Dose range table, shared by all sessions; brand names resolve through the interaction table
+@st.cache_resource
+def get_dose_checker():
+    return DoseChecker.from_file(resolve=get_interaction_checker().resolve)
 
 # Main application
 def main_app():
@@ -242,6 +189,7 @@ def main_app():
             st.session_state.logged_in = False
             st.session_state.username = ""
             st.session_state.messages = []
+            st.session_state.chat_turns_shown = CHAT_PAGE_TURNS
             st.experimental_rerun()
         
         st.header("Prescription Analysis")
@@ -253,32 +201,45 @@ def main_app():
                 if uploaded_file.type.startswith('image'):
                     st.image(uploaded_file, caption="Uploaded Prescription", use_column_width=True)
                 
-                # Process the prescription
+                # Process the prescription, reusing the result for a file analyzed before
                 try:
-                    if uploaded_file.type.startswith('image'):
-                        image = Image.open(uploaded_file)
-                        prescription_text = extract_text_from_image(image)
-                    else:
-                        # For PDF you would need additional processing
-                        prescription_text = "PRESCRIPTION SAMPLE TEXT FOR PDF"
-                        
-                    # Create a prompt for prescription analysis
-                    prompt = f"""I am a medical assistant powered by AI. I'm analyzing a prescription that contains the following text:
-                    
-                    {prescription_text}
+                    data = uploaded_file.getvalue()
+                    digest = content_hash(data)
+                    prescription_cache = get_prescription_cache()
+                    result = prescription_cache.get(digest)
                     
-                    Please analyze this prescription and provide:
-                    1. Identified medications and dosages
-                    2. Potential drug interactions if obvious
-                    3. Standard usage considerations
-                    4. Any potential flags that a doctor should review
+                    if result is None:
+                        if uploaded_file.type.startswith('image'):
+                            # Orient, downscale, grayscale and binarize before OCR
+                            prepared = prepare_for_ocr(data)
+                            prescription_text, ocr_backend = extract_text_from_image(prepared.image)
+                        else:
+                            prescription_text, ocr_backend = extract_text_from_pdf(uploaded_file)
+                            
+                        # Parse and check the medications locally and create a prompt for prescription analysis
+                        findings = check_prescription_text(prescription_text, get_interaction_checker(), get_dose_checker())
+                        prompt = build_prescription_prompt(prescription_text, findings)
+                        
+                        with st.spinner("Analyzing prescription..."):
+                            analysis = call_palmyra_api(prompt)
+                        api_failed = palmyra.is_error_response(analysis)
+                        if findings.medications:
+                            analysis = f"{format_findings(findings)}\n\n{analysis}"
+                        result = {
+                            "text": prescription_text, "medications": findings.medications,
+                            "analysis": analysis, "ocr_backend": ocr_backend
+                        }
+                        # Failed API calls are not cached so a retry goes back to the API
+                        if not api_failed:
+                            prescription_cache.put(digest, result)
+                    else:
+                        st.caption("Showing the earlier analysis of this prescription.")
                     
-                    Note: This is an AI analysis and should always be verified by a qualified healthcare professional."""
+                    if result.get("ocr_backend") == "stub":
+                        st.warning("Read by the stub OCR backend (OCR_BACKEND=stub): the extracted text is sample text, not this prescription.")
                     
-                    with st.spinner("Analyzing prescription..."):
-                        analysis = call_palmyra_api(prompt)
-                        st.session_state.messages.append({"role": "user", "content": f"Analyzed prescription: {uploaded_file.name}"})
-                        st.session_state.messages.append({"role": "assistant", "content": analysis})
+                    st.session_state.messages.append({"role": "user", "content": f"Analyzed prescription: {uploaded_file.name}"})
+                    st.session_state.messages.append({"role": "assistant", "content": result["analysis"]})
                 
                 except Exception as e:
                     st.error(f"Error processing prescription: {str(e)}")
@@ -286,10 +247,18 @@ def main_app():
     # Chat interface
     st.header("Medical Chat Assistant")
     
-    # Display chat messages
-    for message in st.session_state.messages:
+    # Display the most recent chat messages; older turns are shown on request
+    visible_from = history_start(st.session_state.messages, st.session_state.chat_turns_shown)
+    if visible_from > 0:
+        if st.button(f"Load earlier messages ({visible_from} hidden)"):
+            st.session_state.chat_turns_shown += CHAT_PAGE_TURNS
+            st.rerun()
+    
+    for message in st.session_state.messages[visible_from:]:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
+            if message.get("usage"):
+                st.caption(message["usage"])
     
     # User input
     user_input = st.chat_input("Type your medical question here...")
@@ -303,9 +272,11 @@ def main_app():
             st.markdown(user_input)
         
         # Check for emergency
-        if check_for_emergency(user_input):
-            emergency_response = """
-            ⚠️ **POTENTIAL EMERGENCY DETECTED** ⚠️
+        assessment = emergency.detect(user_input)
+        if assessment.is_emergency:
+            findings = ", ".join(sorted({match.label for match in assessment.matches if not match.negated}))
+            emergency_response = f"""
+            ⚠️ **POTENTIAL EMERGENCY DETECTED** ⚠️ ({assessment.severity}: {findings})
             
             This appears to describe an emergency situation that requires immediate medical attention. 
             
@@ -321,22 +292,38 @@ def main_app():
             # Add assistant response to chat history
             st.session_state.messages.append({"role": "assistant", "content": emergency_response})
         else:
-            # Create a structured prompt for medical context
-            prompt = f"""I am a medical assistant powered by AI. I'm designed to help medical professionals 
-            with preliminary analysis. I do not provide medical advice directly to patients.
-            
-            Medical professional's query: {user_input}
-            
-            Please provide a thoughtful analysis, potential considerations, and relevant medical information:"""
+            # Critical findings the message rules out are shown rather than silently ignored
+            if assessment.negated_critical:
+                st.info(
+                    "Mentioned but negated: " + ", ".join(assessment.negated_critical)
+                    + ". If any of these is actually present, call emergency services (911) immediately."
+                )
+
+            # Create a structured prompt for medical context, packing in as much
+            # of the earlier conversation as the token budget allows
+            history_budget = max(0, CONTEXT_TOKEN_BUDGET - estimate_tokens(build_chat_prompt(user_input)))
+            packed = context_packer.pack(st.session_state.messages[:-1], history_budget)
+            prompt = build_chat_prompt(user_input, packed.text)
+            usage = (
+                f"Prompt: ~{estimate_tokens(prompt):,} tokens of {CONTEXT_TOKEN_BUDGET:,} "
+                f"(context {packed.tokens:,}: {packed.verbatim_turns} recent turns, "
+                f"{packed.summarized_turns} summarized, {packed.dropped_turns} dropped)"
+            )
             
-            # Get response from API
+            # Stream response from API as it is generated
             with st.chat_message("assistant"):
+                response_placeholder = st.empty()
                 with st.spinner("Thinking..."):
-                    response = call_palmyra_api(prompt)
-                    st.markdown(response)
+                    chunks = stream_palmyra_api(prompt)
+                    response = next(chunks, "")
+                for chunk in chunks:
+                    response_placeholder.markdown(response + "▌")
+                    response += chunk
+                response_placeholder.markdown(response)
+                st.caption(usage)
             
             # Add assistant response to chat history
-            st.session_state.messages.append({"role": "assistant", "content": response})
+            st.session_state.messages.append({"role": "assistant", "content": response, "usage": usage})
 
 # Main logic
 if not st.session_state.logged_in:
@@ -2,412 +2,95 @@ import streamlit as st
 import requests
 import time
 import sys
+import os
 import re
 
-# Medical LLM Query Function with enhanced reliability
-def query_medical_llm(prompt):
-    """
-    Query medical LLM models with fallback options and specialized knowledge
-    """
-    # Multiple model options for reliability
-    models = [
-        {
-            "name": "Meditron-7B",
-            "url": "https://api-inference.huggingface.co/models/epfl-llm/meditron-7b",
-            "system_prompt": """You are a medical assistant providing evidence-based guidance to healthcare professionals. 
-            Focus on clinical information including diagnosis, treatment, and management strategies.
-            Always remind users to verify with current guidelines and use clinical judgment.
-            Format your response with clear sections, organize recommendations systematically,
-            and note important warnings or contraindications when applicable."""
-        },
-        {
-            "name": "BioMistral-7B",
-            "url": "https://api-inference.huggingface.co/models/BioMistral/BioMistral-7B",
-            "system_prompt": """You are a medical assistant for healthcare professionals.
-            Provide detailed clinical information with evidence-based recommendations.
-            Include specific diagnostic criteria, treatment protocols, and appropriate citations.
-            Always remind users to verify with current guidelines and use clinical judgment."""
-        }
-    ]
-    
-    # Try each model in sequence
-    for model in models:
-        try:
-            # Format the prompt for the model
-            full_prompt = f"{model['system_prompt']}\n\nPhysician Query: {prompt}\n\nMedical Response:"
-            
-            # Prepare the payload with optimized parameters
-            payload = {
-                "inputs": full_prompt,
-                "parameters": {
-                    "max_new_tokens": 1024,
-                    "temperature": 0.1,
-                    "top_p": 0.95,
-                    "repetition_penalty": 1.15,
-                    "do_sample": True
-                }
-            }
-            
-            # Initialize headers (empty if no API key is used)
-            headers = {}
-            
-            # Optional: Add API key if available in secrets
-            if "HUGGINGFACE_API_KEY" in st.secrets:
-                headers["Authorization"] = f"Bearer {st.secrets['HUGGINGFACE_API_KEY']}"
-            
-            # Add timeout and retry logic
-            for attempt in range(3):
-                try:
-                    response = requests.post(
-                        model["url"], 
-                        headers=headers, 
-                        json=payload, 
-                        timeout=60
-                    )
-                    
-                    # Handle successful response
-                    if response.status_code == 200:
-                        result = response.json()[0]["generated_text"]
-                        
-                        # Clean up response and remove any HTML tags
-                        clean_response = result.replace("</div>", "")
-                        
-                        # Handle result extraction differently based on model
-                        if "Medical Response:" in clean_response:
-                            answer = clean_response.split("Medical Response:")[1].strip()
-                        else:
-                            # Fallback extraction method
-                            answer = clean_response.replace(full_prompt, "").strip()
-                        
-                        return answer, True, model["name"]
-                    
-                    # Model still loading
-                    elif response.status_code == 503 and "loading" in response.text.lower():
-                        if attempt < 2:
-                            time.sleep((attempt + 1) * 5)  # Progressive backoff
-                            continue
-                    
-                    # Other errors, retry
-                    else:
-                        if attempt < 2:
-                            time.sleep(2)
-                        else:
-                            break
-                        
-                except requests.exceptions.Timeout:
-                    if attempt < 2:
-                        time.sleep(5)
-                    continue
-                except Exception as e:
-                    if attempt < 2:
-                        time.sleep(3)
-                    continue
-                    
-        except Exception as e:
-            continue
-    
-    # If all models fail, use enhanced local database
-    return get_enhanced_medical_fallback(prompt), False, "Local Medical Database"
+from clinic.api_client import MedicalAPIClient
+from clinic.chat_history import history_start
+from clinic.dose_check import DoseChecker
+from clinic.executor import ExecutorBusyError, QueryExecutor
+from clinic.interactions import InteractionChecker
+from clinic.medical_query import (
+    GENERATION_PARAMETERS, HTTP_ATTEMPTS_TOTAL, QUERIES_TOTAL, QUERY_STAGE_SECONDS, get_circuit_breakers,
+    get_health_prober, get_http_client, get_query_flights, get_query_metrics, get_response_cache,
+    get_semantic_cache, query_medical_llm, stream_medical_llm
+)
+from clinic.ocr import OCRPool, OCRUnavailableError, get_backend
+from clinic.pdf_extract import extract_pdf_pages, format_page_text
+from clinic.prescription_analysis import findings_from_dict
+from clinic.prescription_image import content_hash, image_to_png, prepare_for_ocr
+from clinic.response_cache import ResponseCache, make_cache_key
+from clinic.rx_parser import parse_prescription
 
-# Enhanced medical knowledge database with tuberculosis and other detailed conditions
-def get_enhanced_medical_fallback(query):
-    """Provide reliable medical information from local database"""
-    
-    # Convert query to lowercase for matching
-    query_lower = query.lower()
-    
-    # Comprehensive medical knowledge base with enhanced content
-    medical_database = {
-        "tuberculosis": """
-        # Tuberculosis: Clinical and Pathological Features
-        
-        ## Histological Hallmarks
-        1. **Caseating Granulomas**: The most characteristic feature, consisting of:
-           - Central area of caseous necrosis (cheese-like appearance)
-           - Surrounded by epithelioid histiocytes, lymphocytes, and Langhans giant cells
-           
-        2. **Langhans Giant Cells**: Distinctive multinucleated giant cells with:
-           - Nuclei arranged in a horseshoe or peripheral pattern
-           - Formed by fusion of macrophages
-        
-        3. **Acid-Fast Bacilli**: Mycobacterium tuberculosis organisms
-           - Rod-shaped bacteria visible with Ziehl-Neelsen or auramine-rhodamine stains
-           - Often sparse and difficult to identify in tissue sections
-        
-        ## Additional Histopathological Features
-        - Fibrotic encapsulation in chronic lesions
-        - Lymphocytic infiltration at periphery
-        - Satellite granulomas surrounding main lesion
-        - Variable degree of calcification in healed lesions
-        
-        ## Diagnostic Methods
-        - Histopathology of biopsied tissue
-        - Acid-fast staining
-        - PCR for mycobacterial DNA
-        - Culture confirmation (gold standard)
-        
-        Always verify with current guidelines and use clinical judgment.
-        """,
-        
-        "lung mass": """
-        # Approach to Lung Mass Evaluation
-        
-        ## Differential Diagnosis
-        1. **Malignant**: Primary lung cancer (NSCLC, SCLC), metastatic disease
-        2. **Infectious**: Tuberculoma, fungal infection (aspergilloma, histoplasmoma)
-        3. **Inflammatory**: Rheumatoid nodule, Wegener's granulomatosis
-        4. **Congenital**: Hamartoma, arteriovenous malformation
-        
-        ## Risk Assessment
-        - High risk features: Age >50, smoking history, size >3cm, spiculated edges, upper lobe location
-        - Key symptoms: Hemoptysis, weight loss, chest pain, dyspnea
-        
-        ## Diagnostic Workup
-        1. Chest CT with contrast
-        2. PET/CT scan for lesions ≥8mm
-        3. Tissue diagnosis:
-           - Central lesions: Bronchoscopy
-           - Peripheral lesions: CT-guided biopsy
-           - Consider EBUS for mediastinal involvement
-        4. Brain MRI and bone scan if malignancy suspected
-        
-        ## Management
-        - Suspicious lesions: Referral to thoracic surgery and oncology
-        - Lung cancer staging determines treatment approach
-        - Small nodules (<8mm): Serial imaging based on Fleischner criteria
-        
-        Always verify with current guidelines and use clinical judgment.
-        """,
-        
-        "pneumonia": """
-        # Community-Acquired Pneumonia Management
-        
-        ## Assessment
-        1. **Diagnostic Criteria**: Combination of symptoms, signs, and radiographic findings
-        2. **Severity Assessment**: CURB-65 or Pneumonia Severity Index (PSI)
-        3. **Risk Stratification**: Determines outpatient vs. inpatient management
-        
-        ## Outpatient Treatment (Mild)
-        - **First-line**: Amoxicillin 1g PO TID (or)
-        - **Alternative**: Doxycycline 100mg PO BID
-        - **For atypical coverage**: Azithromycin 500mg day 1, then 250mg days 2-5
-        - **Duration**: Typically 5-7 days
-        
-        ## Inpatient Treatment (Moderate)
-        - **Preferred**: Combination therapy with beta-lactam (Ampicillin/sulbactam, Ceftriaxone) plus macrolide
-        - **Alternative**: Respiratory fluoroquinolone (Levofloxacin 750mg daily)
-        - **Duration**: Usually 7 days
-        
-        ## Severe (ICU) Treatment
-        - **Recommended**: Beta-lactam plus either macrolide or fluoroquinolone
-        - **Consider antipseudomonal coverage** if risk factors present
-        - **Duration**: 7-10 days
-        
-        ## Monitoring
-        - Respiratory status and oxygenation
-        - Response to antibiotics within 48-72h
-        - Follow-up chest imaging for persistent symptoms or high-risk patients
-        
-        Always verify with current guidelines and use clinical judgment.
-        """,
-        
-        "hypertension": """
-        # Hypertension Management
-        
-        ## Non-pharmacological Interventions
-        - Sodium restriction (<2g/day)
-        - Regular physical activity (150 min/week moderate intensity)
-        - Weight loss if overweight/obese
-        - DASH diet (rich in fruits, vegetables, low-fat dairy, reduced saturated fat)
-        - Alcohol moderation (<2 drinks/day for men, <1 for women)
-        
-        ## First-line Medications
-        - **Thiazide diuretics**: Chlorthalidone 12.5-25mg daily, Hydrochlorothiazide 12.5-50mg daily
-        - **ACE inhibitors**: Lisinopril 10-40mg daily, Ramipril 2.5-20mg daily
-        - **ARBs**: Losartan 25-100mg daily, Valsartan 80-320mg daily
-        - **CCBs**: Amlodipine 2.5-10mg daily, Diltiazem ER 120-360mg daily
-        
-        ## BP Targets
-        - **General population**: <130/80 mmHg
-        - **Elderly (>65y)**: <130-140/80 mmHg (individualize)
-        - **With diabetes or CKD**: <130/80 mmHg
-        
-        ## Monitoring
-        - Regular BP measurements (home and office)
-        - Electrolytes and renal function for patients on diuretics, ACEi, ARBs
-        - Urinalysis and albumin-to-creatinine ratio
-        - Periodic cardiovascular risk assessment
-        
-        Always verify with current guidelines and use clinical judgment.
-        """,
-        
-        "diabetes": """
-        # Type 2 Diabetes Management
-        
-        ## First-line Therapy
-        - **Metformin**: Start 500mg daily, titrate to 1000mg BID
-        - **Lifestyle modifications**: Medical nutrition therapy, regular exercise, weight loss
-        
-        ## Second-line Options (based on comorbidities)
-        - **CV disease**: GLP-1 RA (preferred) or SGLT2 inhibitor
-        - **Heart failure**: SGLT2 inhibitor
-        - **CKD**: SGLT2 inhibitor
-        - **Weight concerns**: GLP-1 RA
-        - **Cost concerns**: Sulfonylureas, TZDs
-        
-        ## Glycemic Targets
-        - **HbA1c**: Generally <7% (individualize)
-           - More stringent (6-6.5%): Short duration, no CVD, low hypoglycemia risk
-           - Less stringent (7.5-8.0%): Limited life expectancy, frail elderly, multiple comorbidities
-        - **Fasting glucose**: 80-130 mg/dL
-        - **Postprandial glucose**: <180 mg/dL
-        
-        ## Monitoring
-        - HbA1c every 3-6 months
-        - SMBG as indicated by therapy
-        - Annual screening for complications (retinopathy, nephropathy, neuropathy)
-        - Comprehensive foot exam annually
-        - Lipid profile and cardiovascular risk assessment
-        
-        Always verify with current guidelines and use clinical judgment.
-        """,
-        
-        "chest pain": """
-        # Chest Pain Evaluation
-        
-        ## High-Risk Features (Cardiac)
-        - Crushing, pressure-like, radiating to arm/jaw/back
-        - Associated with exertion, diaphoresis, dyspnea
-        - History of CAD, multiple risk factors
-        - Abnormal ECG changes, elevated cardiac biomarkers
-        
-        ## Differential Diagnosis
-        1. **Cardiac**: ACS, stable angina, pericarditis, myocarditis
-        2. **Pulmonary**: PE, pneumonia, pneumothorax, pleuritis
-        3. **GI**: GERD, esophageal spasm, peptic ulcer
-        4. **Musculoskeletal**: Costochondritis, muscle strain
-        5. **Other**: Anxiety, herpes zoster
-        
-        ## Initial Workup
-        - ECG within 10 minutes of presentation
-        - Cardiac biomarkers (troponin)
-        - Chest X-ray
-        - Consider d-dimer if PE suspected
-        
-        ## Management Strategy
-        - **High-risk ACS features**: Activate ACS protocol, antiplatelet therapy, anticoagulation
-        - **Intermediate risk**: Observation, serial ECGs and troponins
-        - **Low risk**: Consider stress testing or discharge with follow-up
-        - **Non-cardiac etiology**: Treat underlying cause
-        
-        Always verify with current guidelines and use clinical judgment.
-        """,
-        
-        "asthma": """
-        # Asthma Management
-        
-        ## Classification
-        1. **Intermittent**: Symptoms <2 days/week, nighttime awakenings <2x/month
-        2. **Mild Persistent**: Symptoms >2 days/week, nighttime awakenings 3-4x/month
-        3. **Moderate Persistent**: Daily symptoms, nighttime awakenings >1x/week
-        4. **Severe Persistent**: Throughout the day, nighttime awakenings 7x/week
-        
-        ## Stepwise Management Approach
-        
-        ### Step 1 (Intermittent)
-        - **SABA** as needed (e.g., albuterol)
-        
-        ### Step 2 (Mild Persistent)
-        - **Low-dose ICS** daily (e.g., budesonide, fluticasone)
-        - Alternative: Leukotriene modifier or cromolyn
-        
-        ### Step 3 (Mild to Moderate)
-        - **Low-dose ICS + LABA** (e.g., fluticasone/salmeterol)
-        - Alternative: Medium-dose ICS
-        
-        ### Step 4 (Moderate)
-        - **Medium-dose ICS + LABA**
-        - Consider adding tiotropium for patients ≥12 years
-        
-        ### Step 5 (Moderate to Severe)
-        - **High-dose ICS + LABA**
-        - Consider biologics for specific phenotypes (omalizumab for allergic)
-        
-        ### Step 6 (Severe)
-        - **High-dose ICS + LABA + oral corticosteroids**
-        - Biologics based on phenotype
-        
-        ## Monitoring
-        - **Spirometry**: At least annually
-        - **Peak flow monitoring**: For moderate-severe or poorly controlled
-        - **Symptom control assessment**: Every 2-6 weeks while gaining control, then 1-6 months
-        
-        ## Exacerbation Management
-        - **Mild-Moderate**: SABA q4-6h, oral corticosteroids if inadequate response
-        - **Severe**: Continuous SABA for first hour, IV corticosteroids, consider magnesium
-        
-        Always verify with current guidelines and use clinical judgment.
-        """
-    }
-    
-    # Special terms to check for in query
-    medical_terms = [
-        "tuberculosis", "tb", "mycobacterium", "granuloma", "caseating", "langhans",
-        "pneumonia", "cap", "respiratory infection", 
-        "hypertension", "high blood pressure", "htn",
-        "diabetes", "dm", "hyperglycemia", "t2dm",
-        "asthma", "wheeze", "bronchospasm",
-        "chest pain", "angina", "cardiac", "heart attack"
-    ]
-    
-    # Check for specific terms in query
-    found_terms = []
-    for term in medical_terms:
-        if term in query_lower:
-            found_terms.append(term)
-    
-    # Handle histology/pathology questions specifically for TB
-    if ("histolog" in query_lower or "patholog" in query_lower or "histopatholog" in query_lower or "microscop" in query_lower) and \
-       any(term in query_lower for term in ["tb", "tuberculosis", "granuloma"]):
-        return medical_database["tuberculosis"]
-    
-    # Match based on found terms
-    for term in found_terms:
-        if term in ["tuberculosis", "tb", "mycobacterium", "granuloma", "caseating", "langhans"]:
-            return medical_database["tuberculosis"]
-        elif term in ["pneumonia", "cap", "respiratory infection"]:
-            return medical_database["pneumonia"]
-        elif term in ["hypertension", "high blood pressure", "htn"]:
-            return medical_database["hypertension"]
-        elif term in ["diabetes", "dm", "hyperglycemia", "t2dm"]:
-            return medical_database["diabetes"]
-        elif term in ["chest pain", "angina", "cardiac", "heart attack"]:
-            return medical_database["chest pain"]
-        elif term in ["asthma", "wheeze", "bronchospasm"]:
-            return medical_database["asthma"]
-    
-    # Check for lung mass related terms
-    if "lung" in query_lower and any(term in query_lower for term in ["mass", "nodule", "tumor", "cancer"]):
-        return medical_database["lung mass"]
-    
-    # General fallback response
-    return """
-    # General Clinical Guidance
-    
-    I'm currently unable to provide specific guidance for this clinical question from my local database.
-    
-    ## Recommended Approach
-    1. **Evidence-based resources**: Consider consulting UpToDate, PubMed, or specialty society guidelines
-    2. **Patient-specific factors**: Age, comorbidities, medications, and preferences should influence decisions
-    3. **Specialist consultation**: Consider when diagnosis is unclear or condition is complex
-    
-    ## Documentation Reminders
-    - Document clinical reasoning and decision-making process
-    - Record pertinent positive and negative findings
-    - Note patient education provided and follow-up plans
-    
-    As always, clinical decisions should be based on professional judgment and current best practices.
-    """
+# Address of a clinic.api_server instance; when set, questions and
+# prescriptions are sent to it instead of being handled in this process
+MEDICAL_API_URL = os.environ.get("MEDICAL_API_URL")
+
+# Shared client for the API server, or None to answer locally
+@st.cache_resource
+def get_api_client():
+    """Return the process-wide API client, or None when MEDICAL_API_URL is not set"""
+    return MedicalAPIClient(MEDICAL_API_URL) if MEDICAL_API_URL else None
+
+def ask_medical_question(prompt):
+    """Answer a question through the API server when one is configured, otherwise in this process"""
+    api_client = get_api_client()
+    if api_client is None:
+        return query_medical_llm(prompt)
+    return api_client.query(prompt)
+
+# Background query settings: at most QUERY_MAX_CONCURRENT chat questions run
+# at once across all sessions, the rest wait in a queue. The model requests
+# they make are capped separately by medical_query.UPSTREAM_MAX_CONCURRENT
+QUERY_MAX_CONCURRENT = 4
+QUERY_MAX_PENDING = 64
+# How often the chat page refreshes answers that are still being generated
+QUERY_POLL_SECONDS = 0.5
+
+# Shared background executor for chat questions
+@st.cache_resource
+def get_query_executor():
+    """Return the process-wide executor that runs medical queries off the script thread"""
+    return QueryExecutor(max_workers=QUERY_MAX_CONCURRENT, max_pending=QUERY_MAX_PENDING)
+
+# Prescription results cache settings: results are keyed by a hash of the upload
+PRESCRIPTION_CACHE_MAX_ENTRIES = 128
+PRESCRIPTION_CACHE_TTL_SECONDS = 24 * 3600
+
+# Shared prescription results cache (one per server process, not per session)
+@st.cache_resource
+def get_prescription_cache():
+    """Return the process-wide cache of prescription results keyed by content hash"""
+    return ResponseCache(
+        max_entries=PRESCRIPTION_CACHE_MAX_ENTRIES,
+        ttl_seconds=PRESCRIPTION_CACHE_TTL_SECONDS
+    )
+
+# OCR settings: backend ("auto" is tesseract; "stub" returns sample text for
+# demos), worker processes (None = one per core) and the time allowed for one
+# prescription
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "auto")
+OCR_MAX_WORKERS = None
+OCR_TIMEOUT_SECONDS = 60
+
+# Shared OCR process pool, so prescriptions from every session are read in parallel across cores
+@st.cache_resource
+def get_ocr_pool():
+    """Return the process-wide OCR worker pool"""
+    return OCRPool(backend=get_backend(OCR_BACKEND), max_workers=OCR_MAX_WORKERS, timeout=OCR_TIMEOUT_SECONDS)
+
+# Shared drug interaction table, compiled once from the offline data files
+@st.cache_resource
+def get_interaction_checker():
+    """Return the process-wide drug interaction checker"""
+    return InteractionChecker.from_files()
+
+# Shared dose range table; drug names are resolved through the interaction
+# table's aliases so brand names are checked too
+@st.cache_resource
+def get_dose_checker():
+    """Return the process-wide dose range checker"""
+    return DoseChecker.from_file(resolve=get_interaction_checker().resolve)
 
 # Function to analyze prescriptions
 def analyze_prescription(image_file):
@@ -418,21 +101,124 @@ def analyze_prescription(image_file):
         # Convert image to bytes
         img_bytes = image_file.getvalue()
         
-        # In a real implementation, you would send this image to an OCR service
-        # For now, we'll use a placeholder response
-        
-        st.image(image_file, caption="Uploaded Prescription", use_column_width=True)
+        # Prepare the image for OCR once per distinct upload; reruns and
+        # re-uploads of the same file are served from the cache
+        digest = content_hash(img_bytes)
+        prescription_cache = get_prescription_cache()
+        result = prescription_cache.get(digest)
+        api_client = get_api_client()
+        if result is None:
+            result = {}
+            if api_client is not None:
+                # The API server extracts the text and runs the checks
+                with st.spinner("Sending prescription to the analysis service..."):
+                    payload = api_client.analyze_prescription(img_bytes, image_file.type)
+                result["text"] = payload["text"]
+                result["findings"] = findings_from_dict(payload)
+                result["ocr_backend"] = payload.get("ocr_backend")
+            elif image_file.type.startswith("image"):
+                prepared = prepare_for_ocr(img_bytes)
+                result["ocr_image"] = image_to_png(prepared.image)
+                result["ocr_caption"] = (
+                    f"Prepared for OCR: {prepared.original_size[0]}x{prepared.original_size[1]} -> "
+                    f"{prepared.image.size[0]}x{prepared.image.size[1]}, threshold {prepared.threshold}"
+                )
+                
+                # Read the text in the OCR process pool, showing progress page by page
+                result["ocr_backend"] = get_ocr_pool().backend.name
+                progress = st.progress(0.0, text="Reading prescription...")
+                result["text"] = get_ocr_pool().extract_text(
+                    [result["ocr_image"]],
+                    on_page=lambda done, total: progress.progress(done / total, text=f"OCR: page {done} of {total}")
+                )
+                progress.empty()
+            else:
+                # Read PDFs page by page, showing each page as soon as it is done;
+                # the OCR pool is only started for pages without a text layer
+                progress = st.progress(0.0, text="Reading PDF...")
+                pages = {}
+                for page in extract_pdf_pages(image_file, get_ocr_pool):
+                    pages[page.index] = page
+                    progress.progress(len(pages) / page.pages, text=f"Read page {page.index + 1} of {page.pages}")
+                    with st.expander(f"Page {page.index + 1} ({'text layer' if page.source == 'text' else 'OCR'})"):
+                        st.text(format_page_text(page))
+                progress.empty()
+                result["text"] = "\n\n".join(format_page_text(pages[index]) for index in sorted(pages))
+                result["page_sources"] = [pages[index].source for index in sorted(pages)]
+                if "ocr" in result["page_sources"]:
+                    result["ocr_backend"] = get_ocr_pool().backend.name
+            if "findings" in result:
+                result["medications"] = result["findings"].medications
+            else:
+                # Medications are parsed locally from the extracted text
+                result["medications"] = parse_prescription(result.get("text", ""))
+            prescription_cache.put(digest, result)
+        
+        if "findings" in result:
+            interaction_report, dose_checks = result["findings"].interactions, result["findings"].doses
+        else:
+            # Interactions are checked locally against the offline interaction table
+            interaction_report = get_interaction_checker().check(
+                medication.drug for medication in result["medications"]
+            )
+            
+            # Every dose is checked against the reference ranges in one vectorized pass
+            dose_checks = get_dose_checker().check(result["medications"])
+        
+        if result.get("ocr_backend") == "stub":
+            st.warning("Read by the stub OCR backend (OCR_BACKEND=stub): the extracted text is sample text, not this prescription.")
+        if image_file.type.startswith("image"):
+            st.image(image_file, caption="Uploaded Prescription", use_column_width=True)
+        elif "page_sources" in result:
+            page_sources = result.get("page_sources", [])
+            st.caption(
+                f"PDF with {len(page_sources)} pages: {page_sources.count('text')} read from the text layer, "
+                f"{page_sources.count('ocr')} by OCR"
+            )
+        if "ocr_image" in result:
+            with st.expander("Image prepared for OCR"):
+                st.image(result["ocr_image"], caption=result["ocr_caption"], use_column_width=True)
+        if result.get("text"):
+            with st.expander("Extracted Text"):
+                st.text(result["text"])
         
         st.markdown("### Prescription Analysis")
         st.markdown("**Detected Medications:**")
-        st.markdown("1. Medication placeholders (in a real implementation, these would be detected from the image)")
-        st.markdown("2. Add your actual prescription analysis logic here")
+        if result["medications"]:
+            st.table([medication.as_dict() for medication in result["medications"]])
+        else:
+            st.markdown("No medications could be identified. Please check the extracted text.")
         
         st.markdown("### Potential Interactions")
-        st.markdown("No potential interactions detected.")
+        if interaction_report.interactions:
+            st.table([
+                {
+                    "Drugs": f"{interaction.drug_a.title()} + {interaction.drug_b.title()}",
+                    "Severity": interaction.severity.title(),
+                    "Mechanism": interaction.mechanism,
+                    "Management": interaction.management
+                }
+                for interaction in interaction_report.interactions
+            ])
+        elif len(interaction_report.drugs) > 1:
+            st.markdown(f"No known interactions among {len(interaction_report.drugs)} medications.")
+        else:
+            st.markdown("Fewer than two recognized medications; nothing to check.")
+        if interaction_report.unrecognized:
+            st.caption(
+                "Not in the interaction table, so not checked: " + ", ".join(interaction_report.unrecognized)
+            )
         
         st.markdown("### Dosage Verification")
-        st.markdown("All dosages appear to be within standard ranges.")
+        dose_issues = [check for check in dose_checks if check.issues]
+        unchecked = [check.drug for check in dose_checks if check.min_daily is None]
+        if dose_issues:
+            for check in dose_issues:
+                st.warning(f"**{check.drug}**: " + "; ".join(check.issues))
+        elif len(unchecked) < len(dose_checks):
+            st.markdown("All checked dosages are within the reference ranges.")
+        if unchecked:
+            st.caption("No reference dose range, so not checked: " + ", ".join(unchecked))
         
         st.success("Prescription analysis complete. Please verify all information with appropriate medical resources.")
         
@@ -440,6 +226,119 @@ def analyze_prescription(image_file):
         st.error(f"Error analyzing prescription: {str(e)}")
         st.markdown("Please try uploading a clearer image or contact support.")
 
+# Chat message markup
+def format_user_message(content):
+    """Return the HTML block for a user chat message"""
+    return f"<div style='background-color:#2e4a67; padding:10px; border-radius:5px; margin-bottom:10px;'><strong>You:</strong> {content}</div>"
+
+def format_assistant_message(content, source=None):
+    """Return the HTML block for an assistant chat message"""
+    # Get source if available
+    source_info = ""
+    if source:
+        source_info = f"<small>Source: {source}</small>"
+    
+    return f"<div style='background-color:#3a3b3c; padding:10px; border-radius:5px; margin-bottom:10px;'><strong>Medical Assistant:</strong> {content}<br>{source_info}</div>"
+
+# Stream answers into the chat page instead of waiting for the full generation
+STREAM_RESPONSES = True
+
+# Function run by the background executor for one chat question
+def run_medical_query_job(job, prompt):
+    """Answer a question, publishing streamed text on the job as it arrives"""
+    # The API server returns whole answers, so there is nothing to stream from it
+    if not STREAM_RESPONSES or get_api_client() is not None:
+        return ask_medical_question(prompt)
+    
+    def stream_answer():
+        stream = stream_medical_llm(prompt)
+        for chunk in stream:
+            job.append_text(chunk)
+        return stream.text.strip(), stream.from_api, stream.model_name
+    
+    # A question already being streamed for another session is not sent again;
+    # this job waits and shows the complete answer when it is ready
+    result, _ = get_query_flights().do(make_cache_key(prompt, None, GENERATION_PARAMETERS), stream_answer)
+    return result
+
+# Number of question/answer turns shown at first and added by "Load earlier messages"
+CHAT_PAGE_TURNS = 10
+
+# Formatted HTML for a chat message, built once and kept on the message
+def get_message_markup(message):
+    """Return the message's HTML block, formatting it only the first time it is shown"""
+    markup = message.get("markup")
+    if markup is None:
+        if message["role"] == "user":
+            markup = format_user_message(message["content"])
+        else:
+            markup = format_assistant_message(message["content"], message.get("source"))
+        message["markup"] = markup
+    return markup
+
+# Render chat messages, including answers that are still in flight
+def render_chat_messages(messages):
+    """Write chat messages to the page as a single markdown element"""
+    executor = get_query_executor()
+    blocks = []
+    for message in messages:
+        if message.get("job_id"):
+            job = executor.get(message["job_id"])
+            if job is not None and job.partial_text:
+                content = job.partial_text + "▌"
+            elif job is not None and job.status == "queued":
+                content = "<em>Waiting for a free model slot...</em>"
+            else:
+                content = "<em>Generating medical response...</em>"
+            blocks.append(format_assistant_message(content))
+        else:
+            blocks.append(get_message_markup(message))
+    if blocks:
+        st.markdown("".join(blocks), unsafe_allow_html=True)
+
+# Index of the first chat message on screen
+def visible_history_start():
+    return history_start(st.session_state.chat_history, st.session_state.chat_turns_shown)
+
+# Move finished background answers into the chat history
+def collect_finished_answers():
+    """Fill in history entries whose jobs have finished; returns how many were collected"""
+    executor = get_query_executor()
+    collected = 0
+    for message in st.session_state.chat_history:
+        job_id = message.get("job_id")
+        if not job_id:
+            continue
+        job = executor.get(job_id)
+        if job is None:
+            # Expired or lost (e.g. the server restarted)
+            message["content"] = "The answer to this question is no longer available. Please ask again."
+        elif not job.done():
+            continue
+        else:
+            try:
+                message["content"], _, message["source"] = job.result()
+            except Exception as e:
+                message["content"] = f"Error generating a response: {str(e)}"
+            executor.pop(job_id)
+        del message["job_id"]
+        collected += 1
+    return collected
+
+# Index of the first chat message whose answer is still pending
+def first_pending_message():
+    history = st.session_state.chat_history
+    return next((i for i, message in enumerate(history) if message.get("job_id")), len(history))
+
+# Periodically refresh the part of the chat that is still waiting for answers
+@st.fragment(run_every=QUERY_POLL_SECONDS)
+def show_pending_answers():
+    """Redraw in-flight answers; reruns the page once any of them finishes"""
+    if collect_finished_answers():
+        st.rerun()
+    pending_from = max(first_pending_message(), visible_history_start())
+    render_chat_messages(st.session_state.chat_history[pending_from:])
+
 # Function to show the Ask Medical Questions page
 def show_ask_medical_questions():
     """Display and process the Ask Medical Questions page"""
@@ -451,19 +350,22 @@ def show_ask_medical_questions():
     # Initialize chat history in session state if not present
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
-    
-    # Display existing chat history
+    if "chat_turns_shown" not in st.session_state:
+        st.session_state.chat_turns_shown = CHAT_PAGE_TURNS
+    
+    # Display the most recent turns of the chat history; everything from the first
+    # unanswered question on is drawn by a fragment that refreshes until the answers arrive
+    collect_finished_answers()
+    visible_from = visible_history_start()
+    pending_from = max(first_pending_message(), visible_from)
     with chat_container:
-        for message in st.session_state.chat_history:
-            if message["role"] == "user":
-                st.markdown(f"<div style='background-color:#2e4a67; padding:10px; border-radius:5px; margin-bottom:10px;'><strong>You:</strong> {message['content']}</div>", unsafe_allow_html=True)
-            else:
-                # Get source if available
-                source_info = ""
-                if "source" in message:
-                    source_info = f"<small>Source: {message['source']}</small>"
-                
-                st.markdown(f"<div style='background-color:#3a3b3c; padding:10px; border-radius:5px; margin-bottom:10px;'><strong>Medical Assistant:</strong> {message['content']}<br>{source_info}</div>", unsafe_allow_html=True)
+        if visible_from > 0:
+            if st.button(f"Load earlier messages ({visible_from} hidden)"):
+                st.session_state.chat_turns_shown += CHAT_PAGE_TURNS
+                st.rerun()
+        render_chat_messages(st.session_state.chat_history[visible_from:pending_from])
+        if pending_from < len(st.session_state.chat_history):
+            show_pending_answers()
     
     # Create user input area
     with st.form(key="medical_question_form", clear_on_submit=True):
@@ -472,23 +374,17 @@ def show_ask_medical_questions():
     
     # Process the user's question when submitted
     if submit_button and user_question:
-        # Add user message to chat history
-        st.session_state.chat_history.append({"role": "user", "content": user_question})
-        
-        # Show "thinking" message
-        with st.spinner("Generating medical response..."):
-            # Query the medical LLM
-            response, from_api, model_name = query_medical_llm(user_question)
+        # Queue the question; the answer is filled in when the job finishes
+        try:
+            job = get_query_executor().submit(run_medical_query_job, user_question, description=user_question)
+        except ExecutorBusyError:
+            st.warning("The medical assistant is busy. Please try again in a moment.")
+        else:
+            st.session_state.chat_history.append({"role": "user", "content": user_question})
+            st.session_state.chat_history.append({"role": "assistant", "content": "", "source": None, "job_id": job.id})
             
-            # Add AI response to chat history with source info
-            st.session_state.chat_history.append({
-                "role": "assistant", 
-                "content": response,
-                "source": model_name
-            })
-        
-        # Rerun to update the UI with new messages
-        st.rerun()  # Using st.rerun() instead of experimental_rerun
+            # Rerun to update the UI with new messages
+            st.rerun()  # Using st.rerun() instead of experimental_rerun
     
     # Add disclaimer
     st.markdown("---")
@@ -552,22 +448,135 @@ def show_system_diagnostics():
     
     st.subheader("System Status")
     
-    # Check API connectivity
-    try:
-        with st.spinner("Testing Hugging Face API connection..."):
-            response = requests.get("https://huggingface.co/api/models/epfl-llm/meditron-7b")
-            if response.status_code == 200:
-                st.success("✅ Hugging Face API: Connected")
-            else:
-                st.error("❌ Hugging Face API: Disconnected")
-    except:
-        st.error("❌ Hugging Face API: Disconnected")
+    # Backend health from the background prober's latest results, so the page never waits on the network
+    backend_health = get_health_prober().snapshot()
+    for name, health in backend_health.items():
+        if not health["checks"]:
+            st.info(f"⏳ {name}: First health check in progress")
+        elif health["available"]:
+            st.success(f"✅ {name}: Available ({health['last_detail']})")
+        else:
+            st.error(f"❌ {name}: Unavailable ({health['last_detail']}, {health['consecutive_failures']} failed checks in a row)")
+    
+    checked = {name: health for name, health in backend_health.items() if health["checks"]}
+    if checked:
+        st.table([
+            {
+                "Backend": name,
+                "Availability": f"{health['availability']:.0%} of {health['checks']} checks",
+                "p50 Latency (ms)": "-" if health["p50_seconds"] is None else round(health["p50_seconds"] * 1000),
+                "p95 Latency (ms)": "-" if health["p95_seconds"] is None else round(health["p95_seconds"] * 1000),
+                "Last Checked": f"{time.time() - health['last_checked']:.0f}s ago"
+            }
+            for name, health in checked.items()
+        ])
+        # Latency of each check; failed checks leave a gap
+        st.line_chart(
+            [
+                {"check": index, "backend": name, "latency_ms": result.latency * 1000 if result.ok else None}
+                for name, health in checked.items()
+                for index, result in enumerate(health["history"])
+            ],
+            x="check", y="latency_ms", color="backend"
+        )
     
     # System metrics
     st.subheader("System Information")
     st.info(f"Streamlit Version: {st.__version__}")
     st.info(f"Python Version: {sys.version.split()[0]}")
+
+    # Model circuit breakers
+    st.subheader("Model Circuit Breakers")
+    breaker_states = get_circuit_breakers().snapshot()
+    if breaker_states:
+        st.table(breaker_states)
+    else:
+        st.caption("No model calls made yet.")
+    
+    # Shared HTTP connection pools
+    st.subheader("HTTP Connection Pools")
+    pool_stats = get_http_client().pool_stats()
+    if pool_stats:
+        st.table(pool_stats)
+    else:
+        st.caption("No outbound connections opened yet.")
     
+    # OCR worker pool
+    st.subheader("OCR Workers")
+    try:
+        ocr_stats = get_ocr_pool().stats()
+    except OCRUnavailableError as e:
+        st.error(str(e))
+    else:
+        ocr_cols = st.columns(4)
+        ocr_cols[0].metric("Backend", ocr_stats["backend"])
+        ocr_cols[1].metric("Worker Processes", ocr_stats["max_workers"])
+        ocr_cols[2].metric("Pages Pending", ocr_stats["pending_pages"])
+        ocr_cols[3].metric("Pages Read / Failed", f"{ocr_stats['pages_done']} / {ocr_stats['pages_failed']}")
+    
+    # Shared response cache
+    st.subheader("Response Cache")
+    response_cache = get_response_cache()
+    cache_stats = response_cache.stats()
+    cache_cols = st.columns(4)
+    cache_cols[0].metric("Entries", f"{cache_stats['size']} / {cache_stats['max_entries']}")
+    cache_cols[1].metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+    cache_cols[2].metric("Hits / Misses", f"{cache_stats['hits']} / {cache_stats['misses']}")
+    cache_cols[3].metric("Evictions", cache_stats["evictions"] + cache_stats["expirations"])
+
+    semantic_stats = get_semantic_cache().stats()
+    st.caption(
+        f"Semantic cache: {semantic_stats['size']} / {semantic_stats['max_entries']} entries, "
+        f"{semantic_stats['hits']} reworded questions answered from cache "
+        f"({semantic_stats['hit_rate']:.0%} of lookups), similarity threshold {semantic_stats['threshold']}"
+    )
+
+    if st.button("Clear Response Cache"):
+        removed = response_cache.invalidate() + get_semantic_cache().invalidate()
+        st.success(f"Removed {removed} cached responses")
+
+    # Background query executor
+    st.subheader("Query Executor")
+    executor_stats = get_query_executor().stats()
+    executor_cols = st.columns(4)
+    executor_cols[0].metric("Running", f"{executor_stats['running']} / {executor_stats['max_workers']}")
+    executor_cols[1].metric("Queued", executor_stats["queued"])
+    executor_cols[2].metric("Completed", executor_stats["completed"])
+    executor_cols[3].metric("Failed", executor_stats["failed"])
+
+    flight_stats = get_query_flights().stats()
+    st.caption(
+        f"Coalesced questions: {flight_stats['coalesced']} of {flight_stats['executed'] + flight_stats['coalesced']} "
+        f"({flight_stats['coalesced_rate']:.0%}), {flight_stats['in_flight']} in flight"
+    )
+
+    # Where query time goes, per stage and model
+    st.subheader("Query Metrics")
+    query_metrics = get_query_metrics()
+    if get_api_client() is not None:
+        st.caption("Questions are answered by the API server; its metrics are at /metrics/prometheus.")
+    stage_rows = query_metrics.histogram(*QUERY_STAGE_SECONDS).samples()
+    if stage_rows:
+        st.markdown("**Stage latency (seconds, estimated from histogram buckets)**")
+        # Bars stack, so the second segment is the gap up to p95 and each bar ends at p95
+        st.bar_chart(
+            [{"stage": f"{row['stage']} ({row['model']})", "p50": row["p50"], "p50 to p95": row["p95"] - row["p50"]}
+             for row in stage_rows if row["outcome"] in ("ok", "matched", "general_guidance")],
+            x="stage", y=["p50", "p50 to p95"]
+        )
+        query_rows = query_metrics.counter(*QUERIES_TOTAL).samples()
+        if query_rows:
+            st.markdown("**Queries by answering model and outcome**")
+            st.bar_chart(query_rows, x="model", y="value", color="outcome")
+        attempt_rows = query_metrics.counter(*HTTP_ATTEMPTS_TOTAL).samples()
+        if attempt_rows:
+            st.markdown("**HTTP attempts by model and result**")
+            st.table(attempt_rows)
+        with st.expander("Prometheus metrics"):
+            st.code(query_metrics.render(), language="text")
+    else:
+        st.caption("No queries answered in this process yet.")
+
     # Test medical AI
     st.subheader("Test Medical AI")
     
@@ -577,7 +586,7 @@ def show_system_diagnostics():
     
     if submit and test_query:
         with st.spinner("Testing medical AI..."):
-            response, from_api, model_name = query_medical_llm(test_query)
+            response, from_api, model_name = ask_medical_question(test_query)
             st.subheader("Response:")
             st.write(response)
             
@@ -612,6 +621,9 @@ def main():
         initial_sidebar_state="expanded"
     )
     
+    # Start the background health checks used for routing and System Diagnostics
+    get_health_prober()
+    
     # Check if user is logged in
     if "logged_in" not in st.session_state:
         st.session_state.logged_in = False
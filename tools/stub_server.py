@@ -0,0 +1,298 @@
+"""
+Local stub of the Hugging Face inference and Writer completions endpoints.
+
+Run it and point the apps at it to exercise streaming and retries offline:
+
+    python tools/stub_server.py --port 8089
+    HF_INFERENCE_BASE_URL=http://127.0.0.1:8089/models \
+    WRITER_API_URL=http://127.0.0.1:8089/v1/completions \
+    WRITER_API_KEY=stub streamlit run streamlit_app.py
+
+Failures can be scripted to reproduce cold starts and outages:
+
+    python tools/stub_server.py --loading-seconds 20 --error-rate 0.1
+    python tools/stub_server.py --behavior scenario.json
+
+where scenario.json holds default settings and per-model overrides, matched
+against the request path, e.g.
+
+    {"default": {"first_token_delay": 0.5, "latency_jitter": 0.2},
+     "models": {"meditron": {"error_rate": 1.0}}}
+
+The behavior can also be changed while the server runs by POSTing the same
+JSON to /_stub/behavior; GET /_stub/stats returns the responses sent so far.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_ANSWER = (
+    "# Stub Clinical Guidance\n\n"
+    "This response was generated by the local stub inference server. "
+    "Always verify with current guidelines and use clinical judgment."
+)
+
+
+class StubBehavior:
+    """
+    How the stub answers: delays, and how often it fails instead.
+
+    first_token_delay (plus a random 0..latency_jitter) is waited before
+    every response and token_delay between streamed tokens. For loading_seconds
+    after the behavior is applied every request gets a 503 "model is loading"
+    with estimated_time, as during a Hugging Face cold start. After that a
+    request hangs for hang_seconds with probability timeout_rate, or fails
+    with error_status with probability error_rate.
+    """
+
+    FIELDS = (
+        "first_token_delay", "token_delay", "latency_jitter", "error_rate", "error_status",
+        "loading_seconds", "loading_estimated_time", "timeout_rate", "hang_seconds",
+    )
+
+    def __init__(self, first_token_delay=0.1, token_delay=0.02, latency_jitter=0.0, error_rate=0.0,
+                 error_status=500, loading_seconds=0.0, loading_estimated_time=None, timeout_rate=0.0,
+                 hang_seconds=120.0):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.loading_seconds = loading_seconds
+        # Defaults to the loading time still remaining
+        self.loading_estimated_time = loading_estimated_time
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+
+    def updated(self, settings):
+        """A copy with some settings replaced; unknown settings raise ValueError"""
+        unknown = set(settings) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"unknown stub settings: {', '.join(sorted(unknown))}")
+        return StubBehavior(**{**{name: getattr(self, name) for name in self.FIELDS}, **settings})
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serve canned completions, optionally streamed token by token as SSE"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b"{}"
+        return json.loads(body or b"{}")
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_events(self, events):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for event in events:
+            data = event if isinstance(event, str) else json.dumps(event)
+            self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+    def _tokens(self):
+        for token in re.findall(r"\S+\s*|\s+", self.server.answer):
+            time.sleep(self.behavior.token_delay)
+            yield token
+
+    def do_GET(self):
+        # Model metadata, as queried by System Diagnostics
+        if self.path.startswith("/api/models/"):
+            self._send_json(200, {"id": self.path[len("/api/models/"):]})
+        elif self.path == "/_stub/stats":
+            self._send_json(200, self.server.stats())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        request = self._read_json()
+        if self.path == "/_stub/behavior":
+            try:
+                self.server.configure(request.get("default", {}), request.get("models", {}))
+            except (TypeError, ValueError) as e:
+                self._send_json(400, {"error": str(e)})
+            else:
+                self._send_json(200, {"ok": True})
+            return
+
+        self.behavior, failure = self.server.plan(self.path)
+        if failure is not None:
+            status, payload = failure
+            self.server.count(self.path, status)
+            self._send_json(status, payload)
+            return
+        self.server.count(self.path, 200)
+
+        if self.path.startswith("/models/"):
+            self._handle_hf(request)
+        elif self.path.rstrip("/") == "/v1/completions":
+            self._handle_writer(request)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _handle_hf(self, request):
+        if request.get("stream"):
+            self._stream_events(self._hf_events())
+        else:
+            answer = "".join(self._tokens())
+            self._send_json(200, [{"generated_text": request.get("inputs", "") + " " + answer}])
+
+    def _hf_events(self):
+        for index, token in enumerate(self._tokens()):
+            yield {"token": {"id": index, "text": token, "special": False}, "generated_text": None}
+        yield {"token": {"id": -1, "text": "</s>", "special": True}, "generated_text": self.server.answer}
+
+    def _handle_writer(self, request):
+        if request.get("stream"):
+            self._stream_events({"value": token} for token in self._tokens())
+        else:
+            self._send_json(200, {"choices": [{"text": "".join(self._tokens())}]})
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded stub server holding the current behavior and response counts"""
+
+    daemon_threads = True
+
+    def __init__(self, address, answer=DEFAULT_ANSWER, behavior=None, verbose=False, seed=None):
+        super().__init__(address, StubHandler)
+        self.answer = answer
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._counts = {}
+        self.configure(vars(behavior or StubBehavior()))
+
+    def configure(self, default=None, models=None):
+        """
+        Replace the behavior: default settings, and per-model overrides keyed
+        by a case-insensitive substring of the request path. Restarts the
+        loading window and clears the response counts.
+        """
+        behavior = StubBehavior().updated(default or {})
+        overrides = {key.lower(): behavior.updated(settings) for key, settings in (models or {}).items()}
+        with self._lock:
+            self._default = behavior
+            self._overrides = overrides
+            self._applied_at = time.monotonic()
+            self._counts = {}
+
+    def plan(self, path):
+        """
+        Wait out this request's latency and decide how it ends.
+
+        Returns (behavior, failure) where failure is None for a normal answer,
+        or the (status, payload) to send instead.
+        """
+        lowered = path.lower()
+        with self._lock:
+            behavior = next((b for key, b in self._overrides.items() if key in lowered), self._default)
+            loading_left = behavior.loading_seconds - (time.monotonic() - self._applied_at)
+            jitter = self._rng.uniform(0, behavior.latency_jitter)
+            draw = self._rng.random()
+
+        time.sleep(behavior.first_token_delay + jitter)
+        if loading_left > 0:
+            estimated = behavior.loading_estimated_time
+            return behavior, (503, {
+                "error": "Model is currently loading",
+                "estimated_time": loading_left if estimated is None else estimated,
+            })
+        if draw < behavior.timeout_rate:
+            time.sleep(behavior.hang_seconds)
+            return behavior, (504, {"error": "Gateway timeout"})
+        if draw < behavior.timeout_rate + behavior.error_rate:
+            return behavior, (behavior.error_status, {"error": "Stub error"})
+        return behavior, None
+
+    def count(self, path, status):
+        key = f"{path.split('?')[0]} {status}"
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def stats(self):
+        """Responses sent since the behavior was last set, keyed by path and status"""
+        with self._lock:
+            return dict(self._counts)
+
+
+def make_server(host="127.0.0.1", port=8089, answer=DEFAULT_ANSWER, token_delay=0.02,
+                first_token_delay=0.1, verbose=False, behavior=None, seed=None):
+    """Create (but do not start) a stub server; port 0 picks a free port"""
+    if behavior is None:
+        behavior = StubBehavior(first_token_delay=first_token_delay, token_delay=token_delay)
+    return StubServer((host, port), answer, behavior, verbose, seed)
+
+
+def start_in_background(**kwargs):
+    """Start a stub server on a daemon thread and return it"""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--token-delay", type=float, default=0.02,
+                        help="seconds between streamed tokens")
+    parser.add_argument("--first-token-delay", type=float, default=0.1,
+                        help="seconds before the first byte of each response")
+    parser.add_argument("--latency-jitter", type=float, default=0.0,
+                        help="up to this many extra seconds, at random, before each response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of failed requests")
+    parser.add_argument("--loading-seconds", type=float, default=0.0,
+                        help="answer 503 \"model is loading\" for this long after starting")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of requests that hang")
+    parser.add_argument("--hang-seconds", type=float, default=120.0, help="how long hanging requests hang")
+    parser.add_argument("--behavior", help="JSON file with default settings and per-model overrides")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for jitter and failures")
+    parser.add_argument("--answer", default=DEFAULT_ANSWER, help="text every completion returns")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    behavior = StubBehavior(
+        first_token_delay=args.first_token_delay, token_delay=args.token_delay,
+        latency_jitter=args.latency_jitter, error_rate=args.error_rate, error_status=args.error_status,
+        loading_seconds=args.loading_seconds, timeout_rate=args.timeout_rate, hang_seconds=args.hang_seconds,
+    )
+    server = make_server(args.host, args.port, args.answer, verbose=args.verbose, behavior=behavior, seed=args.seed)
+    if args.behavior:
+        with open(args.behavior, encoding="utf-8") as f:
+            scenario = json.load(f)
+        server.configure({**vars(behavior), **scenario.get("default", {})}, scenario.get("models"))
+    print(f"Stub inference server listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()